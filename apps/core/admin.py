@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ContactMessage
+from .models import ContactMessage, StoredFile
 
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
@@ -51,4 +51,13 @@ class ContactMessageAdmin(admin.ModelAdmin):
         ('Statut & Dates', {
             'fields': ('is_read', 'created_at')
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    # Tenu à jour par le stockage : consultation seulement
+    list_display = ('name', 'size', 'refcount', 'created_at')
+    search_fields = ('name',)
+    readonly_fields = ('name', 'size', 'refcount', 'created_at')
+    list_per_page = 50
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'apps.core'
+
+    def ready(self):
+        # Miniatures générées en arrière-plan à l'upload (avatars, photos de profil)
+        from .thumbnails import connect_signals
+        connect_signals()
+        # Références des fichiers remplacés ou supprimés (ContentAddressedStorage)
+        from .storage import connect_signals as connect_storage_signals
+        connect_storage_signals()
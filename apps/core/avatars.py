@@ -0,0 +1,71 @@
+# apps/core/avatars.py
+"""
+Avatars par défaut : initiales sur fond de couleur, en SVG généré localement
+(remplace ui-avatars.com : pas de requête tierce, pas d'email dans l'URL).
+
+L'URL ne dépend que des initiales (/avatars/v1/AB.svg) : tous les "AB" du
+site partagent la même image, servie avec un ETag fort et un cache immuable.
+Les SVG déjà rendus restent en mémoire (lru_cache) : un rendu ne coûte que
+quelques microsecondes, le premier affichage de chaque paire suffit à le
+mettre en cache, sans préchauffage au démarrage.
+"""
+import hashlib
+import unicodedata
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+# Changer de version si le dessin change : les anciennes URL sont en cache immuable
+AVATAR_VERSION = 1
+DEFAULT_INITIALS = 'BM'
+MAX_INITIALS = 2
+
+# Couleurs de la marque, choisies de façon déterministe selon les initiales
+PALETTE = ('#f97316', '#8b5cf6', '#ec4899', '#0ea5e9', '#10b981', '#eab308')
+
+SVG_TEMPLATE = (
+    '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 64 64" width="64" height="64">'
+    '<rect width="64" height="64" fill="{color}"/>'
+    '<text x="50%" y="50%" dy=".35em" text-anchor="middle" fill="#fff" '
+    'font-family="Inter,system-ui,sans-serif" font-size="{size}" font-weight="700">{text}</text>'
+    '</svg>'
+)
+
+
+def initials_for(value):
+    """
+    Initiales (majuscules, 1 ou 2 lettres) d'un utilisateur, d'un profil ou d'un texte :
+    prénom + nom, sinon première lettre de l'email / du nom d'utilisateur.
+    """
+    user = getattr(value, 'user', value)
+    if hasattr(user, 'get_full_name'):
+        words = [user.first_name, user.last_name]
+        fallback = getattr(user, 'email', '') or getattr(user, 'username', '')
+    else:
+        words = str(value or '').split()
+        fallback = ''
+
+    letters = [word[0] for word in words if word and word[0].isalpha()]
+    if not letters and fallback[:1].isalpha():
+        letters = [fallback[0]]
+    return ''.join(letters[:MAX_INITIALS]).upper()[:MAX_INITIALS] or DEFAULT_INITIALS
+
+
+def is_valid_initials(initials):
+    return 0 < len(initials) <= MAX_INITIALS and initials.isalpha() and initials == initials.upper()
+
+
+def avatar_color(initials):
+    # Empreinte stable d'un processus à l'autre (hash() est randomisé)
+    digest = hashlib.md5(unicodedata.normalize('NFC', initials).encode()).digest()
+    return PALETTE[digest[0] % len(PALETTE)]
+
+
+@lru_cache(maxsize=4096)
+def render_initials_svg(initials):
+    """(contenu SVG, ETag) pour des initiales déjà validées"""
+    svg = SVG_TEMPLATE.format(
+        color=avatar_color(initials),
+        size=30 if len(initials) == 1 else 26,
+        text=escape(initials),
+    ).encode()
+    return svg, hashlib.sha1(svg).hexdigest()
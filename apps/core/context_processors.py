@@ -0,0 +1,5 @@
+# apps/core/context_processors.py
+
+def lite_mode(request):
+    # Posé par LiteModeMiddleware (absent pour les requêtes qui ne l'ont pas traversé)
+    return {'lite_mode': getattr(request, 'lite_mode', False)}
@@ -0,0 +1,103 @@
+# apps/core/images.py
+"""
+Outils Pillow pour réduire les images uploadées :
+décodage réduit (draft/reduce), orientation EXIF appliquée, métadonnées
+supprimées, ré-encodage WebP (ou JPEG si WebP indisponible).
+"""
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django import forms
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+# Au-delà, on refuse l'image (protection mémoire / "decompression bomb")
+MAX_IMAGE_PIXELS = 40_000_000
+# Poids maximum d'un fichier envoyé (avant réduction)
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10 Mo
+
+WEBP_AVAILABLE = features.check('webp')
+
+
+def open_for_resize(fileobj, target_size):
+    """
+    Ouvre une image pour la réduire à `target_size` au maximum.
+    Les dimensions sont lues dans l'en-tête AVANT décodage ; pour les JPEG,
+    draft() décode directement à l'échelle 1/2, 1/4 ou 1/8 la plus proche.
+    """
+    img = Image.open(fileobj)
+    if img.width * img.height > MAX_IMAGE_PIXELS:
+        raise ValueError(f"Image trop grande ({img.width}x{img.height})")
+
+    img.draft('RGB', target_size)
+
+    # Palette, 16 bits... : reduce() moyennerait des index, on convertit d'abord
+    if img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        img = img.convert(_output_mode(img))
+
+    # Formats sans draft() (PNG, WebP...) : réduction entière rapide tant que
+    # le résultat reste plus grand que la cible, quelle que soit l'orientation.
+    # Faite AVANT exif_transpose() et convert(), qui copient l'image entière.
+    factor = min(img.width, img.height) // max(target_size)
+    if factor >= 2:
+        img = img.reduce(factor)
+
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert(_output_mode(img))
+    return img
+
+
+def _output_mode(img):
+    return 'RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB'
+
+
+def encode_variant(img, max_size, quality=80):
+    """
+    Réduit une copie de `img` dans `max_size` et l'encode sans métadonnées.
+    Retourne (ContentFile, extension).
+    """
+    variant = img.copy()
+    variant.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    if WEBP_AVAILABLE:
+        variant.save(buffer, 'WEBP', quality=quality, method=4)
+        extension = 'webp'
+    else:
+        if variant.mode == 'RGBA':
+            variant = variant.convert('RGB')
+        variant.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+        extension = 'jpg'
+
+    return ContentFile(buffer.getvalue()), extension
+
+
+def validate_upload(image, max_bytes=MAX_UPLOAD_SIZE):
+    """
+    Validation de formulaire : poids et nombre de pixels.
+    ImageField a déjà ouvert le fichier avec Pillow : `image.image` ne contient
+    que l'en-tête, les dimensions sont donc lues sans décoder l'image.
+    """
+    if image.size > max_bytes:
+        raise forms.ValidationError(
+            f"Cette photo est trop lourde ({max_bytes // (1024 * 1024)} Mo maximum)."
+        )
+
+    width, height = image.image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise forms.ValidationError("Cette photo est trop grande.")
+    return image
+
+
+def process_upload(uploaded_file, max_size, quality=82):
+    """
+    Réduit un fichier uploadé AVANT son enregistrement : une seule image
+    bornée à `max_size`, sans métadonnées. Retourne un ContentFile nommé,
+    à affecter directement à un ImageField.
+    """
+    uploaded_file.seek(0)
+    img = open_for_resize(uploaded_file, max_size)
+    content, extension = encode_variant(img, max_size, quality=quality)
+    content.name = f"{PurePosixPath(uploaded_file.name).stem}.{extension}"
+    return content
@@ -0,0 +1,110 @@
+# apps/core/management/commands/collect_orphan_media.py
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.core.media_gc import iter_media_files, referenced_names
+from apps.core.models import StoredFile
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime (ou met en quarantaine) par lots les fichiers de MEDIA_ROOT "
+        "qui ne sont plus référencés en base. Affiche le débit du parcours."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Liste les fichiers orphelins sans rien supprimer"
+        )
+        parser.add_argument(
+            '--quarantine', metavar='DOSSIER',
+            help="Déplace les orphelins dans ce dossier (arborescence conservée) au lieu de les supprimer"
+        )
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help="Ignore les fichiers modifiés depuis moins de N heures : uploads en cours (défaut : 24)"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Nombre de fichiers traités par lot (défaut : 500)"
+        )
+
+    def handle(self, *args, **options):
+        root = str(settings.MEDIA_ROOT)
+        quarantine = options['quarantine'] and os.path.abspath(options['quarantine'])
+        cutoff = time.time() - options['min_age'] * 3600
+
+        started = time.perf_counter()
+        referenced = referenced_names()
+        self.stdout.write(
+            f"{len(referenced)} fichier(s) référencé(s) lus en {time.perf_counter() - started:.2f} s"
+        )
+
+        stats = {'scanned': 0, 'scanned_bytes': 0, 'orphans': 0, 'orphan_bytes': 0, 'recent': 0}
+        batch = []
+        walk_started = time.perf_counter()
+
+        for name, entry in iter_media_files(root, exclude=[quarantine] if quarantine else ()):
+            stat = entry.stat(follow_symlinks=False)
+            stats['scanned'] += 1
+            stats['scanned_bytes'] += stat.st_size
+
+            if name in referenced:
+                continue
+            if stat.st_mtime > cutoff:
+                stats['recent'] += 1
+                continue
+
+            stats['orphans'] += 1
+            stats['orphan_bytes'] += stat.st_size
+            batch.append(name)
+            if len(batch) >= options['batch_size']:
+                self.process_batch(root, batch, quarantine, options['dry_run'])
+                batch = []
+
+        self.process_batch(root, batch, quarantine, options['dry_run'])
+        self.report(stats, time.perf_counter() - walk_started, options['dry_run'])
+
+    def process_batch(self, root, names, quarantine, dry_run):
+        if not names:
+            return
+
+        if dry_run:
+            for name in names:
+                self.stdout.write(f"  {name}")
+            return
+
+        for name in names:
+            path = os.path.join(root, *name.split('/'))
+            try:
+                if quarantine:
+                    target = os.path.join(quarantine, *name.split('/'))
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(path, target)
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass  # Déjà supprimé entre-temps
+
+        # Le fichier n'est plus dans le stockage : son compteur de références non plus
+        StoredFile.objects.filter(name__in=names).delete()
+
+    def report(self, stats, duration, dry_run):
+        duration = max(duration, 1e-6)
+        megabytes = stats['scanned_bytes'] / (1024 * 1024)
+        self.stdout.write(
+            f"Parcours : {stats['scanned']} fichier(s), {megabytes:.1f} Mo en {duration:.2f} s "
+            f"({stats['scanned'] / duration:.0f} fichiers/s, {megabytes / duration:.1f} Mo/s)"
+        )
+        if stats['recent']:
+            self.stdout.write(f"{stats['recent']} fichier(s) non référencé(s) trop récent(s), conservé(s)")
+
+        verb = "seraient libérés" if dry_run else "libérés"
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['orphans']} fichier(s) orphelin(s), "
+            f"{stats['orphan_bytes'] / (1024 * 1024):.1f} Mo {verb}."
+        ))
@@ -0,0 +1,36 @@
+# apps/core/management/commands/generate_thumbnails.py
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from apps.core.thumbnails import THUMBNAIL_FIELDS, generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Génère les miniatures manquantes des avatars et photos de profil existants"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Nombre d'objets lus par requête (défaut : 500)"
+        )
+
+    def handle(self, *args, **options):
+        for (app_label, model_name), field_name in THUMBNAIL_FIELDS.items():
+            model = apps.get_model(app_label, model_name)
+            pks = (
+                model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                .order_by('pk').values_list('pk', flat=True)
+            )
+
+            count = 0
+            for pk in pks.iterator(chunk_size=options['batch_size']):
+                try:
+                    generate_thumbnails(app_label, model_name, pk, field_name)
+                except Exception as exc:
+                    self.stderr.write(f"  {model_name} {pk} : {exc}")
+                    continue
+                count += 1
+
+            self.stdout.write(f"  {model_name}.{field_name} : {count} fichier(s) traité(s)")
+
+        self.stdout.write(self.style.SUCCESS("Terminé."))
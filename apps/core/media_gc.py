@@ -0,0 +1,105 @@
+# apps/core/media_gc.py
+"""
+Ramasse-miettes des médias : fichiers de MEDIA_ROOT que plus rien ne référence
+(anciennes couvertures supprimées par queryset, avatars remplacés, messages
+supprimés...).
+
+Les noms référencés sont lus en flux depuis la base dans un set :
+- tous les FileField / ImageField des modèles, et leurs valeurs par défaut ;
+- les images des messages archivés (blobs MessageArchive) ;
+- les médias cités dans le HTML des champs CKEditor (blog) ;
+- les miniatures easy_thumbnails de ces fichiers.
+MEDIA_ROOT est ensuite parcouru avec os.scandir ; un fichier absent du set
+est orphelin. Voir la commande collect_orphan_media.
+"""
+import os
+import re
+from urllib.parse import unquote
+
+from ckeditor_uploader.fields import RichTextUploadingField
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+
+CHUNK_SIZE = 2000
+
+
+def _field_names(model, field):
+    """Noms non vides d'une colonne fichier, sans charger les instances"""
+    return (
+        model._default_manager.exclude(**{f'{field.name}__isnull': True})
+        .exclude(**{field.name: ''})
+        .values_list(field.name, flat=True)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def _rich_text_names(model, field):
+    """Chemins MEDIA_URL cités dans le HTML (src/href) d'un champ CKEditor"""
+    media_re = re.compile(r'["\'(]%s([^"\')?#\s]+)' % re.escape(settings.MEDIA_URL))
+    texts = model._default_manager.values_list(field.name, flat=True).iterator(chunk_size=CHUNK_SIZE)
+    for text in texts:
+        for path in media_re.findall(text or ''):
+            yield unquote(path)
+
+
+def _archived_message_names():
+    from apps.messaging.archive import archived_file_names, unpack_messages
+    from apps.messaging.models import MessageArchive
+
+    payloads = MessageArchive.objects.values_list('payload', flat=True).iterator(chunk_size=50)
+    for payload in payloads:
+        yield from archived_file_names(unpack_messages(payload))
+
+
+def referenced_names():
+    """Set des chemins (relatifs à MEDIA_ROOT) encore utilisés"""
+    referenced = set()
+
+    for model in apps.get_models():
+        if model._meta.proxy or not model._meta.managed:
+            continue
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                referenced.update(_field_names(model, field))
+                # Image par défaut partagée (ex. avatars/default.png) : à garder
+                # même si plus aucune ligne ne la référence aujourd'hui
+                if isinstance(field.default, str) and field.default:
+                    referenced.add(field.default)
+            elif isinstance(field, RichTextUploadingField):
+                referenced.update(_rich_text_names(model, field))
+
+    referenced.update(_archived_message_names())
+
+    if apps.is_installed('easy_thumbnails'):
+        from easy_thumbnails.models import Thumbnail
+
+        thumbnails = Thumbnail.objects.values_list('name', 'source__name').iterator(chunk_size=CHUNK_SIZE)
+        referenced.update(name for name, source_name in thumbnails if source_name in referenced)
+
+    return referenced
+
+
+def iter_media_files(root, exclude=()):
+    """
+    Parcourt `root` avec os.scandir (pas de stat supplémentaire : les entrées
+    portent déjà leur type). Produit (nom relatif avec '/', DirEntry).
+    Les fichiers et dossiers cachés, et les dossiers de `exclude`, sont ignorés.
+    """
+    root = os.path.abspath(root)
+    exclude = {os.path.abspath(path) for path in exclude}
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.path not in exclude:
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield os.path.relpath(entry.path, root).replace(os.sep, '/'), entry
+        except FileNotFoundError:
+            continue  # Dossier supprimé pendant le parcours
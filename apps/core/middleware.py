@@ -0,0 +1,79 @@
+# apps/core/middleware.py
+"""
+Mode "lite" pour les connexions lentes (2G/3G, forfaits limités).
+
+Activé par l'en-tête Save-Data ou l'ECT (Effective Connection Type, client
+hint de Chromium), ou forcé dans un sens ou dans l'autre par l'utilisateur
+(cookie posé par apps.core.views.toggle_lite_mode). Les templates lisent
+la variable `lite_mode` (apps.core.context_processors.lite_mode) : petites
+miniatures, pas de police externe, pas d'avatar tiers.
+"""
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+
+logger = logging.getLogger(__name__)
+
+LITE_COOKIE = 'lite_mode'
+SLOW_CONNECTIONS = {'slow-2g', '2g', '3g'}
+
+
+def is_lite_request(request):
+    """Choix explicite de l'utilisateur d'abord, sinon les indices du navigateur"""
+    choice = request.COOKIES.get(LITE_COOKIE)
+    if choice in ('0', '1'):
+        return choice == '1'
+    return (
+        request.headers.get('Save-Data', '').lower() == 'on'
+        or request.headers.get('ECT', '').lower() in SLOW_CONNECTIONS
+    )
+
+
+class LiteModeMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.lite_mode = is_lite_request(request)
+        response = self.get_response(request)
+
+        # Le même URL rend deux pages différentes : les caches doivent le savoir
+        patch_vary_headers(response, ('Save-Data', 'ECT'))
+        # Demande au navigateur d'envoyer l'ECT dans les requêtes suivantes
+        response.setdefault('Accept-CH', 'ECT')
+        return response
+
+
+class WriteCounter:
+    """Compte les INSERT / UPDATE / DELETE de la connexion (connection.execute_wrapper)"""
+
+    WRITE_VERBS = ('INSERT', 'UPDATE', 'DELETE')
+
+    def __init__(self):
+        self.writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip()[:6].upper() in self.WRITE_VERBS:
+            self.writes += 1
+        return execute(sql, params, many, context)
+
+
+class WriteCountMiddleware:
+    """DEBUG uniquement : journalise le nombre d'écritures SQL de chaque requête"""
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = WriteCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        if counter.writes:
+            logger.debug("%s %s : %s écriture(s) SQL", request.method, request.path, counter.writes)
+        return response
@@ -1,4 +1,72 @@
 from django.db import models
+from django.db.models.fields.files import FieldFile
+
+
+class DirtyFieldsMixin:
+    """
+    Suivi des champs modifiés depuis le chargement (à placer avant models.Model).
+    save() sans update_fields n'écrit que les colonnes modifiées (+ auto_now),
+    et ne fait rien du tout si aucune ne l'est : pas d'UPDATE, pas de post_save.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_fields()
+        return instance
+
+    def _comparable_value(self, field):
+        value = getattr(self, field.attname)
+        # Un FieldFile est comparé sur son nom (un nouvel upload change le nom)
+        return value.name if isinstance(value, FieldFile) else value
+
+    def _snapshot_fields(self, fields=None):
+        """Mémorise les valeurs actuelles de `fields` (noms ou attnames), ou de tous les champs chargés"""
+        deferred = self.get_deferred_fields()
+        snapshot = getattr(self, '_loaded_values', {}) if fields is not None else {}
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred:
+                continue
+            if fields is not None and field.name not in fields and field.attname not in fields:
+                continue
+            snapshot[field.attname] = self._comparable_value(field)
+        self._loaded_values = snapshot
+
+    def get_dirty_fields(self):
+        """Noms des champs modifiés, ou None si l'instance n'a pas été chargée depuis la base"""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        dirty = []
+        for field in self._meta.concrete_fields:
+            if field.attname in loaded:
+                if self._comparable_value(field) != loaded[field.attname]:
+                    dirty.append(field.name)
+            elif field.attname in self.__dict__:
+                dirty.append(field.name)  # Champ différé puis affecté
+        return dirty
+
+    def save(self, **kwargs):
+        dirty = None
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            dirty = self.get_dirty_fields()
+
+        if dirty is not None and self._meta.pk.name not in dirty:
+            if not dirty:
+                return
+            auto_now = [
+                field.name for field in self._meta.concrete_fields
+                if getattr(field, 'auto_now', False) and field.name not in dirty
+            ]
+            kwargs['update_fields'] = dirty + auto_now
+
+        super().save(**kwargs)
+        self._snapshot_fields(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot_fields(fields)
+
 
 class ContactMessage(models.Model):
     name = models.CharField(max_length=100, verbose_name="Nom")
@@ -13,4 +81,21 @@ class ContactMessage(models.Model):
         verbose_name = "Message de contact"
 
     def __str__(self):
-        return f"Message de {self.name} - {self.subject}"
\ No newline at end of file
+        return f"Message de {self.name} - {self.subject}"
+
+class StoredFile(models.Model):
+    """
+    Fichier du stockage adressé par contenu (apps.core.storage) et nombre
+    de champs qui le référencent. Le fichier est supprimé à refcount 0.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Fichier stocké"
+        verbose_name_plural = "Fichiers stockés"
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} réf.)"
@@ -0,0 +1,118 @@
+# apps/core/pagination.py
+"""
+Pagination sans COUNT(*) à chaque page.
+
+CachedCountPaginator garde le total en cache quelques minutes. Sur
+PostgreSQL et MySQL, au-delà de EXACT_COUNT_BELOW lignes, le total vient de
+l'estimation du planificateur (EXPLAIN FORMAT=JSON : lignes estimées après
+filtres) au lieu d'un COUNT(*) ; SQLite n'a pas d'estimation et compte
+toujours. La page lit per_page + 1 lignes : "page suivante" ne dépend
+jamais du total, qui ne sert qu'à l'affichage.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Totaux recalculés au plus toutes les 10 minutes
+COUNT_CACHE_TTL = 600
+# En dessous, un COUNT(*) exact reste peu coûteux
+EXACT_COUNT_BELOW = 10_000
+
+
+def _mysql_plan_rows(plan):
+    """Lignes estimées du premier accès table d'un plan MySQL / MariaDB"""
+    block = plan['query_block']
+    table = block.get('table') or block['nested_loop'][0]['table']
+    # MySQL : rows_produced_per_join (après `filtered`) ; MariaDB : rows
+    return table.get('rows_produced_per_join', table.get('rows'))
+
+
+def estimated_count(queryset):
+    """Nombre de lignes estimé par le planificateur (PostgreSQL, MySQL), ou None ailleurs"""
+    vendor = connections[queryset.db].vendor
+    if vendor not in ('postgresql', 'mysql'):
+        return None
+
+    # values('pk') : pas de jointures select_related dans le plan
+    plan = json.loads(queryset.order_by().values('pk').explain(format='json'))
+    try:
+        if vendor == 'postgresql':
+            return int(plan[0]['Plan']['Plan Rows'])
+        return int(_mysql_plan_rows(plan))
+    except (KeyError, IndexError, TypeError):
+        # Format de plan inattendu : le COUNT(*) exact reste la référence
+        return None
+
+
+class LookaheadPage(Page):
+    """Page dont has_next() vient de la ligne lue en plus, pas du total"""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def start_index(self):
+        return (self.number - 1) * self.paginator.per_page + 1 if self.object_list else 0
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator avec total mis en cache (éventuellement estimé : is_estimate)
+    et pages lues par anticipation. Les `orphans` ne sont pas gérés.
+    """
+
+    def count_cache_key(self):
+        sql = str(self.object_list.order_by().query)
+        return f"paginator-count:{hashlib.md5(sql.encode()).hexdigest()}"
+
+    @cached_property
+    def _count_and_estimate(self):
+        key = self.count_cache_key()
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        count, is_estimate = estimated_count(self.object_list), True
+        if count is None or count < EXACT_COUNT_BELOW:
+            count, is_estimate = self.object_list.count(), False
+
+        cache.set(key, (count, is_estimate), COUNT_CACHE_TTL)
+        return count, is_estimate
+
+    @cached_property
+    def count(self):
+        return self._count_and_estimate[0]
+
+    @property
+    def is_estimate(self):
+        return self._count_and_estimate[1]
+
+    def validate_number(self, number):
+        # Pas de borne supérieure : le total peut être estimé ou périmé
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        return LookaheadPage(rows[:self.per_page], number, self, has_next=len(rows) > self.per_page)
@@ -0,0 +1,123 @@
+# apps/core/ratelimit.py
+"""
+Limitation de débit par "token bucket", stockée dans le cache.
+
+Chaque règle a une capacité (rafale autorisée) et se recharge de
+`capacity` jetons par `per_seconds`. L'état (jetons, horodatage) d'un
+utilisateur est lu et réécrit sous un verrou posé avec cache.add(),
+opération atomique sur tous les backends de cache Django.
+"""
+import json
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Surchargeables via settings.RATE_LIMITS
+DEFAULT_RATE_LIMITS = {
+    # 20 messages d'affilée, puis 1 toutes les 3 secondes
+    'message_send': {'capacity': 20, 'per_seconds': 60},
+    # Nouvelles conversations par heure
+    'thread_create': {'capacity': 10, 'per_seconds': 3600},
+    # Likes par minute
+    'like': {'capacity': 30, 'per_seconds': 60},
+    # Lots de swipes (API mobile) par minute, jusqu'à MAX_SWIPES_PER_BATCH chacun
+    'swipe_batch': {'capacity': 10, 'per_seconds': 60},
+}
+
+LOCK_TTL = 2
+LOCK_ATTEMPTS = 5
+STATS_TTL = 2 * 24 * 3600
+
+
+def get_rule(name):
+    rules = {**DEFAULT_RATE_LIMITS, **getattr(settings, 'RATE_LIMITS', {})}
+    return rules[name]
+
+
+def record_hit(name):
+    """Compteur horaire des requêtes refusées par règle (consultable avec get_hits)"""
+    key = f"ratelimit-stats:{name}:{timezone.now():%Y%m%d%H}"
+    cache.add(key, 0, STATS_TTL)
+    try:
+        cache.incr(key)
+    except ValueError:  # clé expirée entre add() et incr()
+        cache.set(key, 1, STATS_TTL)
+
+
+def get_hits(name, hour=None):
+    hour = hour or timezone.now()
+    return cache.get(f"ratelimit-stats:{name}:{hour:%Y%m%d%H}", 0)
+
+
+def consume(name, identity, cost=1):
+    """
+    Tente de consommer `cost` jetons de la règle `name` pour `identity`.
+    Retourne (autorisé, secondes avant nouvel essai).
+    """
+    rule = get_rule(name)
+    capacity = rule['capacity']
+    rate = capacity / rule['per_seconds']
+    key = f"ratelimit:{name}:{identity}"
+    lock_key = f"{key}:lock"
+
+    for _ in range(LOCK_ATTEMPTS):
+        if cache.add(lock_key, 1, LOCK_TTL):
+            break
+        time.sleep(0.01)
+    else:
+        # Contention extrême sur une même clé : on laisse passer plutôt que de bloquer la requête
+        logger.warning("Verrou de limitation indisponible pour %s", key)
+        return True, 0
+
+    try:
+        now = time.time()
+        tokens, updated_at = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * rate)
+
+        if tokens >= cost:
+            tokens -= cost
+            allowed, retry_after = True, 0
+        else:
+            allowed, retry_after = False, math.ceil((cost - tokens) / rate)
+
+        # Au-delà de ce délai le seau est plein : inutile de garder la clé
+        cache.set(key, (tokens, now), math.ceil(rule['per_seconds']) + 60)
+    finally:
+        cache.delete(lock_key)
+
+    if not allowed:
+        record_hit(name)
+        logger.info("Limite '%s' atteinte pour %s (réessai dans %s s)", name, identity, retry_after)
+
+    return allowed, retry_after
+
+
+def rate_limited_response(request, retry_after):
+    """Réponse 429 avec Retry-After ; pour HTMX, un événement `rateLimited` est déclenché"""
+    message = f"Trop de requêtes, réessayez dans {retry_after} s."
+
+    if request.headers.get('HX-Request'):
+        response = HttpResponse(f'<div class="text-red-500 p-2">{message}</div>', status=429)
+        response['HX-Trigger'] = json.dumps({'rateLimited': {'retry_after': retry_after}})
+    elif 'application/json' in request.headers.get('Accept', ''):
+        response = JsonResponse({'error': message, 'retry_after': retry_after}, status=429)
+    else:
+        response = HttpResponse(message, status=429)
+
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def check_rate_limit(request, name, cost=1):
+    """None si la requête est autorisée, sinon la réponse 429 à renvoyer"""
+    allowed, retry_after = consume(name, request.user.pk, cost)
+    if allowed:
+        return None
+    return rate_limited_response(request, retry_after)
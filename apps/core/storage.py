@@ -0,0 +1,193 @@
+# apps/core/storage.py
+"""
+Stockage des médias adressé par contenu.
+
+Le nom d'un fichier est l'empreinte de ses octets, rangée dans le dossier
+demandé par le champ (upload_to) :
+    profile_images/3f/3f9a...c1.webp
+Le même fichier envoyé deux fois n'est donc écrit qu'une fois ; chaque
+enregistrement incrémente son compteur de références (StoredFile) et
+delete() ne supprime le fichier qu'à la dernière référence. Les fichiers
+remplacés ou dont la ligne est supprimée sont libérés par les signaux
+branchés par connect_signals().
+
+Un nom ne désigne jamais deux contenus différents : son URL peut être mise
+en cache indéfiniment (voir IMMUTABLE_CACHE_CONTROL et apps.core.views.serve_media).
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from functools import partial
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+
+logger = logging.getLogger(__name__)
+
+# 20 octets (40 caractères hexa) : noms courts, sous le max_length=100 des FileField
+DIGEST_SIZE = 20
+
+# Fichier adressé par contenu, ou miniature easy_thumbnails d'un tel fichier
+CONTENT_ADDRESSED_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{%d}\.' % (DIGEST_SIZE * 2))
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def content_digest(content):
+    """Empreinte BLAKE2b du fichier, lu par blocs (le curseur est remis au début)"""
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def content_addressed_name(name, digest):
+    """'avatars/Photo.JPG' + empreinte -> 'avatars/ab/ab12...ef.jpg'"""
+    path = PurePosixPath(name)
+    return str(path.parent / digest[:2] / f"{digest}{path.suffix.lower()}")
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_ADDRESSED_RE.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage dédoublonné par empreinte, avec comptage de références"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._writing = threading.local()
+
+    def get_available_name(self, name, max_length=None):
+        # Le nom final dépend du contenu (_save) : pas de suffixe aléatoire.
+        # Pendant l'écriture, FileSystemStorage ne redemande un nom que si le
+        # fichier existe déjà : même empreinte, donc même contenu, on s'arrête là.
+        if getattr(self._writing, 'name', None) == name:
+            raise FileExistsError(name)
+        return name
+
+    def _save(self, name, content):
+        from .models import StoredFile
+
+        name = content_addressed_name(name, content_digest(content))
+
+        reused = self.exists(name)
+        if not reused:
+            self._writing.name = name
+            try:
+                super()._save(name, content)
+            except FileExistsError:
+                reused = True  # Écriture concurrente du même contenu : le fichier présent est notre copie
+            finally:
+                self._writing.name = None
+
+        if reused:
+            # Fichier réutilisé tel quel : sa date de modification doit refléter ce
+            # nouvel upload, sinon collect_orphan_media (--min-age) le croirait ancien
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                pass
+
+        try:
+            with transaction.atomic():
+                StoredFile.objects.create(name=name, size=self.size(name))
+        except IntegrityError:
+            StoredFile.objects.filter(name=name).update(refcount=F('refcount') + 1)
+        return name
+
+    def delete(self, name):
+        """Retire une référence ; le fichier n'est supprimé qu'à la dernière"""
+        from .models import StoredFile
+
+        if not name:
+            return
+
+        with transaction.atomic():
+            entry = StoredFile.objects.select_for_update().filter(name=name).first()
+            if entry is not None and entry.refcount > 1:
+                StoredFile.objects.filter(pk=entry.pk).update(refcount=F('refcount') - 1)
+                return
+            if entry is not None:
+                entry.delete()
+            # Après le commit : un rollback ne doit pas laisser une ligne sans fichier
+            transaction.on_commit(partial(super().delete, name))
+
+        logger.debug("Dernière référence supprimée : %s", name)
+
+    def retain(self, names):
+        """Ajoute une référence à des fichiers déjà stockés (ex. repris par une archive)"""
+        from .models import StoredFile
+
+        counts = Counter(filter(None, names))
+        for name, count in counts.items():
+            StoredFile.objects.filter(name=name).update(refcount=F('refcount') + count)
+
+
+def content_addressed_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def _releasable(field, name):
+    # Valeur par défaut partagée (ex. avatars/default.png) : jamais comptée
+    return bool(name) and name != field.default
+
+
+def remember_replaced_files(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save : note les fichiers que cette sauvegarde va remplacer"""
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    fields = [
+        field for field in content_addressed_fields(sender)
+        if update_fields is None or field.name in update_fields
+    ]
+    if not fields:
+        return
+
+    previous = sender._base_manager.filter(pk=instance.pk).values(*[field.attname for field in fields]).first()
+    if previous is None:
+        return
+
+    replaced = []
+    for field in fields:
+        fieldfile = getattr(instance, field.attname)
+        old_name = previous[field.attname]
+        # Fichier non encore écrit : même à contenu identique, _save prendra une référence de plus
+        if _releasable(field, old_name) and (old_name != fieldfile.name or not fieldfile._committed):
+            replaced.append((field, old_name))
+    instance._replaced_files = replaced
+
+
+def release_replaced_files(sender, instance, raw=False, **kwargs):
+    """post_save : libère les fichiers remplacés, une fois le nouveau enregistré"""
+    for field, name in instance.__dict__.pop('_replaced_files', ()):
+        field.storage.delete(name)
+
+
+def release_deleted_files(sender, instance, **kwargs):
+    """post_delete : libère les fichiers de la ligne supprimée"""
+    for field in content_addressed_fields(sender):
+        name = getattr(instance, field.attname).name
+        if _releasable(field, name):
+            field.storage.delete(name)
+
+
+def connect_signals():
+    """Branche la libération des références sur les modèles concernés (appelé par CoreConfig.ready)"""
+    for model in apps.get_models():
+        if content_addressed_fields(model):
+            pre_save.connect(remember_replaced_files, sender=model)
+            post_save.connect(release_replaced_files, sender=model)
+            post_delete.connect(release_deleted_files, sender=model)
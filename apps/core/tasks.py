@@ -0,0 +1,68 @@
+# apps/core/tasks.py
+"""
+Exécution de tâches en arrière-plan dans un pool de threads du processus web.
+Pas de broker (Celery/Redis) : suffisant pour les traitements courts
+(redimensionnement d'images...) qui ne doivent pas bloquer la réponse HTTP.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    """Pool de workers partagé, créé à la première utilisation"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+            thread_name_prefix='benin-match-worker',
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    # Chaque worker a sa propre connexion DB : on la recycle avant et après la tâche
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Échec de la tâche d'arrière-plan %s", func.__name__)
+    finally:
+        close_old_connections()
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Planifie `func(*args, **kwargs)` après le commit de la transaction courante
+    (les lignes créées sont donc visibles par le worker).
+    Avec BACKGROUND_TASKS_EAGER = True (tests), la tâche s'exécute immédiatement.
+    """
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        func(*args, **kwargs)
+        return
+    transaction.on_commit(lambda: get_executor().submit(_run, func, args, kwargs))
+
+
+def run_later(delay, func, *args, **kwargs):
+    """
+    Comme run_in_background(), mais `delay` secondes après le commit
+    (minuteur démon, puis pool de workers).
+    Avec BACKGROUND_TASKS_EAGER = True (tests), la tâche s'exécute immédiatement.
+    """
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        func(*args, **kwargs)
+        return
+
+    def start_timer():
+        timer = threading.Timer(delay, lambda: get_executor().submit(_run, func, args, kwargs))
+        timer.daemon = True
+        timer.start()
+
+    transaction.on_commit(start_timer)
@@ -0,0 +1,19 @@
+# apps/core/templatetags/avatars.py
+from django import template
+from django.urls import reverse
+
+from apps.core.avatars import initials_for
+
+register = template.Library()
+
+
+@register.filter
+def initials_avatar(value):
+    """{{ profile.user|initials_avatar }} ou {{ 'Benin Match'|initials_avatar }} -> URL du SVG d'initiales"""
+    return reverse('core:initials_avatar', args=[initials_for(value)])
+
+
+@register.filter
+def initials(value):
+    """{{ profile.user|initials }} -> 'AT' : les mêmes lettres que l'avatar SVG, en texte (mode lite)"""
+    return initials_for(value)
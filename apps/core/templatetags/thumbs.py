@@ -0,0 +1,12 @@
+# apps/core/templatetags/thumbs.py
+from django import template
+
+from apps.core.thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumb(fieldfile, alias):
+    """{{ user.avatar|thumb:'card' }} -> URL de la miniature (ou de l'original si pas encore prête)"""
+    return thumbnail_url(fieldfile, alias)
@@ -0,0 +1,115 @@
+# apps/core/thumbnails.py
+"""
+Miniatures nommées (settings.THUMBNAIL_ALIASES) des avatars et photos de profil.
+
+Les miniatures sont générées dès l'upload, dans le pool d'arrière-plan
+(apps.core.tasks), jamais pendant le rendu d'une page : le filtre de
+template `thumb` ne fait que retrouver l'URL d'une miniature existante
+(mise en cache) et retombe sur l'original tant qu'elle n'est pas prête.
+"""
+import logging
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models.signals import post_save, pre_save
+from easy_thumbnails import signal_handlers
+from easy_thumbnails.alias import aliases
+from easy_thumbnails.files import generate_all_aliases, get_thumbnailer
+from easy_thumbnails.signals import saved_file
+
+from .tasks import run_in_background
+
+logger = logging.getLogger(__name__)
+
+# Champs dont les miniatures sont générées à l'upload
+THUMBNAIL_FIELDS = {
+    ('users', 'User'): 'avatar',
+    ('profiles', 'ProfileImage'): 'image',
+}
+
+URL_CACHE_TTL = 24 * 3600
+# Évite de replanifier la même génération à chaque affichage
+PENDING_TTL = 300
+
+
+def url_cache_key(name, alias):
+    return f"thumb-url:{alias}:{name}"
+
+
+def thumbnail_url(fieldfile, alias):
+    """
+    URL de la miniature `alias` de `fieldfile`, sans jamais la générer ici.
+    Si elle n'existe pas encore, sa génération est planifiée et l'URL de
+    l'original est renvoyée.
+    """
+    if not fieldfile:
+        return ''
+
+    key = url_cache_key(fieldfile.name, alias)
+    url = cache.get(key)
+    if url:
+        return url
+
+    options = aliases.get(alias, target=fieldfile)
+    if options is None:
+        return fieldfile.url
+
+    try:
+        existing = get_thumbnailer(fieldfile).get_existing_thumbnail(options)
+    except Exception:
+        logger.exception("Miniature '%s' illisible pour %s", alias, fieldfile.name)
+        existing = None
+
+    if existing:
+        cache.set(key, existing.url, URL_CACHE_TTL)
+        return existing.url
+
+    if cache.add(f"thumb-pending:{fieldfile.name}", 1, PENDING_TTL):
+        try:
+            queue_thumbnails(fieldfile)
+        except Exception:
+            # Mode eager (tests) : un original illisible ne doit pas casser le rendu
+            logger.exception("Génération des miniatures impossible pour %s", fieldfile.name)
+    return fieldfile.url
+
+
+def generate_thumbnails(app_label, model_name, pk, field_name):
+    """Tâche d'arrière-plan : génère toutes les miniatures du fichier et met leurs URL en cache"""
+    model = apps.get_model(app_label, model_name)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return  # Supprimé entre-temps
+    fieldfile = getattr(instance, field_name)
+    if not fieldfile:
+        return
+
+    generate_all_aliases(fieldfile, include_global=False)
+
+    thumbnailer = get_thumbnailer(fieldfile)
+    for alias, options in aliases.all(fieldfile, include_global=False).items():
+        existing = thumbnailer.get_existing_thumbnail(options)
+        if existing:
+            cache.set(url_cache_key(fieldfile.name, alias), existing.url, URL_CACHE_TTL)
+
+
+def queue_thumbnails(fieldfile):
+    instance = fieldfile.instance
+    run_in_background(
+        generate_thumbnails,
+        instance._meta.app_label, instance._meta.object_name, instance.pk, fieldfile.field.name,
+    )
+
+
+def on_saved_file(sender, fieldfile, **kwargs):
+    """Signal easy_thumbnails.saved_file : un fichier vient d'être enregistré"""
+    if THUMBNAIL_FIELDS.get((sender._meta.app_label, sender._meta.object_name)) == fieldfile.field.name:
+        queue_thumbnails(fieldfile)
+
+
+def connect_signals():
+    """Branche la génération à l'upload (appelé par CoreConfig.ready)"""
+    for app_label, model_name in THUMBNAIL_FIELDS:
+        model = apps.get_model(app_label, model_name)
+        pre_save.connect(signal_handlers.find_uncommitted_filefields, sender=model)
+        post_save.connect(signal_handlers.signal_committed_filefields, sender=model)
+    saved_file.connect(on_saved_file)
@@ -1,10 +1,13 @@
 from django.urls import path
-from .views import HomePageView, AboutPageView, ContactPageView
+from .avatars import AVATAR_VERSION
+from .views import HomePageView, AboutPageView, ContactPageView, initials_avatar, toggle_lite_mode
 
 app_name = 'core'
 
 urlpatterns = [
     path('', HomePageView.as_view(), name='home'), 
     path('about/', AboutPageView.as_view(), name='about'), 
+    path('lite/', toggle_lite_mode, name='lite_mode'),
+    path(f'avatars/v{AVATAR_VERSION}/<str:initials>.svg', initials_avatar, name='initials_avatar'),
    # path('contact/', ContactPageView.as_view(), name='contact'),
 ]
\ No newline at end of file
@@ -1,8 +1,16 @@
 from django.views.generic import TemplateView, CreateView
 from django.urls import reverse_lazy
 from django.contrib import messages
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import condition, require_POST
+from django.views.static import serve
 from apps.blog.models import Post  # On garde le blog pour le contenu éditorial
+from .avatars import is_valid_initials, render_initials_svg
 from .forms import ContactForm
+from .middleware import LITE_COOKIE
+from .storage import IMMUTABLE_CACHE_CONTROL, is_content_addressed
 
 class HomePageView(TemplateView):
     template_name = "core/index.html"
@@ -31,4 +39,51 @@ class ContactPageView(CreateView):
     def form_valid(self, form):
         form.save()
         messages.success(self.request, "Votre message a été envoyé avec succès !")
-        return super().form_valid(form)
\ No newline at end of file
+        return super().form_valid(form)
+
+
+def serve_media(request, path, document_root=None):
+    """
+    Sert MEDIA_ROOT en développement. Les fichiers adressés par contenu (et
+    leurs miniatures) ne changent jamais : cache navigateur d'un an, sans
+    revalidation. En production, le serveur frontal applique la même règle.
+    """
+    response = serve(request, path, document_root=document_root)
+    if response.status_code == 200 and is_content_addressed(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+@require_POST
+def toggle_lite_mode(request):
+    """Active/désactive le mode lite (cookie d'un an), puis revient sur la page"""
+    next_url = request.POST.get('next', '/')
+    if not url_has_allowed_host_and_scheme(next_url, {request.get_host()}, request.is_secure()):
+        next_url = '/'
+
+    response = redirect(next_url)
+    response.set_cookie(
+        LITE_COOKIE, '1' if request.POST.get('lite') == '1' else '0',
+        max_age=365 * 24 * 3600, samesite='Lax',
+    )
+    return response
+
+
+def _initials_etag(request, initials):
+    if is_valid_initials(initials):
+        return render_initials_svg(initials)[1]
+    return None
+
+
+@condition(etag_func=_initials_etag)
+def initials_avatar(request, initials):
+    """Avatar SVG d'initiales (remplace ui-avatars.com) ; If-None-Match -> 304"""
+    if not is_valid_initials(initials):
+        raise Http404("Initiales invalides")
+
+    svg, _ = render_initials_svg(initials)
+    response = HttpResponse(svg, content_type='image/svg+xml')
+    # Le contenu ne dépend que de l'URL (versionnée) : jamais revalidé
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'"
+    return response
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Message, Thread
+from .models import Message, MessageArchive, MessageNotification, Thread, ReadReceipt
 
 # --- 1. INLINE POUR LES MESSAGES (Affichage dans le Thread) ---
 class MessageInline(admin.TabularInline):
@@ -7,7 +7,7 @@ class MessageInline(admin.TabularInline):
     extra = 0  # Pas de ligne vide par défaut
     readonly_fields = ('sender', 'content', 'created_at', 'image')
     can_delete = False
-    fields = ('sender', 'content', 'created_at', 'image', 'is_read')
+    fields = ('sender', 'content', 'created_at', 'image')
 
 
 # --- 2. PAGE PRINCIPALE DES CONVERSATIONS ---
@@ -42,14 +42,32 @@ class ThreadAdmin(admin.ModelAdmin):
 # --- 3. PAGE DES MESSAGES ---
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
-    list_display = ('thread', 'sender', 'content', 'created_at', 'is_read')
-    list_filter = ('is_read', 'created_at')
+    list_display = ('thread', 'sender', 'content', 'created_at')
+    list_filter = ('created_at',)
     search_fields = ('content',)
-    
-    # Actions en masse
-    actions = ['mark_as_read']
 
-    def mark_as_read(self, request, queryset):
-        """Marquer tous les messages sélectionnés comme lus"""
-        queryset.update(is_read=True)
-    mark_as_read.short_description = "Marquer comme lu"
\ No newline at end of file
+
+# --- 4. ACCUSÉS DE LECTURE (curseur "lu jusqu'à") ---
+@admin.register(ReadReceipt)
+class ReadReceiptAdmin(admin.ModelAdmin):
+    list_display = ('thread', 'user', 'last_read_id', 'updated_at')
+    list_select_related = ('thread', 'user')
+    search_fields = ('user__email',)
+
+
+# --- 5. ARCHIVES (lecture seule, le contenu est compressé) ---
+@admin.register(MessageArchive)
+class MessageArchiveAdmin(admin.ModelAdmin):
+    list_display = ('thread', 'month', 'message_count', 'first_message_id', 'last_message_id', 'created_at')
+    list_filter = ('month',)
+    exclude = ('payload',)
+    readonly_fields = ('thread', 'month', 'message_count', 'first_message_id', 'last_message_id', 'created_at')
+
+
+# --- 6. BOÎTE D'ENVOI DES NOTIFICATIONS EMAIL ---
+@admin.register(MessageNotification)
+class MessageNotificationAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'message', 'created_at', 'attempts', 'next_attempt_at')
+    list_select_related = ('recipient', 'message')
+    raw_id_fields = ('recipient', 'message')
+    search_fields = ('recipient__email',)
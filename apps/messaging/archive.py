@@ -0,0 +1,175 @@
+# apps/messaging/archive.py
+"""
+Archivage froid des vieux messages.
+
+Les messages plus anciens que N mois sont regroupés par (thread, mois) dans
+un blob MessageArchive (msgpack + zlib) puis supprimés de la table Message,
+qui reste petite : inbox, polling et historique récent ne parcourent que
+des données "chaudes". Quand l'utilisateur remonte très loin dans une
+conversation, les blobs sont décompressés à la demande (message_history).
+
+La suppression emporte les lignes liées au message (CASCADE) : jetons de
+recherche (MessageToken) et notifications en attente. Les images restent :
+l'archive garde leur référence (voir apps.messaging.signals). Un message archivé
+reste lisible dans l'historique mais n'est plus trouvé par la recherche.
+"""
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import msgpack
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .models import Message, MessageArchive
+
+ARCHIVE_FORMAT_VERSION = 1
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _to_microseconds(value):
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def pack_messages(rows):
+    """rows : dicts issus de Message.values(...) -> blob compressé"""
+    packed = [
+        [
+            row['id'],
+            row['sender_id'],
+            row['content'],
+            row['image'] or '',
+            row['thumbnail'] or '',
+            _to_microseconds(row['created_at']),
+        ]
+        for row in rows
+    ]
+    return zlib.compress(msgpack.packb([ARCHIVE_FORMAT_VERSION, packed]), 6)
+
+
+def unpack_messages(payload):
+    """Blob compressé -> liste de dicts (même forme que pack_messages)"""
+    version, packed = msgpack.unpackb(zlib.decompress(bytes(payload)))
+    if version != ARCHIVE_FORMAT_VERSION:
+        raise ValueError(f"Format d'archive inconnu : {version}")
+    return [
+        {
+            'id': message_id,
+            'sender_id': sender_id,
+            'content': content,
+            'image': image,
+            'thumbnail': thumbnail,
+            'created_at': EPOCH + timedelta(microseconds=created_us),
+        }
+        for message_id, sender_id, content, image, thumbnail, created_us in packed
+    ]
+
+
+def archived_file_names(rows):
+    """Images (et miniatures) des messages, lignes issues de values() ou unpack_messages"""
+    for row in rows:
+        yield from filter(None, (row['image'], row['thumbnail']))
+
+
+def archive_thread_messages(thread_id, cutoff, batch_size=1000):
+    """
+    Archive les messages du thread créés avant `cutoff`, un blob par mois.
+    Chaque lot est écrit et supprimé dans la même transaction.
+    Retourne le nombre de messages archivés.
+    """
+    total = 0
+    fields = ('id', 'sender_id', 'content', 'image', 'thumbnail', 'created_at')
+
+    while True:
+        rows = list(
+            Message.objects.filter(
+                thread_id=thread_id, created_at__lt=cutoff
+            ).order_by('id').values(*fields)[:batch_size]
+        )
+        if not rows:
+            break
+
+        by_month = {}
+        for row in rows:
+            month = row['created_at'].date().replace(day=1)
+            by_month.setdefault(month, []).append(row)
+
+        archives = [
+            MessageArchive(
+                thread_id=thread_id,
+                month=month,
+                first_message_id=month_rows[0]['id'],
+                last_message_id=month_rows[-1]['id'],
+                message_count=len(month_rows),
+                payload=pack_messages(month_rows),
+            )
+            for month, month_rows in by_month.items()
+        ]
+
+        with transaction.atomic():
+            MessageArchive.objects.bulk_create(archives)
+            # L'archive reprend les références des images : la suppression des
+            # messages les libère, elles ne le seront qu'avec l'archive
+            default_storage.retain(archived_file_names(rows))
+            Message.objects.filter(id__in=[row['id'] for row in rows]).delete()
+
+        total += len(rows)
+
+    return total
+
+
+def load_archived_messages(thread, before=None, limit=50):
+    """
+    Réhydrate jusqu'à `limit` messages archivés avec id < before, du plus récent
+    au plus ancien. Retourne des instances Message NON sauvegardées, utilisables
+    telles quelles par les templates du chat.
+    """
+    archives = MessageArchive.objects.filter(thread=thread).order_by('-last_message_id')
+    if before:
+        archives = archives.filter(first_message_id__lt=before)
+
+    rows = []
+    # Les blobs sont décompressés un par un, seulement tant qu'il en faut
+    for archive in archives.iterator(chunk_size=10):
+        archived = [row for row in unpack_messages(archive.payload) if not before or row['id'] < before]
+        rows.extend(sorted(archived, key=lambda row: row['id'], reverse=True))
+        if len(rows) >= limit:
+            break
+    rows = rows[:limit]
+
+    senders = get_user_model().objects.in_bulk({row['sender_id'] for row in rows})
+    messages = []
+    for row in rows:
+        if row['sender_id'] not in senders:
+            continue  # Expéditeur supprimé depuis l'archivage
+        message = Message(
+            id=row['id'],
+            thread=thread,
+            sender_id=row['sender_id'],
+            content=row['content'],
+            image=row['image'] or None,
+            thumbnail=row['thumbnail'] or None,
+            created_at=row['created_at'],
+        )
+        message.sender = senders[row['sender_id']]
+        messages.append(message)
+    return messages
+
+
+def message_history(thread, before=None, limit=50):
+    """
+    Lot de messages plus anciens que `before` (du plus récent au plus ancien).
+    D'abord la table Message (index (thread_id, id)), puis les archives si le
+    lot n'est pas complet. Retourne (messages, has_older).
+    """
+    live = thread.messages.select_related('sender').order_by('-id')
+    if before:
+        live = live.filter(id__lt=before)
+
+    batch = list(live[:limit + 1])
+    if len(batch) <= limit:
+        archive_before = batch[-1].id if batch else before
+        batch += load_archived_messages(thread, archive_before, limit + 1 - len(batch))
+
+    return batch[:limit], len(batch) > limit
@@ -1,5 +1,6 @@
 # apps/messaging/forms.py
 from django import forms
+from apps.core.images import MAX_UPLOAD_SIZE, validate_upload
 from .models import Message
 
 class MessageForm(forms.ModelForm):
@@ -25,6 +26,13 @@ class MessageForm(forms.ModelForm):
         model = Message
         fields = ['content', 'image']
     
+    def clean_image(self):
+        """Refuse les fichiers trop lourds ou trop grands (dimensions lues dans l'en-tête, sans décodage)"""
+        image = self.cleaned_data.get('image')
+        if not image:
+            return image
+        return validate_upload(image, max_bytes=MAX_UPLOAD_SIZE)
+
     def clean(self):
         cleaned_data = super().clean()
         content = cleaned_data.get('content')
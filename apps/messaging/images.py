@@ -0,0 +1,45 @@
+# apps/messaging/images.py
+"""
+Traitement des photos envoyées dans le chat : on ne garde jamais l'original
+plein format. Deux variantes bornées sont produites :
+- `image` : version "plein écran" (lien depuis la bulle)
+- `thumbnail` : miniature affichée dans la conversation
+"""
+import logging
+from pathlib import PurePosixPath
+
+from apps.core.images import open_for_resize, encode_variant
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+FULL_SIZE = (1600, 1600)
+THUMBNAIL_SIZE = (320, 320)
+
+
+def process_message_image(message_id):
+    """Remplace l'image d'un message par ses variantes réduites (exécuté en arrière-plan)"""
+    message = Message.objects.filter(id=message_id).first()
+    if not message or not message.image or message.thumbnail:
+        return
+
+    original_name = message.image.name
+    storage = message.image.storage
+
+    with message.image.open('rb') as fileobj:
+        # Un seul décodage, à l'échelle de la plus grande variante
+        img = open_for_resize(fileobj, FULL_SIZE)
+        full_file, extension = encode_variant(img, FULL_SIZE, quality=80)
+        thumb_file, _ = encode_variant(img, THUMBNAIL_SIZE, quality=70)
+
+    stem = PurePosixPath(original_name).stem
+    full_name = storage.save(f"message_images/{stem}.{extension}", full_file)
+    thumb_name = storage.save(f"message_images/thumbs/{stem}.{extension}", thumb_file)
+
+    # update() : pas de save() complet du message, seulement les deux colonnes
+    Message.objects.filter(id=message_id).update(image=full_name, thumbnail=thumb_name)
+
+    if original_name != full_name:
+        storage.delete(original_name)
+
+    logger.debug("Image du message %s traitée : %s, %s", message_id, full_name, thumb_name)
@@ -0,0 +1,51 @@
+# apps/messaging/management/commands/archive_messages.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.messaging.archive import archive_thread_messages
+from apps.messaging.models import Message
+
+
+class Command(BaseCommand):
+    help = "Déplace les messages plus anciens que N mois dans des archives compressées (un blob par thread et par mois)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months', type=int, default=12,
+            help="Archive les messages antérieurs au début du mois d'il y a N mois (défaut : 12)"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Nombre de messages lus/supprimés par transaction (défaut : 1000)"
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Affiche le nombre de messages concernés sans rien archiver"
+        )
+
+    def handle(self, *args, **options):
+        # Coupure sur une frontière de mois : un mois est archivé en entier
+        now = timezone.now()
+        month_index = now.year * 12 + (now.month - 1) - options['months']
+        cutoff = now.replace(
+            year=month_index // 12, month=month_index % 12 + 1, day=1,
+            hour=0, minute=0, second=0, microsecond=0
+        )
+
+        old_messages = Message.objects.filter(created_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"{old_messages.count()} message(s) antérieur(s) au {cutoff:%d/%m/%Y} seraient archivé(s).")
+            return
+
+        thread_ids = list(old_messages.order_by().values_list('thread_id', flat=True).distinct())
+
+        total = 0
+        for thread_id in thread_ids:
+            archived = archive_thread_messages(thread_id, cutoff, batch_size=options['batch_size'])
+            total += archived
+            self.stdout.write(f"  Thread {thread_id} : {archived} message(s) archivé(s)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Terminé : {total} message(s) archivé(s) dans {len(thread_ids)} conversation(s)."
+        ))
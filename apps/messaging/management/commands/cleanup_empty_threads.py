@@ -0,0 +1,53 @@
+# apps/messaging/management/commands/cleanup_empty_threads.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.messaging.models import Thread
+
+
+class Command(BaseCommand):
+    help = "Supprime par lots les conversations sans aucun message (héritage de la création à l'affichage du profil)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Nombre de threads supprimés par requête (défaut : 500)"
+        )
+        parser.add_argument(
+            '--older-than-hours', type=int, default=24,
+            help="Ne supprime que les threads inactifs depuis au moins N heures (défaut : 24)"
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Affiche le nombre de threads concernés sans rien supprimer"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        cutoff = timezone.now() - timedelta(hours=options['older_than_hours'])
+
+        # Un thread archivé (archive_messages) n'a plus de Message mais n'est pas vide
+        empty_threads = Thread.objects.filter(
+            messages__isnull=True,
+            archives__isnull=True,
+            updated_at__lt=cutoff
+        ).order_by('id')
+
+        if options['dry_run']:
+            count = empty_threads.count()
+            self.stdout.write(f"{count} conversation(s) vide(s) seraient supprimée(s).")
+            return
+
+        total = 0
+        while True:
+            # Lot d'IDs d'abord, puis DELETE ciblé : transactions courtes, pas de verrou sur toute la table
+            ids = list(empty_threads.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            Thread.objects.filter(id__in=ids, messages__isnull=True, archives__isnull=True).delete()
+            total += len(ids)
+            self.stdout.write(f"  {total} conversation(s) supprimée(s)...")
+
+        self.stdout.write(self.style.SUCCESS(f"Terminé : {total} conversation(s) vide(s) supprimée(s)."))
@@ -0,0 +1,30 @@
+# apps/messaging/management/commands/flush_last_seen.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.messaging.presence import FLUSH_BATCH_SIZE, flush_last_seen
+
+
+class Command(BaseCommand):
+    help = (
+        "Écrit en base les last_seen en attente dans le cache (à lancer périodiquement, "
+        "ex. cron toutes les 5 min). Utile avec un cache partagé (Redis, Memcached) : "
+        "avec le cache local par processus, chaque processus web écrit son propre journal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=FLUSH_BATCH_SIZE,
+            help=f"Entrées du journal lues par requête (défaut : {FLUSH_BATCH_SIZE})"
+        )
+
+    def handle(self, *args, **options):
+        backend = settings.CACHES['default']['BACKEND']
+        if backend.endswith('LocMemCache'):
+            self.stderr.write(self.style.WARNING(
+                "Cache local au processus : le journal des processus web n'est pas visible d'ici."
+            ))
+
+        updated = flush_last_seen(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f"Terminé : {updated} profil(s) mis à jour."))
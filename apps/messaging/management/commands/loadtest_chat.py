@@ -0,0 +1,202 @@
+# apps/messaging/management/commands/loadtest_chat.py
+import re
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from apps.messaging.models import get_or_create_thread
+
+MESSAGE_ID_RE = re.compile(r'data-message-id="(\d+)"')
+
+# Pas de limitation de débit pendant le test : on mesure le serveur, pas le token bucket
+UNLIMITED = {'capacity': 10 ** 9, 'per_seconds': 1}
+
+
+def percentile(values, pct):
+    """Percentile par rang (valeurs triées)"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+class QueryCounter:
+    """Compte les requêtes SQL de la connexion du thread courant (connection.execute_wrapper)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge du chat : N utilisateurs simulés ouvrent une conversation, "
+        "envoient des messages (ChatView.post) et font du polling (NewMessagesView). "
+        "Affiche le débit, les percentiles de latence et les requêtes SQL par message."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help="Nombre d'utilisateurs simulés, groupés par paires de conversation (défaut : 20)"
+        )
+        parser.add_argument(
+            '--messages', type=int, default=20,
+            help="Messages envoyés par utilisateur (défaut : 20)"
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=10,
+            help="Clients exécutés en parallèle ; 1 = séquentiel dans le thread courant (défaut : 10)"
+        )
+        parser.add_argument(
+            '--polls-per-message', type=int, default=2,
+            help="Appels de polling entre deux envois (défaut : 2)"
+        )
+        parser.add_argument(
+            '--think-time', type=float, default=0.0,
+            help="Pause en secondes entre deux requêtes d'un même client (défaut : 0)"
+        )
+        parser.add_argument(
+            '--keep', action='store_true',
+            help="Conserve les utilisateurs et messages créés (supprimés par défaut)"
+        )
+
+    def handle(self, *args, **options):
+        users = self.create_users(max(2, options['users'] + options['users'] % 2))
+        self.stdout.write(f"{len(users)} utilisateur(s) simulé(s), base : {connection.vendor}")
+
+        # Chaque utilisateur parle avec son voisin : users[0] <-> users[1], etc.
+        threads = {}
+        for user, other in zip(users[::2], users[1::2]):
+            threads[user.id] = threads[other.id] = get_or_create_thread(user, other).id
+
+        latencies = defaultdict(list)
+        send_queries = []
+        errors = defaultdict(int)
+
+        def record(results):
+            for kind, elapsed in results['latencies']:
+                latencies[kind].append(elapsed)
+            send_queries.extend(results['send_queries'])
+            for status, count in results['errors'].items():
+                errors[status] += count
+
+        try:
+            with override_settings(RATE_LIMITS={'message_send': UNLIMITED, 'thread_create': UNLIMITED}):
+                started = time.perf_counter()
+                if options['concurrency'] <= 1:
+                    for user in users:
+                        record(self.run_client(user, threads[user.id], options))
+                else:
+                    with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                        futures = [
+                            pool.submit(self.run_client_in_thread, user, threads[user.id], options)
+                            for user in users
+                        ]
+                        for future in futures:
+                            record(future.result())
+                duration = time.perf_counter() - started
+        finally:
+            if not options['keep']:
+                # Les threads, messages et accusés de lecture partent en cascade
+                get_user_model().objects.filter(id__in=[user.id for user in users]).delete()
+
+        self.report(latencies, send_queries, errors, duration)
+
+    def create_users(self, count):
+        User = get_user_model()
+        run = uuid.uuid4().hex[:8]
+        return [
+            User.objects.create_user(
+                email=f'loadtest-{run}-{i}@loadtest.local',
+                username=f'loadtest-{run}-{i}',
+                password=None,
+                first_name='Load',
+                last_name=f'Test {i}',
+            )
+            for i in range(count)
+        ]
+
+    def run_client_in_thread(self, user, thread_id, options):
+        try:
+            return self.run_client(user, thread_id, options)
+        finally:
+            # Chaque thread du pool a sa propre connexion à la base
+            connections.close_all()
+
+    def run_client(self, user, thread_id, options):
+        """Un client simulé : ouverture du chat, puis envois et polling en alternance"""
+        client = Client()
+        client.force_login(user)
+        detail_url = reverse('messaging:detail', kwargs={'pk': thread_id})
+        poll_url = reverse('messaging:poll', kwargs={'pk': thread_id})
+
+        results = {'latencies': [], 'send_queries': [], 'errors': defaultdict(int)}
+        counter = QueryCounter()
+        last_id = 0
+
+        def timed(kind, method, url, data=None):
+            counter.count = 0
+            started = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                response = method(url, data, HTTP_HX_REQUEST='true')
+            results['latencies'].append((kind, time.perf_counter() - started))
+            if response.status_code >= 400:
+                results['errors'][f'{kind} {response.status_code}'] += 1
+            if options['think_time']:
+                time.sleep(options['think_time'])
+            return response
+
+        timed('open', client.get, detail_url)
+
+        for i in range(options['messages']):
+            response = timed('send', client.post, detail_url, {'content': f"Message de test {i}"})
+            results['send_queries'].append(counter.count)
+
+            for _ in range(options['polls_per_message']):
+                response = timed('poll', client.get, poll_url, {'last_id': last_id})
+                ids = MESSAGE_ID_RE.findall(response.content.decode())
+                if ids:
+                    last_id = max(last_id, *map(int, ids))
+
+        return results
+
+    def report(self, latencies, send_queries, errors, duration):
+        total_requests = sum(len(values) for values in latencies.values())
+        sent = len(latencies.get('send', []))
+
+        self.stdout.write(f"\nDurée : {duration:.2f} s")
+        self.stdout.write(f"Débit : {total_requests / duration:.1f} requêtes/s, {sent / duration:.1f} messages/s")
+
+        self.stdout.write("\nLatence (ms)     nb      p50      p95      p99      max")
+        for kind in ('open', 'send', 'poll'):
+            values = sorted(latencies.get(kind, []))
+            if not values:
+                continue
+            self.stdout.write(
+                f"  {kind:<12} {len(values):>6} "
+                + " ".join(f"{percentile(values, pct) * 1000:>8.1f}" for pct in (50, 95, 99, 100))
+            )
+
+        if send_queries:
+            self.stdout.write(
+                f"\nRequêtes SQL par message envoyé : moyenne {sum(send_queries) / len(send_queries):.1f}, "
+                f"max {max(send_queries)}"
+            )
+
+        if errors:
+            self.stdout.write(self.style.WARNING(
+                "Erreurs : " + ", ".join(f"{status} x{count}" for status, count in sorted(errors.items()))
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("Aucune erreur."))
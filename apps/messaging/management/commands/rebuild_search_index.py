@@ -0,0 +1,48 @@
+# apps/messaging/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.messaging.models import Message, MessageToken
+from apps.messaging.search import tokenize
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche (MessageToken) à partir des messages existants"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Nombre de messages indexés par transaction (défaut : 1000)"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        total = 0
+
+        # Parcours par clé (id croissant) : pas d'OFFSET sur une grande table
+        while True:
+            rows = list(
+                Message.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'thread_id', 'content')[:batch_size]
+            )
+            if not rows:
+                break
+
+            message_ids = [message_id for message_id, _, _ in rows]
+            tokens = [
+                MessageToken(thread_id=thread_id, message_id=message_id, token=token)
+                for message_id, thread_id, content in rows
+                for token in tokenize(content)
+            ]
+
+            with transaction.atomic():
+                MessageToken.objects.filter(message_id__in=message_ids).delete()
+                MessageToken.objects.bulk_create(tokens, batch_size=batch_size)
+
+            last_id = message_ids[-1]
+            total += len(rows)
+            self.stdout.write(f"  {total} message(s) indexé(s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Terminé : {total} message(s) indexé(s)."))
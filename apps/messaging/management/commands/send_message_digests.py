@@ -0,0 +1,41 @@
+# apps/messaging/management/commands/send_message_digests.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.messaging.notifications import DIGEST_BATCH_SIZE, due_recipient_ids, send_digests
+
+
+class Command(BaseCommand):
+    help = "Envoie les digests email des messages non lus (à lancer périodiquement, ex. cron toutes les 5 min)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window-minutes', type=int, default=30,
+            help="Attente minimale depuis la première notification avant l'envoi (défaut : 30)"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DIGEST_BATCH_SIZE,
+            help=f"Nombre maximum de destinataires par lot (défaut : {DIGEST_BATCH_SIZE})"
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Affiche le nombre de destinataires concernés sans rien envoyer"
+        )
+
+    def handle(self, *args, **options):
+        window = timedelta(minutes=options['window_minutes'])
+        batch_size = options['batch_size']
+
+        if options['dry_run']:
+            count = len(due_recipient_ids(timezone.now(), window, batch_size))
+            self.stdout.write(f"{count} destinataire(s) recevraient un digest.")
+            return
+
+        stats = send_digests(window=window, limit=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Terminé : {stats['sent']} digest(s) envoyé(s), {stats['failed']} reporté(s), "
+            f"{stats['dismissed']} notification(s) déjà lue(s) ignorée(s)."
+        ))
@@ -0,0 +1,23 @@
+# apps/messaging/middleware.py
+from .presence import record_activity, schedule_last_seen_flush
+
+
+class PresenceMiddleware:
+    """
+    Présence et last_seen de l'utilisateur connecté, sans écriture en base
+    par requête (voir apps.messaging.presence). Le flush des last_seen en
+    attente est déclenché par le trafic lui-même : avec le cache local par
+    processus (LocMemCache), chaque processus écrit son propre journal.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            if record_activity(user.pk):
+                schedule_last_seen_flush()
+        return response
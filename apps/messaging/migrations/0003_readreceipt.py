@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-19 10:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_read_receipts(apps, schema_editor):
+    """Convertit les anciens flags is_read en curseurs "lu jusqu'au message N" """
+    Thread = apps.get_model('messaging', 'Thread')
+    Message = apps.get_model('messaging', 'Message')
+    ReadReceipt = apps.get_model('messaging', 'ReadReceipt')
+
+    receipts = []
+    for thread in Thread.objects.prefetch_related('participants').iterator(chunk_size=500):
+        for participant in thread.participants.all():
+            last_read_id = Message.objects.filter(
+                thread=thread, is_read=True
+            ).exclude(sender=participant).aggregate(last=Max('id'))['last']
+            if last_read_id:
+                receipts.append(ReadReceipt(thread=thread, user=participant, last_read_id=last_read_id))
+
+    ReadReceipt.objects.bulk_create(receipts, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0002_message_msg_thread_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_id', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_receipts', to='messaging.thread')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_receipts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Accusé de lecture',
+                'unique_together': {('thread', 'user')},
+            },
+        ),
+        migrations.RunPython(seed_read_receipts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0 on 2026-10-19 11:21
+
+from django.db import migrations
+
+
+def dedupe_threads(apps, schema_editor):
+    """
+    Remplit la clé canonique (user_low, user_high) des conversations 1:1 et
+    fusionne les doublons dans la plus ancienne : messages et curseurs de lecture
+    sont rattachés au thread conservé, puis les threads en double sont supprimés.
+    """
+    Thread = apps.get_model('messaging', 'Thread')
+    Message = apps.get_model('messaging', 'Message')
+    ReadReceipt = apps.get_model('messaging', 'ReadReceipt')
+
+    kept = {}
+    threads = Thread.objects.prefetch_related('participants').order_by('id')
+    for thread in threads.iterator(chunk_size=500):
+        pair = tuple(sorted(p.id for p in thread.participants.all()))
+        if len(pair) != 2:
+            continue
+
+        if pair not in kept:
+            kept[pair] = thread.id
+            Thread.objects.filter(id=thread.id).update(user_low_id=pair[0], user_high_id=pair[1])
+            continue
+
+        target_id = kept[pair]
+        Message.objects.filter(thread_id=thread.id).update(thread_id=target_id)
+
+        for receipt in ReadReceipt.objects.filter(thread_id=thread.id):
+            existing = ReadReceipt.objects.filter(thread_id=target_id, user_id=receipt.user_id).first()
+            if existing is None:
+                ReadReceipt.objects.filter(id=receipt.id).update(thread_id=target_id)
+            elif receipt.last_read_id > existing.last_read_id:
+                ReadReceipt.objects.filter(id=existing.id).update(last_read_id=receipt.last_read_id)
+
+        Thread.objects.filter(id=thread.id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0005_thread_user_low_thread_user_high'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_threads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0006_dedupe_threads'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='thread',
+            constraint=models.UniqueConstraint(fields=('user_low', 'user_high'), name='unique_thread_pair'),
+        ),
+    ]
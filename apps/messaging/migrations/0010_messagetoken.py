@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-19 17:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0009_message_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=40)),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='messaging.message')),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='messaging.thread')),
+            ],
+            options={
+                'verbose_name': 'Mot indexé',
+                'indexes': [models.Index(fields=['thread', 'token'], name='msgtoken_thread_token_idx')],
+            },
+        ),
+    ]
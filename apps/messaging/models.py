@@ -1,16 +1,31 @@
-from django.db import models
-from django.db.models import Count  # Importation corrigée
+from django.db import models, transaction, IntegrityError
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 class Thread(models.Model):
     participants = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='threads')
+    # Clé canonique des conversations 1:1 (plus petit id, plus grand id) :
+    # recherche indexée en O(1) et création sans doublon grâce à la contrainte d'unicité
+    user_low = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        null=True, blank=True, related_name='+'
+    )
+    user_high = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        null=True, blank=True, related_name='+'
+    )
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
     class Meta:
         ordering = ['-updated_at']
         verbose_name = "Conversation"
+        constraints = [
+            models.UniqueConstraint(fields=['user_low', 'user_high'], name='unique_thread_pair'),
+        ]
 
     def __str__(self):
         return f"Thread {self.id}"
@@ -23,31 +38,212 @@ class Thread(models.Model):
     def last_message(self):
         return self.messages.first()
 
+    def read_upto(self, user):
+        """ID du dernier message lu par `user` dans ce thread (0 si jamais lu)"""
+        receipt = self.read_receipts.filter(user=user).values_list('last_read_id', flat=True).first()
+        return receipt or 0
+
 
 class Message(models.Model):
     thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name="messages")
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="sent_messages")
     content = models.TextField(verbose_name="Message")
     image = models.ImageField(upload_to="message_images/", blank=True, null=True)
-    is_read = models.BooleanField(default=False)
+    # Miniature générée en arrière-plan (voir apps.messaging.images)
+    thumbnail = models.ImageField(upload_to="message_images/thumbs/", blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Message"
+        # Index composite pour l'historique paginé par curseur (thread_id, id < curseur)
+        indexes = [
+            models.Index(fields=['thread', 'id'], name='msg_thread_id_idx'),
+            # Sélection des messages à archiver par mois (archive_messages)
+            models.Index(fields=['created_at'], name='msg_created_at_idx'),
+        ]
     
     def __str__(self):
         return f"Message de {self.sender.email}"
 
 
+class MessageArchive(models.Model):
+    """
+    Archive froide : les messages d'un thread pour un mois donné, sérialisés
+    (msgpack) et compressés (zlib) dans un seul blob. La table Message ne garde
+    que l'historique récent ; voir apps.messaging.archive.
+    """
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name="archives")
+    month = models.DateField(help_text="Premier jour du mois archivé")
+    first_message_id = models.PositiveBigIntegerField()
+    last_message_id = models.PositiveBigIntegerField()
+    message_count = models.PositiveIntegerField()
+    payload = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archive de messages"
+        verbose_name_plural = "Archives de messages"
+        indexes = [
+            models.Index(fields=['thread', 'last_message_id'], name='msgarchive_thread_last_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.thread} - {self.month:%Y-%m} ({self.message_count} messages)"
+
+
+class MessageToken(models.Model):
+    """
+    Index inversé de la recherche dans les conversations : un mot normalisé
+    par ligne, rattaché à son message. Alimenté à l'envoi (apps.messaging.search).
+    Le thread est dupliqué ici pour filtrer directement sur les conversations
+    de l'utilisateur via l'index (thread, token).
+    """
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name="+")
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name="tokens")
+    token = models.CharField(max_length=40)
+
+    class Meta:
+        verbose_name = "Mot indexé"
+        indexes = [
+            models.Index(fields=['thread', 'token'], name='msgtoken_thread_token_idx'),
+        ]
+
+
+class MessageNotification(models.Model):
+    """
+    Boîte d'envoi des notifications email : une ligne par message reçu.
+    Le job de digest (apps.messaging.notifications) regroupe les lignes d'un
+    même destinataire dans un seul email, puis les supprime.
+    """
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="message_notifications"
+    )
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Nouvel essai après un échec SMTP (backoff exponentiel)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Notification en attente"
+        verbose_name_plural = "Notifications en attente"
+        indexes = [
+            models.Index(fields=['recipient', 'created_at'], name='msgnotif_recipient_idx'),
+        ]
+
+
+class ReadReceipt(models.Model):
+    """
+    Accusé de lecture par membre : "lu jusqu'au message N".
+    Marquer comme lu = mettre à jour UNE ligne, au lieu de passer
+    is_read=True sur chaque message de la conversation.
+    """
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name="read_receipts")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="read_receipts")
+    last_read_id = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('thread', 'user')
+        verbose_name = "Accusé de lecture"
+
+    def __str__(self):
+        return f"{self.user} a lu {self.thread} jusqu'au message {self.last_read_id}"
+
+
+def mark_thread_read(thread, user, message_id):
+    """
+    Avance le curseur de lecture de `user` jusqu'à `message_id`.
+    Le filtre `last_read_id__lt` garantit que le curseur ne recule jamais.
+    """
+    if not message_id:
+        return
+    updated = ReadReceipt.objects.filter(
+        thread=thread, user=user, last_read_id__lt=message_id
+    ).update(last_read_id=message_id, updated_at=timezone.now())
+
+    if not updated:
+        ReadReceipt.objects.get_or_create(
+            thread=thread, user=user, defaults={'last_read_id': message_id}
+        )
+
+
+def read_upto_subquery(user, thread_ref='thread'):
+    """Curseur de lecture de `user` pour le thread référencé (0 si absent), utilisable dans une requête"""
+    receipts = ReadReceipt.objects.filter(
+        thread=OuterRef(thread_ref), user=user
+    ).values('last_read_id')[:1]
+    return Coalesce(Subquery(receipts), 0, output_field=models.BigIntegerField())
+
+
+def unread_messages(user):
+    """Messages reçus par `user` et situés après son curseur de lecture"""
+    return Message.objects.filter(
+        thread__participants=user,
+        id__gt=read_upto_subquery(user),
+    ).exclude(sender=user)
+
+
+def send_message(thread, sender, content, image=None):
+    """
+    Crée un message et lance les traitements associés.
+    Point d'entrée unique pour tous les envois (chat, premier message...).
+    """
+    from apps.core.tasks import run_in_background
+    from .images import process_message_image
+    from .presence import broadcast_to_thread, clear_typing
+    from .notifications import queue_message_notifications
+    from .search import index_message
+
+    message = Message.objects.create(
+        thread=thread,
+        sender=sender,
+        content=content,
+        image=image
+    )
+
+    if message.image:
+        run_in_background(process_message_image, message.id)
+
+    # Index de recherche mis à jour à l'envoi (un seul INSERT groupé)
+    index_message(message)
+
+    # Entrée dans la boîte d'envoi ; l'email part plus tard, groupé dans un digest
+    queue_message_notifications(message)
+
+    # Le message envoyé remplace l'indicateur "écrit..."
+    clear_typing(thread.id, sender.id)
+    transaction.on_commit(lambda: broadcast_to_thread(
+        thread.id, {'event': 'message', 'message_id': message.id, 'user_id': sender.id}
+    ))
+
+    return message
+
+
+def find_thread(user1, user2):
+    """Conversation existante entre user1 et user2 (None sinon), sans rien créer"""
+    user_low, user_high = sorted((user1, user2), key=lambda u: u.pk)
+    return Thread.objects.filter(user_low=user_low, user_high=user_high).first()
+
+
 def get_or_create_thread(user1, user2):
-    """Trouve ou crée une conversation entre user1 et user2"""
-    thread = user1.threads.annotate(
-        user_count=Count('participants')
-    ).filter(user_count=2, participants=user2).first()
-
-    if not thread:
-        thread = Thread.objects.create()
-        thread.participants.add(user1, user2)
-    
-    return thread
\ No newline at end of file
+    """
+    Trouve ou crée la conversation entre user1 et user2.
+    Lookup direct sur la clé canonique (user_low, user_high) ; en cas de création
+    concurrente, la contrainte d'unicité fait échouer le second INSERT et on relit le gagnant.
+    """
+    thread = find_thread(user1, user2)
+    if thread:
+        return thread
+
+    user_low, user_high = sorted((user1, user2), key=lambda u: u.pk)
+
+    try:
+        with transaction.atomic():
+            thread = Thread.objects.create(user_low=user_low, user_high=user_high)
+            thread.participants.add(user_low, user_high)
+    except IntegrityError:
+        thread = Thread.objects.get(user_low=user_low, user_high=user_high)
+
+    return thread
@@ -0,0 +1,202 @@
+# apps/messaging/notifications.py
+"""
+Notifications email des messages non lus, envoyées en digest.
+
+send_message() ajoute une ligne MessageNotification par destinataire
+(un INSERT groupé). Le job périodique send_digests() regroupe les lignes
+en attente par destinataire, ignore les messages lus entre-temps et envoie
+un seul email par utilisateur, tous sur UNE connexion SMTP ouverte pour
+le lot. En cas d'échec, les lignes sont reportées avec un backoff
+exponentiel puis abandonnées après MAX_ATTEMPTS essais.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Min, Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import MessageNotification, ReadReceipt
+from .presence import online_user_ids, recently_seen_cutoff
+
+logger = logging.getLogger(__name__)
+
+# Délai minimum entre la première notification en attente et l'envoi du digest
+DIGEST_WINDOW = timedelta(minutes=30)
+# Destinataires traités par passage du job
+DIGEST_BATCH_SIZE = 200
+# Backoff : 5 min, 10 min, 20 min, 40 min, puis abandon
+RETRY_BASE_DELAY = timedelta(minutes=5)
+MAX_ATTEMPTS = 5
+# Messages détaillés dans un email (les autres sont seulement comptés)
+MAX_MESSAGES_PER_DIGEST = 10
+
+
+def queue_message_notifications(message):
+    """Une notification en attente pour chaque participant autre que l'expéditeur"""
+    recipient_ids = message.thread.participants.exclude(pk=message.sender_id).values_list('pk', flat=True)
+    MessageNotification.objects.bulk_create([
+        MessageNotification(recipient_id=recipient_id, message=message)
+        for recipient_id in recipient_ids
+    ])
+
+
+def retry_delay(attempts):
+    return RETRY_BASE_DELAY * 2 ** (attempts - 1)
+
+
+def due_recipient_ids(now, window=DIGEST_WINDOW, limit=DIGEST_BATCH_SIZE):
+    """
+    Destinataires hors ligne dont la plus ancienne notification due dépasse
+    la fenêtre. Les utilisateurs connectés voient leurs messages dans l'app :
+    ils sont écartés AVANT la limite, sinon ils rempliraient chaque lot.
+
+    Le job tourne dans son propre processus : avec le cache local par
+    processus, il ne voit pas la présence notée par les processus web.
+    Profile.last_seen (écrit en base par les processus web) sert donc de
+    référence, la présence en cache ne fait qu'affiner avec un cache partagé.
+    """
+    due = (
+        MessageNotification.objects
+        .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+        .exclude(recipient__profile__last_seen__gte=recently_seen_cutoff(now))
+        .values('recipient')
+        .annotate(oldest=Min('created_at'))
+        .filter(oldest__lte=now - window)
+        .order_by('oldest', 'recipient')
+        .values_list('recipient', flat=True)
+    )
+
+    recipient_ids = []
+    offset = 0
+    while len(recipient_ids) < limit:
+        chunk = list(due[offset:offset + limit])
+        if not chunk:
+            break
+        online = online_user_ids(chunk)
+        recipient_ids.extend(recipient_id for recipient_id in chunk if recipient_id not in online)
+        offset += limit
+    return recipient_ids[:limit]
+
+
+def build_digest(recipient, messages):
+    """Un EmailMessage résumant `messages` (du plus ancien au plus récent) pour `recipient`"""
+    senders = {}
+    for message in messages:
+        senders.setdefault(message.sender, []).append(message)
+
+    count = len(messages)
+    subject = f"{count} nouveau{'x' if count > 1 else ''} message{'s' if count > 1 else ''} sur Benin Match"
+    body = render_to_string('messaging/emails/unread_digest.txt', {
+        'recipient': recipient,
+        'count': count,
+        'senders': [
+            {'sender': sender, 'count': len(sender_messages), 'last_message': sender_messages[-1]}
+            for sender, sender_messages in senders.items()
+        ],
+        'messages': messages[-MAX_MESSAGES_PER_DIGEST:],
+        'inbox_url': '{}://{}{}'.format(
+            'http' if settings.DEBUG else 'https',
+            Site.objects.get_current().domain,
+            reverse('messaging:list'),
+        ),
+    })
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient.email])
+
+
+def send_digests(now=None, window=DIGEST_WINDOW, limit=DIGEST_BATCH_SIZE, connection=None):
+    """
+    Envoie les digests dus. Retourne un dict de compteurs :
+    sent (emails envoyés), dismissed (notifications déjà lues), failed (emails reportés).
+    """
+    now = now or timezone.now()
+    stats = {'sent': 0, 'dismissed': 0, 'failed': 0}
+
+    recipient_ids = due_recipient_ids(now, window, limit)
+    if not recipient_ids:
+        return stats
+
+    notifications = list(
+        MessageNotification.objects
+        .filter(recipient_id__in=recipient_ids)
+        .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+        .select_related('recipient', 'message__sender')
+        .order_by('message_id')
+    )
+
+    # Curseurs de lecture de tous les destinataires du lot, en une requête
+    read_upto = {
+        (thread_id, user_id): last_read_id
+        for thread_id, user_id, last_read_id in ReadReceipt.objects.filter(
+            user_id__in=recipient_ids
+        ).values_list('thread_id', 'user_id', 'last_read_id')
+    }
+
+    pending = {}
+    read_ids = []
+    for notification in notifications:
+        message = notification.message
+        if message.id <= read_upto.get((message.thread_id, notification.recipient_id), 0):
+            read_ids.append(notification.id)
+        else:
+            pending.setdefault(notification.recipient, []).append(notification)
+
+    if read_ids:
+        MessageNotification.objects.filter(id__in=read_ids).delete()
+        stats['dismissed'] = len(read_ids)
+
+    if not pending:
+        return stats
+
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception:
+        logger.exception("Connexion au serveur email impossible, digests reportés")
+        for recipient_notifications in pending.values():
+            postpone(recipient_notifications, now)
+        stats['failed'] = len(pending)
+        return stats
+
+    try:
+        for recipient, recipient_notifications in pending.items():
+            ids = [notification.id for notification in recipient_notifications]
+            if not recipient.email or not recipient.is_active:
+                MessageNotification.objects.filter(id__in=ids).delete()
+                continue
+
+            email = build_digest(recipient, [notification.message for notification in recipient_notifications])
+            try:
+                connection.send_messages([email])
+            except Exception:
+                logger.exception("Échec d'envoi du digest à %s", recipient.email)
+                postpone(recipient_notifications, now)
+                stats['failed'] += 1
+                continue
+
+            MessageNotification.objects.filter(id__in=ids).delete()
+            stats['sent'] += 1
+    finally:
+        connection.close()
+
+    return stats
+
+
+def postpone(notifications, now):
+    """Reporte les notifications (backoff exponentiel) ou les abandonne après MAX_ATTEMPTS"""
+    ids = [notification.id for notification in notifications]
+    attempts = max(notification.attempts for notification in notifications) + 1
+
+    if attempts >= MAX_ATTEMPTS:
+        logger.warning("Digest abandonné après %s essais (%s notification(s))", attempts, len(ids))
+        MessageNotification.objects.filter(id__in=ids).delete()
+        return
+
+    MessageNotification.objects.filter(id__in=ids).update(
+        attempts=attempts,
+        next_attempt_at=now + retry_delay(attempts),
+    )
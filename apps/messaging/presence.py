@@ -0,0 +1,216 @@
+# apps/messaging/presence.py
+"""
+Présence ("en ligne") et indicateurs "écrit..." éphémères.
+
+Tout vit dans le cache avec expiration (TTL) : aucune écriture en base.
+Les lectures sont groupées (cache.get_many) pour une liste d'utilisateurs.
+Si une channel layer est configurée (CHANNEL_LAYERS + channels installé),
+les changements sont aussi diffusés en une fois au groupe du thread ;
+sinon les clients les récupèrent via le polling existant.
+
+Profile.last_seen est tenu à jour sans écriture par requête : l'activité
+(PresenceMiddleware) est notée en cache au plus une fois par minute et par
+utilisateur, dans un journal numéroté (cache.incr). flush_last_seen() lit
+ce journal et écrit last_seen par lots, un UPDATE ... CASE par lot ; il est
+lancé par le trafic, puis une seconde fois en fin de fenêtre pour que la
+dernière activité soit écrite même si le site devient inactif (voir aussi
+la commande flush_last_seen).
+"""
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models import Case, DateTimeField, Value, When
+
+from apps.core.tasks import run_in_background, run_later
+
+try:
+    from channels.layers import get_channel_layer
+except ImportError:  # channels n'est pas installé
+    get_channel_layer = None
+
+# Un utilisateur est "en ligne" s'il a fait une requête dans la dernière minute
+PRESENCE_TTL = 60
+# "écrit..." disparaît de lui-même sans nouvelle frappe
+TYPING_TTL = 5
+
+# Activité notée au plus une fois par fenêtre et par utilisateur
+ACTIVITY_INTERVAL = 60
+# Écriture des last_seen en attente, au plus une fois par fenêtre
+FLUSH_INTERVAL = 60
+FLUSH_BATCH_SIZE = 500
+# Entrées du journal perdues si aucun flush ne passe pendant ce délai
+LAST_SEEN_ENTRY_TTL = 24 * 3600
+LAST_SEEN_SEQ_KEY = 'last-seen:seq'
+LAST_SEEN_FLUSHED_KEY = 'last-seen:flushed'
+# Dernier numéro attribué lors du flush précédent
+LAST_SEEN_CHECKED_KEY = 'last-seen:checked'
+LAST_SEEN_FLUSH_LOCK_KEY = 'last-seen:flush-lock'
+FLUSH_LOCK_TTL = 60
+
+
+def presence_key(user_id):
+    return f"presence:{user_id}"
+
+
+def typing_key(thread_id, user_id):
+    return f"typing:{thread_id}:{user_id}"
+
+
+def thread_group(thread_id):
+    return f"thread_{thread_id}"
+
+
+def broadcast_to_thread(thread_id, event):
+    """Diffuse `event` à tous les abonnés du thread (un seul group_send)"""
+    if get_channel_layer is None:
+        return
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    async_to_sync(layer.group_send)(thread_group(thread_id), {'type': 'thread.event', **event})
+
+
+def touch_presence(user_id):
+    cache.set(presence_key(user_id), int(time.time()), PRESENCE_TTL)
+
+
+def last_seen_entry_key(seq):
+    return f"last-seen:entry:{seq}"
+
+
+def record_activity(user_id, now=None):
+    """
+    Note l'activité de `user_id` : présence + entrée du journal last_seen.
+    cache.add() échoue tant que la fenêtre ACTIVITY_INTERVAL n'a pas expiré :
+    les autres requêtes de la fenêtre ne coûtent que cet appel.
+    Retourne True si l'activité a été enregistrée.
+    """
+    now = int(now or time.time())
+    if not cache.add(f"activity:{user_id}", now, ACTIVITY_INTERVAL):
+        return False
+
+    # Reste "en ligne" jusqu'à la fenêtre suivante, même sans autre écriture
+    cache.set(presence_key(user_id), now, PRESENCE_TTL + ACTIVITY_INTERVAL)
+
+    try:
+        seq = cache.incr(LAST_SEEN_SEQ_KEY)
+    except ValueError:  # Compteur absent (premier appel, cache vidé)
+        cache.add(LAST_SEEN_SEQ_KEY, 0, None)
+        seq = cache.incr(LAST_SEEN_SEQ_KEY)
+    cache.set(last_seen_entry_key(seq), (user_id, now), LAST_SEEN_ENTRY_TTL)
+    return True
+
+
+def flush_last_seen(batch_size=FLUSH_BATCH_SIZE):
+    """
+    Écrit les last_seen du journal en attente : par lot, la dernière activité
+    de chaque utilisateur, en un seul UPDATE ... SET last_seen = CASE user_id ...
+    Retourne le nombre de profils mis à jour.
+
+    Seules les entrées effectivement lues sont supprimées. Une entrée absente
+    peut être en cours d'écriture (numéro pris par cache.incr(), valeur pas
+    encore posée) : le flush s'arrête juste avant et la relira au passage
+    suivant. Si elle manque encore alors que son numéro était déjà attribué
+    au flush précédent, elle est perdue (expirée, évincée) et ignorée.
+    """
+    Profile = apps.get_model('profiles', 'Profile')
+
+    if not cache.add(LAST_SEEN_FLUSH_LOCK_KEY, 1, FLUSH_LOCK_TTL):
+        return 0  # Un autre flush est en cours
+
+    try:
+        current = cache.get(LAST_SEEN_SEQ_KEY) or 0
+        flushed = cache.get(LAST_SEEN_FLUSHED_KEY) or 0
+        checked = cache.get(LAST_SEEN_CHECKED_KEY) or 0
+        if flushed > current:  # Compteur repassé à zéro (cache vidé)
+            flushed = checked = 0
+
+        updated = 0
+        for start in range(flushed + 1, current + 1, batch_size):
+            keys = {seq: last_seen_entry_key(seq) for seq in range(start, min(start + batch_size, current + 1))}
+            found = cache.get_many(keys.values())
+
+            done = max(keys)
+            for seq, key in keys.items():
+                if key not in found and seq > checked:
+                    done = seq - 1
+                    break
+            read_keys = [key for seq, key in keys.items() if seq <= done and key in found]
+
+            latest = {}
+            for key in read_keys:
+                user_id, timestamp = found[key]
+                latest[user_id] = max(timestamp, latest.get(user_id, 0))
+
+            if latest:
+                updated += Profile.objects.filter(user_id__in=latest).update(last_seen=Case(
+                    *[
+                        When(user_id=user_id, then=Value(datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)))
+                        for user_id, timestamp in latest.items()
+                    ],
+                    output_field=DateTimeField(),
+                ))
+
+            cache.delete_many(read_keys)
+            cache.set(LAST_SEEN_FLUSHED_KEY, done, None)
+            if done < max(keys):
+                break
+
+        cache.set(LAST_SEEN_CHECKED_KEY, current, None)
+        return updated
+    finally:
+        cache.delete(LAST_SEEN_FLUSH_LOCK_KEY)
+
+
+def schedule_last_seen_flush():
+    """
+    Planifie flush_last_seen() en arrière-plan, au plus une fois par FLUSH_INTERVAL,
+    et un second flush à la fin de la fenêtre pour l'activité notée entre-temps.
+    """
+    if cache.add('last-seen:flush-scheduled', 1, FLUSH_INTERVAL):
+        run_in_background(flush_last_seen)
+        run_later(FLUSH_INTERVAL, flush_last_seen)
+
+
+def recently_seen_cutoff(now=None):
+    """Plus ancien last_seen possible d'un utilisateur en ligne (flush en retard compris)"""
+    return (now or datetime.now(dt_timezone.utc)) - timedelta(
+        seconds=PRESENCE_TTL + ACTIVITY_INTERVAL + FLUSH_INTERVAL * 2
+    )
+
+
+def online_user_ids(user_ids):
+    """Sous-ensemble des `user_ids` actuellement en ligne (une seule lecture cache)"""
+    user_ids = list(user_ids)
+    found = cache.get_many([presence_key(user_id) for user_id in user_ids])
+    return {user_id for user_id in user_ids if presence_key(user_id) in found}
+
+
+def is_online(user_id):
+    return user_id in online_user_ids([user_id])
+
+
+def set_typing(thread_id, user_id):
+    """
+    Marque `user_id` comme "en train d'écrire" dans le thread.
+    cache.add() ne réussit que si la clé a expiré : on diffuse au plus
+    un événement par fenêtre TYPING_TTL, pas un par frappe.
+    """
+    if cache.add(typing_key(thread_id, user_id), 1, TYPING_TTL):
+        broadcast_to_thread(thread_id, {'event': 'typing', 'user_id': user_id})
+    else:
+        cache.touch(typing_key(thread_id, user_id), TYPING_TTL)
+
+
+def clear_typing(thread_id, user_id):
+    cache.delete(typing_key(thread_id, user_id))
+
+
+def typing_user_ids(thread_id, user_ids):
+    """Parmi `user_ids`, ceux qui écrivent dans le thread"""
+    user_ids = list(user_ids)
+    found = cache.get_many([typing_key(thread_id, user_id) for user_id in user_ids])
+    return {user_id for user_id in user_ids if typing_key(thread_id, user_id) in found}
@@ -0,0 +1,95 @@
+# apps/messaging/search.py
+"""
+Recherche dans ses propres conversations.
+
+Au lieu d'un `content__icontains` qui parcourt toute la table Message,
+chaque message est découpé en mots normalisés (MessageToken) à l'envoi.
+Une recherche ne lit que les lignes de l'index (thread, token) des
+conversations de l'utilisateur.
+
+Seuls les messages "chauds" sont cherchables : à l'archivage
+(apps.messaging.archive), les jetons partent avec leur message (CASCADE).
+"""
+import re
+import unicodedata
+
+from django.db.models import Count, Q
+
+from .models import Message, MessageToken
+
+MAX_TOKEN_LENGTH = 40
+MIN_TOKEN_LENGTH = 2
+
+# Mots trop fréquents pour être utiles à la recherche
+STOPWORDS = {
+    'au', 'aux', 'avec', 'ce', 'ces', 'dans', 'de', 'des', 'du', 'elle', 'en', 'et',
+    'il', 'je', 'la', 'le', 'les', 'leur', 'lui', 'ma', 'mais', 'me', 'mes', 'moi',
+    'mon', 'ne', 'nous', 'on', 'ou', 'par', 'pas', 'pour', 'qu', 'que', 'qui', 'sa',
+    'se', 'ses', 'son', 'sur', 'ta', 'te', 'tes', 'toi', 'ton', 'tu', 'un', 'une',
+    'vos', 'votre', 'vous',
+}
+
+WORD_RE = re.compile(r"\w+")
+
+
+def strip_accents(text):
+    """Retire les signes diacritiques ; les lettres sans équivalent ASCII (ɖ, ɔ, ɛ du fon) restent"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """Mots normalisés (minuscules, sans accents), dédoublonnés, dans l'ordre d'apparition"""
+    normalized = strip_accents(text or '').lower()
+    tokens = []
+    for word in WORD_RE.findall(normalized):
+        if len(word) < MIN_TOKEN_LENGTH or word in STOPWORDS:
+            continue
+        word = word[:MAX_TOKEN_LENGTH]
+        if word not in tokens:
+            tokens.append(word)
+    return tokens
+
+
+def index_message(message):
+    """Ajoute les mots du message à l'index (appelé par send_message)"""
+    MessageToken.objects.bulk_create([
+        MessageToken(thread_id=message.thread_id, message_id=message.id, token=token)
+        for token in tokenize(message.content)
+    ])
+
+
+def search_messages(user, query, limit=20):
+    """
+    Messages des conversations de `user` contenant tous les mots de `query`.
+    Le dernier mot est cherché par préfixe (recherche pendant la frappe).
+    Du plus récent au plus ancien, avec le thread et ses participants préchargés.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+
+    *exact, prefix = tokens
+    thread_ids = list(user.threads.values_list('id', flat=True))
+
+    matches = MessageToken.objects.filter(thread_id__in=thread_ids)
+
+    if exact:
+        # Tous les mots exacts ET au moins un mot commençant par le préfixe
+        matches = matches.filter(
+            Q(token__in=exact) | Q(token__startswith=prefix)
+        ).values('message_id').annotate(
+            exact_hits=Count('token', filter=Q(token__in=exact), distinct=True),
+            prefix_hits=Count('token', filter=Q(token__startswith=prefix)),
+        ).filter(exact_hits=len(exact), prefix_hits__gt=0)
+    else:
+        matches = matches.filter(token__startswith=prefix).values('message_id').distinct()
+
+    matches = matches.order_by('-message_id').values_list('message_id', flat=True)[:limit]
+
+    return list(
+        Message.objects.filter(id__in=list(matches))
+        .select_related('sender', 'thread')
+        .prefetch_related('thread__participants')
+        .order_by('-id')
+    )
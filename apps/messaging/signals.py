@@ -0,0 +1,14 @@
+# apps/messaging/signals.py
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .archive import archived_file_names, unpack_messages
+from .models import MessageArchive
+
+
+@receiver(post_delete, sender=MessageArchive)
+def release_archived_files(sender, instance, **kwargs):
+    """Libère les images des messages archivés (références reprises à l'archivage)"""
+    for name in archived_file_names(unpack_messages(instance.payload)):
+        default_storage.delete(name)
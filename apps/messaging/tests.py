@@ -1,3 +1,667 @@
-from django.test import TestCase
+import smtplib
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from apps.core.ratelimit import get_hits
+from apps.profiles.models import Profile
+from .models import Thread, Message, MessageNotification, MessageToken, ReadReceipt, find_thread, get_or_create_thread, mark_thread_read, send_message, unread_messages
+from .notifications import send_digests
+from .presence import (
+    LAST_SEEN_SEQ_KEY, flush_last_seen, last_seen_entry_key, online_user_ids, record_activity, set_typing,
+    touch_presence, typing_user_ids,
+)
+from .search import search_messages, tokenize
+from .views import HISTORY_PAGE_SIZE
+
+
+class MessagingTestMixin:
+
+    def setUp(self):
+        # Seaux de limitation, présence... : rien ne doit fuir d'un test à l'autre
+        cache.clear()
+        User = get_user_model()
+        self.alice = User.objects.create_user(
+            email='alice@didacticiel.bj',
+            username='alice',
+            password='password123',
+            first_name='Alice',
+            last_name='Test'
+        )
+        self.bob = User.objects.create_user(
+            email='bob@didacticiel.bj',
+            username='bob',
+            password='password123',
+            first_name='Bob',
+            last_name='Test'
+        )
+        self.thread = get_or_create_thread(self.alice, self.bob)
+
+    def send(self, sender, content="Bonjour", thread=None):
+        return Message.objects.create(thread=thread or self.thread, sender=sender, content=content)
+
+
+class MessageHistoryTests(MessagingTestMixin, TestCase):
+
+    def test_history_returns_messages_before_cursor(self):
+        """Le lot renvoyé contient seulement les messages avec id < before"""
+        messages = [self.send(self.bob, f"msg {i}") for i in range(5)]
+        self.client.force_login(self.alice)
+
+        url = reverse('messaging:history', kwargs={'pk': self.thread.id})
+        response = self.client.get(url, {'before': messages[3].id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "msg 2")
+        self.assertNotContains(response, "msg 3")
+        self.assertNotContains(response, 'id="load-older"')
+
+    def test_history_exposes_next_cursor_when_more_messages(self):
+        """Un bouton "plus anciens" est rendu tant qu'il reste de l'historique"""
+        messages = [self.send(self.bob, f"msg {i}") for i in range(HISTORY_PAGE_SIZE + 2)]
+        self.client.force_login(self.alice)
+
+        url = reverse('messaging:history', kwargs={'pk': self.thread.id})
+        response = self.client.get(url, {'before': messages[-1].id})
+
+        self.assertContains(response, 'id="load-older"')
+        self.assertContains(response, f"before={messages[1].id}")
+
+    def test_history_forbidden_for_non_participant(self):
+        User = get_user_model()
+        intruder = User.objects.create_user(
+            email='eve@didacticiel.bj', username='eve', password='password123'
+        )
+        message = self.send(self.bob)
+        self.client.force_login(intruder)
+
+        url = reverse('messaging:history', kwargs={'pk': self.thread.id})
+        response = self.client.get(url, {'before': message.id + 1})
+
+        self.assertEqual(response.status_code, 403)
+
+
+class ReadReceiptTests(MessagingTestMixin, TestCase):
+
+    def test_unread_messages_follow_watermark(self):
+        """Les messages de l'autre au-delà du curseur sont non lus"""
+        first = self.send(self.bob, "un")
+        self.send(self.bob, "deux")
+        self.send(self.alice, "ma réponse")
+
+        self.assertEqual(unread_messages(self.alice).count(), 2)
+
+        mark_thread_read(self.thread, self.alice, first.id)
+        self.assertEqual(unread_messages(self.alice).count(), 1)
+
+    def test_watermark_never_moves_backwards(self):
+        first = self.send(self.bob, "un")
+        second = self.send(self.bob, "deux")
+
+        mark_thread_read(self.thread, self.alice, second.id)
+        mark_thread_read(self.thread, self.alice, first.id)
+
+        self.assertEqual(self.thread.read_upto(self.alice), second.id)
+        self.assertEqual(ReadReceipt.objects.filter(thread=self.thread, user=self.alice).count(), 1)
+
+    def test_opening_chat_marks_thread_read(self):
+        message = self.send(self.bob, "coucou")
+        self.client.force_login(self.alice)
+
+        response = self.client.get(reverse('messaging:detail', kwargs={'pk': self.thread.id}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.thread.read_upto(self.alice), message.id)
+        self.assertEqual(unread_messages(self.alice).count(), 0)
+
+    def test_poll_reports_other_read_upto(self):
+        mine = self.send(self.alice, "tu es là ?")
+        mark_thread_read(self.thread, self.bob, mine.id)
+        self.client.force_login(self.alice)
+
+        url = reverse('messaging:check', kwargs={'pk': self.thread.id})
+        data = self.client.get(url, {'last_id': mine.id}).json()
+
+        self.assertFalse(data['has_new'])
+        self.assertEqual(data['other_read_upto'], mine.id)
+
+
+class SyncTests(MessagingTestMixin, TestCase):
+
+    def test_sync_without_cursor_starts_from_now(self):
+        message = self.send(self.bob, "déjà là")
+        self.client.force_login(self.alice)
+
+        data = self.client.get(reverse('messaging:sync')).json()
+
+        self.assertEqual(data['messages'], [])
+        self.assertTrue(data['cursor'].startswith(f"{message.id}:"))
+
+    def test_sync_returns_new_messages_across_threads(self):
+        User = get_user_model()
+        carol = User.objects.create_user(
+            email='carol@didacticiel.bj', username='carol', password='password123'
+        )
+        other_thread = Thread.objects.create()
+        other_thread.participants.add(self.alice, carol)
+
+        self.client.force_login(self.alice)
+        cursor = self.client.get(reverse('messaging:sync')).json()['cursor']
+
+        self.send(self.bob, "de Bob")
+        self.send(carol, "de Carol", thread=other_thread)
+
+        data = self.client.get(reverse('messaging:sync'), {'cursor': cursor}).json()
+
+        self.assertEqual([m['content'] for m in data['messages']], ["de Bob", "de Carol"])
+        unread = {t['id']: t['unread_count'] for t in data['threads']}
+        self.assertEqual(unread, {self.thread.id: 1, other_thread.id: 1})
+
+        # Le curseur renvoyé ne rejoue pas les mêmes messages
+        data = self.client.get(reverse('messaging:sync'), {'cursor': data['cursor']}).json()
+        self.assertEqual(data['messages'], [])
+
+    def test_sync_rejects_invalid_cursor(self):
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('messaging:sync'), {'cursor': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class GetOrCreateThreadTests(MessagingTestMixin, TestCase):
+
+    def test_same_thread_whatever_the_order(self):
+        thread = get_or_create_thread(self.bob, self.alice)
+
+        self.assertEqual(thread, self.thread)
+        self.assertEqual(Thread.objects.count(), 1)
+        self.assertEqual(set(thread.participants.all()), {self.alice, self.bob})
+
+    def test_pair_key_is_canonical(self):
+        thread = get_or_create_thread(self.bob, self.alice)
+        low, high = sorted((self.alice, self.bob), key=lambda u: u.pk)
+
+        self.assertEqual((thread.user_low, thread.user_high), (low, high))
+
+
+class StartConversationTests(MessagingTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        self.carol = User.objects.create_user(
+            email='carol@didacticiel.bj', username='carol', password='password123'
+        )
+
+    def test_profile_browsing_creates_no_thread(self):
+        self.client.force_login(self.alice)
+
+        self.client.get(reverse('profiles:detail', kwargs={'pk': self.carol.profile.pk}))
+        response = self.client.get(reverse('messaging:start', kwargs={'user_id': self.carol.id}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(find_thread(self.alice, self.carol))
+
+    def test_first_message_creates_thread(self):
+        self.client.force_login(self.alice)
+
+        url = reverse('messaging:start', kwargs={'user_id': self.carol.id})
+        response = self.client.post(url, {'content': "Bonjour Carol"})
+
+        thread = find_thread(self.alice, self.carol)
+        self.assertRedirects(response, reverse('messaging:detail', kwargs={'pk': thread.id}))
+        self.assertEqual(thread.messages.get().content, "Bonjour Carol")
+
+    def test_existing_thread_redirects(self):
+        self.client.force_login(self.alice)
+
+        response = self.client.get(reverse('messaging:start', kwargs={'user_id': self.bob.id}))
+
+        self.assertRedirects(response, reverse('messaging:detail', kwargs={'pk': self.thread.id}))
+
+    def test_cleanup_command_deletes_only_empty_threads(self):
+        self.send(self.bob, "pas vide")
+        empty = get_or_create_thread(self.alice, self.carol)
+        Thread.objects.filter(id__in=[empty.id, self.thread.id]).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+
+        call_command('cleanup_empty_threads', '--batch-size', '1', stdout=StringIO())
+
+        self.assertFalse(Thread.objects.filter(id=empty.id).exists())
+        self.assertTrue(Thread.objects.filter(id=self.thread.id).exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), BACKGROUND_TASKS_EAGER=True)
+class MessageImageTests(MessagingTestMixin, TestCase):
+
+    def make_upload(self, size=(3000, 2000)):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = "PhoneMaker"  # Make
+        Image.new('RGB', size, 'orange').save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_image_is_reduced_and_thumbnailed(self):
+        message = send_message(self.thread, self.alice, "", self.make_upload())
+        message.refresh_from_db()
+
+        self.assertTrue(message.thumbnail)
+        with Image.open(message.image.path) as full:
+            self.assertLessEqual(max(full.size), 1600)
+            self.assertNotIn('exif', full.info)
+        with Image.open(message.thumbnail.path) as thumb:
+            self.assertLessEqual(max(thumb.size), 320)
+
+    def test_deleted_message_releases_its_images(self):
+        message = send_message(self.thread, self.alice, "", self.make_upload(size=(100, 100)))
+        message.refresh_from_db()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            message.delete()
+
+        self.assertFalse(default_storage.exists(message.image.name))
+        self.assertFalse(default_storage.exists(message.thumbnail.name))
+
+    def test_archived_images_are_kept_until_the_archive_is_deleted(self):
+        message = send_message(self.thread, self.alice, "", self.make_upload(size=(100, 100)))
+        message.refresh_from_db()
+        Message.objects.update(created_at=timezone.now() - timedelta(days=800))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_messages', '--months', '12', stdout=StringIO())
+        self.assertTrue(default_storage.exists(message.image.name))
+        self.assertTrue(default_storage.exists(message.thumbnail.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.thread.delete()
+        self.assertFalse(default_storage.exists(message.image.name))
+        self.assertFalse(default_storage.exists(message.thumbnail.name))
+
+    def test_form_rejects_oversized_upload(self):
+        from .forms import MessageForm
+        from apps.core.images import MAX_UPLOAD_SIZE
+
+        upload = self.make_upload(size=(100, 100))
+        upload.size = MAX_UPLOAD_SIZE + 1
+        form = MessageForm(data={'content': ''}, files={'image': upload})
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+
+class MessageArchiveTests(MessagingTestMixin, TestCase):
+
+    def test_archived_messages_are_rehydrated_in_history(self):
+        old = [self.send(self.bob, f"ancien {i}") for i in range(3)]
+        recent = self.send(self.alice, "récent")
+        Message.objects.filter(id__in=[m.id for m in old]).update(
+            created_at=timezone.now() - timedelta(days=800)
+        )
+
+        call_command('archive_messages', '--months', '12', stdout=StringIO())
+
+        self.assertEqual(list(self.thread.messages.all()), [recent])
+        self.assertEqual(self.thread.archives.get().message_count, 3)
+
+        self.client.force_login(self.alice)
+        url = reverse('messaging:history', kwargs={'pk': self.thread.id})
+        response = self.client.get(url, {'before': recent.id})
+
+        for i in range(3):
+            self.assertContains(response, f"ancien {i}")
+
+    def test_cleanup_keeps_archived_threads(self):
+        self.send(self.bob, "ancien")
+        Message.objects.update(created_at=timezone.now() - timedelta(days=800))
+        call_command('archive_messages', '--months', '12', stdout=StringIO())
+        Thread.objects.filter(id=self.thread.id).update(updated_at=timezone.now() - timedelta(days=2))
+
+        call_command('cleanup_empty_threads', stdout=StringIO())
+
+        self.assertTrue(Thread.objects.filter(id=self.thread.id).exists())
+        self.assertEqual(self.thread.archives.count(), 1)
+
+    def test_archived_messages_leave_the_search_index(self):
+        old = send_message(self.thread, self.bob, "Grand-Popo en août")
+        Message.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=800))
+        self.assertEqual(search_messages(self.alice, "popo"), [old])
+
+        call_command('archive_messages', '--months', '12', stdout=StringIO())
+
+        # Recherche limitée aux messages non archivés (voir apps.messaging.archive)
+        self.assertEqual(search_messages(self.alice, "popo"), [])
+        self.assertFalse(MessageToken.objects.exists())
+
+    def test_pack_roundtrip(self):
+        from .archive import pack_messages, unpack_messages
+
+        message = self.send(self.bob, "aller-retour")
+        rows = list(Message.objects.values('id', 'sender_id', 'content', 'image', 'thumbnail', 'created_at'))
+
+        unpacked = unpack_messages(pack_messages(rows))
+
+        self.assertEqual(unpacked[0]['content'], "aller-retour")
+        self.assertEqual(unpacked[0]['created_at'], message.created_at)
+
+
+class PresenceTests(MessagingTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_typing_and_presence_are_reported_by_poll(self):
+        self.client.force_login(self.bob)
+        self.client.post(reverse('messaging:typing', kwargs={'pk': self.thread.id}))
+
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('messaging:poll', kwargs={'pk': self.thread.id}), {'last_id': 0})
+
+        self.assertEqual(response['X-Other-Online'], '1')
+        self.assertEqual(response['X-Other-Typing'], '1')
+
+    def test_sending_a_message_clears_typing(self):
+        set_typing(self.thread.id, self.bob.id)
+
+        send_message(self.thread, self.bob, "fini d'écrire")
+
+        self.assertEqual(typing_user_ids(self.thread.id, [self.bob.id]), set())
+
+    def test_presence_never_touches_the_database(self):
+        with self.assertNumQueries(0):
+            touch_presence(self.alice.id)
+            self.assertEqual(online_user_ids([self.alice.id, self.bob.id]), {self.alice.id})
+
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class LastSeenTests(MessagingTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_activity_is_recorded_once_per_window(self):
+        self.assertTrue(record_activity(self.alice.id))
+        self.assertFalse(record_activity(self.alice.id))
+
+        self.assertEqual(online_user_ids([self.alice.id, self.bob.id]), {self.alice.id})
+
+    def test_flush_writes_every_user_in_one_update(self):
+        seen_at = timezone.now().replace(microsecond=0) - timedelta(minutes=3)
+        record_activity(self.alice.id, now=seen_at.timestamp())
+        record_activity(self.bob.id, now=seen_at.timestamp() + 30)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(flush_last_seen(), 2)
+
+        self.alice.profile.refresh_from_db()
+        self.bob.profile.refresh_from_db()
+        self.assertEqual(self.alice.profile.last_seen, seen_at)
+        self.assertEqual(self.bob.profile.last_seen, seen_at + timedelta(seconds=30))
+        # Journal vidé : un second flush n'écrit rien
+        self.assertEqual(flush_last_seen(), 0)
+
+    def test_entry_being_written_is_kept_for_the_next_flush(self):
+        seen_at = timezone.now().replace(microsecond=0) - timedelta(minutes=3)
+        record_activity(self.alice.id, now=seen_at.timestamp())
+        # Numéro attribué par un record_activity() concurrent, valeur pas encore posée
+        seq = cache.incr(LAST_SEEN_SEQ_KEY)
+
+        self.assertEqual(flush_last_seen(), 1)
+        cache.set(last_seen_entry_key(seq), (self.bob.id, seen_at.timestamp()))
+        self.assertEqual(flush_last_seen(), 1)
+
+        self.bob.profile.refresh_from_db()
+        self.assertEqual(self.bob.profile.last_seen, seen_at)
+
+    def test_lost_entry_does_not_block_the_journal(self):
+        record_activity(self.alice.id)
+        cache.incr(LAST_SEEN_SEQ_KEY)  # Entrée jamais écrite (ou évincée)
+        flush_last_seen()
+
+        record_activity(self.bob.id)
+
+        self.assertEqual(flush_last_seen(), 1)
+        self.assertEqual(flush_last_seen(), 0)
+
+    def test_flush_command(self):
+        record_activity(self.alice.id)
+        out = StringIO()
+
+        call_command('flush_last_seen', stdout=out, stderr=StringIO())
+
+        self.assertIn("1 profil(s)", out.getvalue())
+
+    def test_requests_update_last_seen_without_saving_the_profile(self):
+        Profile.objects.filter(user=self.alice).update(last_seen=timezone.now() - timedelta(days=2))
+        self.client.force_login(self.alice)
+
+        self.client.get(reverse('messaging:list'))
+        self.client.get(reverse('messaging:list'))
+
+        self.alice.profile.refresh_from_db()
+        self.assertGreater(self.alice.profile.last_seen, timezone.now() - timedelta(minutes=1))
+        self.assertEqual(cache.get(LAST_SEEN_SEQ_KEY), 1)
+
+    def test_search_online_filter_reads_presence(self):
+        adult = date(1995, 5, 17)
+        Profile.objects.filter(user__in=[self.alice, self.bob]).update(date_of_birth=adult)
+        record_activity(self.alice.id)
+        flush_last_seen()
+
+        response = self.client.get(reverse('search:list'), {'online': 'on'})
+
+        self.assertEqual([profile.user for profile in response.context['profiles']], [self.alice])
+
+
+@override_settings(RATE_LIMITS={'message_send': {'capacity': 2, 'per_seconds': 60}})
+class RateLimitTests(MessagingTestMixin, TestCase):
+
+    def test_burst_over_capacity_returns_429(self):
+        self.client.force_login(self.alice)
+        url = reverse('messaging:detail', kwargs={'pk': self.thread.id})
+
+        for _ in range(2):
+            response = self.client.post(url, {'content': "spam"}, HTTP_HX_REQUEST='true')
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(url, {'content': "spam"}, HTTP_HX_REQUEST='true')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertIn('rateLimited', response['HX-Trigger'])
+        self.assertEqual(self.thread.messages.count(), 2)
+        self.assertEqual(get_hits('message_send'), 1)
+
+    @override_settings(RATE_LIMITS={
+        'message_send': {'capacity': 2, 'per_seconds': 60},
+        'thread_create': {'capacity': 1, 'per_seconds': 3600},
+    })
+    def test_refused_conversation_does_not_spend_message_tokens(self):
+        User = get_user_model()
+        carol, dave = (
+            User.objects.create_user(email=f'{name}@didacticiel.bj', username=name, password='password123')
+            for name in ('carol', 'dave')
+        )
+        self.client.force_login(self.alice)
+
+        # Formulaire invalide : aucun jeton consommé
+        self.client.post(reverse('messaging:start', kwargs={'user_id': carol.id}), {'content': ""})
+        response = self.client.post(reverse('messaging:start', kwargs={'user_id': carol.id}), {'content': "Salut"})
+        self.assertEqual(response.status_code, 302)
+
+        response = self.client.post(reverse('messaging:start', kwargs={'user_id': dave.id}), {'content': "Salut"})
+        self.assertEqual(response.status_code, 429)
+
+        # Le refus de thread_create n'a pas entamé message_send : il reste un jeton
+        url = reverse('messaging:detail', kwargs={'pk': self.thread.id})
+        response = self.client.post(url, {'content': "Toujours là"}, HTTP_HX_REQUEST='true')
+        self.assertEqual(response.status_code, 200)
+
+
+class MessageSearchTests(MessagingTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.carol = get_user_model().objects.create_user(
+            email='carol@didacticiel.bj',
+            username='carol',
+            password='password123',
+            first_name='Carol',
+            last_name='Test'
+        )
+
+    def test_tokenize_normalizes_accents_case_and_stopwords(self):
+        self.assertEqual(tokenize("Le Café est fermé, le café!"), ['cafe', 'est', 'ferme'])
+
+    def test_tokenize_keeps_fon_letters(self):
+        self.assertEqual(tokenize("Ɖɔ̀kpɔ́ wɛ̀ nyɛ̌"), ['ɖɔkpɔ', 'wɛ', 'nyɛ'])
+
+    def test_search_finds_fon_words_without_tones(self):
+        hit = send_message(self.thread, self.bob, "Mi kúdo àbɔ̀")
+
+        self.assertEqual(search_messages(self.alice, "abɔ"), [hit])
+
+    def test_search_matches_all_words_with_prefix_on_last(self):
+        hit = send_message(self.thread, self.bob, "Rendez-vous au marché Dantokpa samedi")
+        send_message(self.thread, self.alice, "Rendez-vous dimanche")
+
+        self.assertEqual(search_messages(self.alice, "rendez Dant"), [hit])
+        self.assertEqual(search_messages(self.alice, "marche"), [hit])
+
+    def test_search_ignores_other_users_threads(self):
+        other_thread = get_or_create_thread(self.bob, self.carol)
+        send_message(other_thread, self.carol, "Cotonou ce soir")
+
+        self.assertEqual(search_messages(self.alice, "cotonou"), [])
+        self.assertEqual(len(search_messages(self.carol, "cotonou")), 1)
+
+    def test_search_view_renders_results(self):
+        send_message(self.thread, self.bob, "Porto-Novo demain")
+        self.client.force_login(self.alice)
+
+        response = self.client.get(reverse('messaging:search'), {'q': 'porto'})
+
+        self.assertContains(response, "Porto-Novo demain")
+        self.assertContains(response, reverse('messaging:detail', kwargs={'pk': self.thread.id}))
+
+    def test_rebuild_search_index_backfills_existing_messages(self):
+        message = self.send(self.bob, "Ouidah vendredi")
+        self.assertFalse(MessageToken.objects.filter(message=message).exists())
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(search_messages(self.alice, "ouidah"), [message])
+
+
+class MessageDigestTests(MessagingTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.later = timezone.now() + timedelta(hours=1)
+
+    def test_send_message_queues_one_notification_for_the_other_participant(self):
+        send_message(self.thread, self.bob, "Coucou")
+
+        self.assertEqual(
+            list(MessageNotification.objects.values_list('recipient_id', flat=True)), [self.alice.id]
+        )
+
+    def test_unread_messages_are_grouped_in_one_email_per_user(self):
+        for content in ("Salut", "Tu es là ?", "Réponds-moi"):
+            send_message(self.thread, self.bob, content)
+
+        stats = send_digests(now=self.later)
+
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.alice.email])
+        self.assertIn("3 nouveaux messages", mail.outbox[0].subject)
+        self.assertIn("Réponds-moi", mail.outbox[0].body)
+        self.assertFalse(MessageNotification.objects.exists())
+
+    def test_messages_read_before_the_digest_are_dismissed(self):
+        message = send_message(self.thread, self.bob, "Salut")
+        mark_thread_read(self.thread, self.alice, message.id)
+
+        stats = send_digests(now=self.later)
+
+        self.assertEqual(stats['dismissed'], 1)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertFalse(MessageNotification.objects.exists())
+
+    def test_nothing_is_sent_before_the_window_elapses(self):
+        send_message(self.thread, self.bob, "Salut")
+
+        send_digests(now=timezone.now())
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(MessageNotification.objects.count(), 1)
+
+    def test_online_recipients_do_not_fill_the_batch(self):
+        send_message(self.thread, self.alice, "Pour Bob")
+        send_message(self.thread, self.bob, "Pour Alice")
+        touch_presence(self.bob.id)
+
+        stats = send_digests(now=self.later, limit=1)
+
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(mail.outbox[0].to, [self.alice.email])
+        self.assertEqual(list(MessageNotification.objects.values_list('recipient_id', flat=True)), [self.bob.id])
+
+    def test_recently_seen_recipients_are_skipped_without_shared_cache(self):
+        send_message(self.thread, self.alice, "Pour Bob")
+        send_message(self.thread, self.bob, "Pour Alice")
+        # Présence notée par un autre processus : seul last_seen est visible ici
+        Profile.objects.filter(user=self.bob).update(last_seen=self.later - timedelta(minutes=1))
+        cache.clear()
+
+        stats = send_digests(now=self.later)
+
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(mail.outbox[0].to, [self.alice.email])
+        self.assertEqual(list(MessageNotification.objects.values_list('recipient_id', flat=True)), [self.bob.id])
+
+    def test_smtp_failure_postpones_with_backoff(self):
+        send_message(self.thread, self.bob, "Salut")
+
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=smtplib.SMTPException("indisponible"),
+        ):
+            stats = send_digests(now=self.later)
+
+        notification = MessageNotification.objects.get()
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(notification.attempts, 1)
+        self.assertGreater(notification.next_attempt_at, self.later)
+
+        # Pas de nouvel essai avant la fin du délai
+        self.assertEqual(send_digests(now=self.later)['sent'], 0)
+
+
+class LoadTestCommandTests(TestCase):
+
+    def test_loadtest_reports_and_cleans_up(self):
+        out = StringIO()
+
+        call_command('loadtest_chat', users=2, messages=2, concurrency=1, stdout=out)
+
+        self.assertIn("Requêtes SQL par message envoyé", out.getvalue())
+        self.assertIn("Aucune erreur.", out.getvalue())
+        self.assertFalse(get_user_model().objects.filter(username__startswith='loadtest-').exists())
+        self.assertFalse(Message.objects.exists())
@@ -6,8 +6,12 @@ app_name = 'messaging'
 
 urlpatterns = [
     path('', views.InboxView.as_view(), name='list'),
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('search/', views.MessageSearchView.as_view(), name='search'),
     path('thread/<int:pk>/', views.ChatView.as_view(), name='detail'),
+    path('thread/<int:pk>/history/', views.MessageHistoryView.as_view(), name='history'),
     path('thread/<int:pk>/poll/', views.NewMessagesView.as_view(), name='poll'),
+    path('thread/<int:pk>/typing/', views.TypingView.as_view(), name='typing'),
     path('thread/<int:pk>/check/', views.CheckNewMessagesView.as_view(), name='check'),
     path('start/<int:user_id>/', views.start_conversation, name='start'),
 ]
\ No newline at end of file
@@ -4,11 +4,66 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import View, ListView
 from django.http import HttpResponse, JsonResponse
 from django.db.models import Q, Max, Count, Prefetch
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.core.files.storage import default_storage
+from django.utils import timezone
+from datetime import datetime
 
-from .models import Thread, Message, get_or_create_thread
+from .models import (
+    Thread, Message, ReadReceipt,
+    find_thread, get_or_create_thread, mark_thread_read, read_upto_subquery, send_message,
+)
+from apps.core.ratelimit import check_rate_limit
+from .archive import message_history
 from .forms import MessageForm
+from .presence import is_online, online_user_ids, set_typing, touch_presence, typing_user_ids
+from .search import search_messages
+
+# Taille d'un lot de messages (chargement initial et "messages plus anciens")
+HISTORY_PAGE_SIZE = 50
+
+# Nombre maximum de messages renvoyés par un appel de synchronisation
+SYNC_BATCH_SIZE = 200
+
+
+def serialize_message(msg, user):
+    """Représentation JSON d'un message (polling et synchronisation)"""
+    return {
+        'id': msg.id,
+        'thread_id': msg.thread_id,
+        'content': msg.content,
+        'image_url': msg.image.url if msg.image else None,
+        'thumbnail_url': msg.thumbnail.url if msg.thumbnail else None,
+        'sender_id': msg.sender.id,
+        'sender_name': msg.sender.get_full_name(),
+        'sender_avatar': msg.sender.avatar.url if msg.sender.avatar else None,
+        'created_at': msg.created_at.strftime('%H:%M'),
+        'is_mine': msg.sender_id == user.id
+    }
+
+
+def format_sync_cursor(after, since):
+    """Curseur opaque : "<dernier id de message>:<horodatage en ms>" """
+    return f"{after}:{int(since.timestamp() * 1000)}"
+
+
+def initial_sync_cursor(user):
+    """Curseur "maintenant" : dernier message existant dans les conversations de l'utilisateur"""
+    now = timezone.now()
+    last_id = Message.objects.filter(
+        thread__participants=user
+    ).order_by('-id').values_list('id', flat=True).first()
+    return format_sync_cursor(last_id or 0, now)
+
+
+def parse_sync_cursor(value):
+    """Retourne (after, since) ou lève ValueError si le curseur est invalide"""
+    after, since_ms = value.split(':')
+    since = datetime.fromtimestamp(int(since_ms) / 1000, tz=timezone.get_current_timezone())
+    return int(after), since
 
 
 # ===================================
@@ -35,7 +90,13 @@ class InboxView(LoginRequiredMixin, ListView):
                 to_attr='prefetched_messages'
             )
         ).annotate(
-            last_message_time=Max('messages__created_at')
+            last_message_time=Max('messages__created_at'),
+            # Non lus = messages de l'autre au-delà de mon curseur de lecture (calculé en SQL)
+            unread_count=Count(
+                'messages',
+                filter=Q(messages__id__gt=read_upto_subquery(user, 'pk')) & ~Q(messages__sender=user),
+                distinct=True
+            )
         ).order_by('-last_message_time')
 
     def get_context_data(self, **kwargs):
@@ -44,18 +105,22 @@ class InboxView(LoginRequiredMixin, ListView):
         
         thread_data = []
         total_unread = 0
+
+        # Autres participants, à partir des participants préchargés (pas de requête par thread)
+        others = {
+            thread.id: next((p for p in thread.participants.all() if p.id != user.id), None)
+            for thread in context['thread_list']
+        }
+        online_ids = online_user_ids(other.id for other in others.values() if other)
         
         for thread in context['thread_list']:
-            other_user = thread.get_other_participant(user)
+            other_user = others[thread.id]
             
             if not other_user:
                 continue
 
-            # Compter les messages non lus
-            unread_count = Message.objects.filter(
-                thread=thread,
-                is_read=False
-            ).exclude(sender=user).count()
+            # Messages non lus (annotés dans get_queryset)
+            unread_count = thread.unread_count
             
             total_unread += unread_count
             
@@ -69,10 +134,12 @@ class InboxView(LoginRequiredMixin, ListView):
                 'other_user': other_user,
                 'unread_count': unread_count,
                 'last_message': last_msg,
+                'is_online': other_user.id in online_ids,
             })
         
         context['threads'] = thread_data
         context['total_unread'] = total_unread
+        context['sync_cursor'] = initial_sync_cursor(user)
         
         return context
 
@@ -100,34 +167,36 @@ class ChatView(LoginRequiredMixin, View):
         
         user = request.user
 
-        # Charger les 50 derniers messages
-        messages = thread.messages.select_related('sender').order_by('-created_at')[:50]
+        # Charger les derniers messages (table Message, puis archives si nécessaire)
+        messages, has_older = message_history(thread, limit=HISTORY_PAGE_SIZE)
         
         # Inverser l'ordre pour l'affichage (du plus ancien au plus récent)
         messages_list = list(reversed(messages))
         
-        # Marquer les messages de l'autre comme lus
-        thread.messages.filter(
-            is_read=False
-        ).exclude(
-            sender=user
-        ).update(is_read=True)
+        # ID du dernier message pour le polling
+        last_message_id = messages[0].id if messages else 0
+
+        # Marquer la conversation comme lue : une seule ligne mise à jour (curseur de lecture)
+        mark_thread_read(thread, user, last_message_id)
 
         # Récupérer l'autre participant
         other_user = thread.get_other_participant(user)
 
+        touch_presence(user.id)
+
         # Préparer le formulaire
         form = MessageForm()
 
-        # ID du dernier message pour le polling
-        last_message_id = messages[0].id if messages else 0
-
         return render(request, self.template_name, {
             'thread': thread,
             'messages': messages_list,
             'form': form,
             'other_user': other_user,
-            'last_message_id': last_message_id
+            'last_message_id': last_message_id,
+            'other_read_upto': thread.read_upto(other_user) if other_user else 0,
+            'other_online': bool(other_user and is_online(other_user.id)),
+            'has_older': has_older,
+            'oldest_message_id': messages_list[0].id if messages_list else 0,
         })
 
     def post(self, request, *args, **kwargs):
@@ -138,16 +207,21 @@ class ChatView(LoginRequiredMixin, View):
         
         user = request.user
 
+        # Anti-spam : token bucket par utilisateur (429 + Retry-After si dépassé)
+        limited = check_rate_limit(request, 'message_send')
+        if limited:
+            return limited
+
         # Créer le formulaire avec les données
         form = MessageForm(request.POST, request.FILES)
         
         if form.is_valid():
-            # Créer le message
-            message = Message.objects.create(
-                thread=thread,
-                sender=user,
-                content=form.cleaned_data['content'],
-                image=form.cleaned_data.get('image')
+            # Créer le message (l'image est réduite en arrière-plan)
+            message = send_message(
+                thread,
+                user,
+                form.cleaned_data['content'],
+                form.cleaned_data.get('image')
             )
             
             # Réponse JSON pour HTMX avec toutes les informations nécessaires
@@ -166,6 +240,47 @@ class ChatView(LoginRequiredMixin, View):
                 return self.get(request, *args, **kwargs)
 
 
+# ===================================
+# 2 bis. HISTORIQUE - "Charger les messages plus anciens"
+# ===================================
+class MessageHistoryView(LoginRequiredMixin, View):
+    """
+    Pagination par curseur (keyset) de l'historique d'une conversation.
+    On parcourt l'index (thread_id, id) avec `id < before` au lieu d'un OFFSET,
+    le coût reste constant quelle que soit la profondeur du scroll.
+    Retourne un lot HTML (HTMX) à insérer en tête de #message-container.
+    """
+
+    def get(self, request, pk):
+        try:
+            before = int(request.GET.get('before', 0))
+        except ValueError:
+            return HttpResponse("Curseur invalide", status=400)
+
+        thread = get_object_or_404(Thread, id=pk)
+        user = request.user
+
+        if user not in thread.participants.all():
+            return HttpResponse("Unauthorized", status=403)
+
+        if before <= 0:
+            return HttpResponse("", status=200)
+
+        # Range scan sur l'index (thread_id, id) : id < curseur, du plus récent au plus ancien.
+        # Au-delà de l'historique "chaud", les archives mensuelles sont réhydratées à la demande.
+        older, has_older = message_history(thread, before=before, limit=HISTORY_PAGE_SIZE)
+        older = list(reversed(older))
+
+        return render(request, 'messaging/partials/message_history.html', {
+            'thread': thread,
+            'messages': older,
+            'user': user,
+            'has_older': has_older,
+            'oldest_message_id': older[0].id if older else 0,
+            'other_read_upto': thread.read_upto(thread.get_other_participant(user)),
+        })
+
+
 # ===================================
 # 3. POLLING - CORRIGÉ pour affichage temps réel
 # ===================================
@@ -188,28 +303,53 @@ class NewMessagesView(LoginRequiredMixin, View):
             return HttpResponse("Unauthorized", status=403)
 
         # Récupérer les nouveaux messages (plus récents que last_id)
-        new_messages = thread.messages.filter(
+        new_messages = list(thread.messages.filter(
             id__gt=last_id
         ).exclude(
             sender=user  # Exclure ses propres messages
-        ).select_related('sender').order_by('created_at')
+        ).select_related('sender').order_by('id'))
         
         # Si pas de nouveaux messages, retourner une réponse vide
-        if not new_messages.exists():
-            return HttpResponse("", status=200)
+        if not new_messages:
+            response = HttpResponse("", status=200)
+        else:
+            # Mettre à jour le dernier ID
+            last_message_id = new_messages[-1].id
 
-        # Marquer comme lus
-        new_messages.update(is_read=True)
-        
-        # Mettre à jour le dernier ID
-        last_message_id = new_messages.last().id
-        
-        # Renvoyer le HTML des nouveaux messages
-        return render(request, 'messaging/partials/new_messages_list.html', {
-            'messages': new_messages,
-            'user': user,
-            'last_message_id': last_message_id
-        })
+            # Marquer comme lus (curseur de lecture, une seule ligne)
+            mark_thread_read(thread, user, last_message_id)
+            
+            # Renvoyer le HTML des nouveaux messages
+            response = render(request, 'messaging/partials/new_messages_list.html', {
+                'messages': new_messages,
+                'user': user,
+                'last_message_id': last_message_id
+            })
+
+        # Présence et "écrit..." de l'autre, dans le même aller-retour (en-têtes, lus depuis le cache)
+        touch_presence(user.id)
+        other_ids = [p.id for p in thread.participants.all() if p.id != user.id]
+        response['X-Other-Online'] = '1' if online_user_ids(other_ids) else '0'
+        response['X-Other-Typing'] = '1' if typing_user_ids(thread.id, other_ids) else '0'
+        return response
+
+
+# ===================================
+# 3 bis. "ÉCRIT..." - signal éphémère (cache uniquement)
+# ===================================
+class TypingView(LoginRequiredMixin, View):
+    """POST appelé (avec limitation côté client) pendant la saisie d'un message"""
+
+    def post(self, request, pk):
+        thread = get_object_or_404(Thread, id=pk)
+        user = request.user
+
+        if user not in thread.participants.all():
+            return HttpResponse("Unauthorized", status=403)
+
+        touch_presence(user.id)
+        set_typing(thread.id, user.id)
+        return HttpResponse(status=204)
 
 
 # ===================================
@@ -231,46 +371,166 @@ class CheckNewMessagesView(LoginRequiredMixin, View):
             return JsonResponse({'error': 'Unauthorized'}, status=403)
         
         # Récupérer les nouveaux messages
-        new_messages = thread.messages.filter(
+        new_messages = list(thread.messages.filter(
             id__gt=last_id
         ).exclude(
             sender=user
-        ).select_related('sender').order_by('created_at')
+        ).select_related('sender').order_by('id'))
         
         # Sérialiser les messages
-        messages_data = []
-        for msg in new_messages:
-            messages_data.append({
-                'id': msg.id,
-                'content': msg.content,
-                'image_url': msg.image.url if msg.image else None,
-                'sender_id': msg.sender.id,
-                'sender_name': msg.sender.get_full_name(),
-                'sender_avatar': msg.sender.avatar.url if msg.sender.avatar else None,
-                'created_at': msg.created_at.strftime('%H:%M'),
-                'is_mine': msg.sender == user
-            })
-        
-        # Marquer comme lus
-        new_messages.update(is_read=True)
+        messages_data = [serialize_message(msg, user) for msg in new_messages]
         
         # Dernier ID
-        last_message_id = new_messages.last().id if new_messages.exists() else last_id
+        last_message_id = new_messages[-1].id if new_messages else last_id
+
+        # Marquer comme lus (curseur de lecture, une seule ligne)
+        if new_messages:
+            mark_thread_read(thread, user, last_message_id)
         
+        other_user = thread.get_other_participant(user)
+
         return JsonResponse({
-            'has_new': new_messages.exists(),
+            'has_new': bool(new_messages),
             'messages': messages_data,
-            'last_message_id': last_message_id
+            'last_message_id': last_message_id,
+            # Curseur de lecture de l'autre : mes messages avec id <= cette valeur sont "vus"
+            'other_read_upto': thread.read_upto(other_user) if other_user else 0,
+        })
+
+
+# ===================================
+# 4 bis. SYNCHRONISATION MULTI-CONVERSATIONS (API JSON)
+# ===================================
+class SyncView(LoginRequiredMixin, View):
+    """
+    Un seul appel pour toutes les conversations de l'utilisateur, au lieu
+    d'un polling par thread ouvert.
+
+    ?cursor=<after>:<since_ms>
+    - after : dernier Message.id connu (range scan `id > after` sur l'index (thread_id, id))
+    - since : horodatage des derniers changements de curseurs de lecture / threads déjà reçus
+
+    Sans curseur, on renvoie seulement le curseur courant (le client part de "maintenant").
+    """
+
+    def get(self, request):
+        user = request.user
+        # Horodatage pris AVANT les requêtes : un changement concurrent sera renvoyé au prochain appel
+        now = timezone.now()
+
+        cursor = request.GET.get('cursor')
+        if not cursor:
+            return JsonResponse({
+                'cursor': initial_sync_cursor(user),
+                'has_more': False,
+                'messages': [],
+                'receipts': [],
+                'threads': [],
+                'online_threads': [],
+            })
+
+        try:
+            after, since = parse_sync_cursor(cursor)
+        except (ValueError, OverflowError, OSError):
+            return JsonResponse({'error': 'Curseur invalide'}, status=400)
+
+        touch_presence(user.id)
+        thread_ids = list(user.threads.values_list('id', flat=True))
+
+        # 1. Nouveaux messages, toutes conversations confondues
+        new_messages = list(
+            Message.objects.filter(
+                thread_id__in=thread_ids,
+                id__gt=after
+            ).select_related('sender').order_by('id')[:SYNC_BATCH_SIZE + 1]
+        )
+        has_more = len(new_messages) > SYNC_BATCH_SIZE
+        new_messages = new_messages[:SYNC_BATCH_SIZE]
+
+        # 2. Curseurs de lecture modifiés (ticks "vu" et compteurs des autres appareils)
+        receipts = list(
+            ReadReceipt.objects.filter(
+                thread_id__in=thread_ids,
+                updated_at__gt=since
+            ).values('thread_id', 'user_id', 'last_read_id')
+        )
+
+        # 3. Threads touchés : nouveaux messages, lectures ou mise à jour du thread lui-même
+        touched_ids = {msg.thread_id for msg in new_messages}
+        touched_ids.update(receipt['thread_id'] for receipt in receipts)
+        touched_ids.update(
+            Thread.objects.filter(id__in=thread_ids, updated_at__gt=since).values_list('id', flat=True)
+        )
+
+        last_by_thread = {msg.thread_id: msg for msg in new_messages}
+        threads_data = []
+        if touched_ids:
+            threads = Thread.objects.filter(id__in=touched_ids).annotate(
+                unread_count=Count(
+                    'messages',
+                    filter=Q(messages__id__gt=read_upto_subquery(user, 'pk')) & ~Q(messages__sender=user)
+                )
+            )
+            for thread in threads:
+                last_msg = last_by_thread.get(thread.id)
+                threads_data.append({
+                    'id': thread.id,
+                    'is_active': thread.is_active,
+                    'unread_count': thread.unread_count,
+                    'last_message': serialize_message(last_msg, user) if last_msg else None,
+                })
+
+        # 4. Présence : threads dont l'autre participant est en ligne (cache, pas de DB hors participants)
+        contacts = Thread.participants.through.objects.filter(
+            thread_id__in=thread_ids
+        ).exclude(user_id=user.id).values_list('thread_id', 'user_id')
+        contacts = list(contacts)
+        online_ids = online_user_ids({user_id for _, user_id in contacts})
+
+        next_after = new_messages[-1].id if new_messages else after
+        return JsonResponse({
+            'cursor': format_sync_cursor(next_after, now if not has_more else since),
+            'has_more': has_more,
+            'messages': [serialize_message(msg, user) for msg in new_messages],
+            'receipts': receipts,
+            'threads': threads_data,
+            'online_threads': sorted({thread_id for thread_id, user_id in contacts if user_id in online_ids}),
+        })
+
+
+# ===================================
+# 4 ter. RECHERCHE DANS SES CONVERSATIONS (HTMX)
+# ===================================
+class MessageSearchView(LoginRequiredMixin, View):
+    """?q=... -> messages de mes conversations contenant ces mots (via l'index MessageToken)"""
+
+    def get(self, request):
+        query = request.GET.get('q', '').strip()[:200]
+        results = search_messages(request.user, query) if query else []
+
+        # Interlocuteur de chaque résultat, depuis les participants préchargés
+        for message in results:
+            message.other_user = next(
+                (p for p in message.thread.participants.all() if p.id != request.user.id), None
+            )
+
+        return render(request, 'messaging/partials/search_results.html', {
+            'results': results,
+            'query': query,
         })
 
 
 # ===================================
 # 5. DÉMARRER UNE CONVERSATION
 # ===================================
+@login_required
 def start_conversation(request, user_id):
-    from django.contrib.auth import get_user_model
-    from django.contrib.auth.decorators import login_required
-    
+    """
+    Ouvre la conversation avec `user_id` SANS la créer.
+    - GET : redirige vers le thread existant, sinon affiche un chat vide
+    - POST : crée le thread ET le premier message dans la même transaction
+    Parcourir des profils n'écrit donc plus rien en base.
+    """
     User = get_user_model()
     
     other_user = get_object_or_404(User, id=user_id)
@@ -278,6 +538,48 @@ def start_conversation(request, user_id):
     if other_user == request.user:
         return redirect('messaging:list')
     
-    thread = get_or_create_thread(request.user, other_user)
-    
-    return redirect('messaging:detail', pk=thread.id)
\ No newline at end of file
+    thread = find_thread(request.user, other_user)
+    if thread:
+        if request.method == 'POST':
+            # Conversation créée entre-temps (autre onglet) : on poste dans le thread existant
+            return ChatView.as_view()(request, pk=thread.id)
+        return redirect('messaging:detail', pk=thread.id)
+
+    if request.method == 'POST':
+        form = MessageForm(request.POST, request.FILES)
+
+        if form.is_valid():
+            # Nouvelle conversation : limite sur les créations de threads par heure,
+            # puis seulement ensuite sur les messages (pas de jeton perdu si refus)
+            limited = check_rate_limit(request, 'thread_create') or check_rate_limit(request, 'message_send')
+            if limited:
+                return limited
+
+            with transaction.atomic():
+                thread = get_or_create_thread(request.user, other_user)
+                send_message(
+                    thread,
+                    request.user,
+                    form.cleaned_data['content'],
+                    form.cleaned_data.get('image')
+                )
+
+            # HTMX : rechargement complet vers le vrai thread (polling, historique...)
+            if request.headers.get('HX-Request'):
+                response = HttpResponse(status=204)
+                response['HX-Redirect'] = reverse('messaging:detail', kwargs={'pk': thread.id})
+                return response
+            return redirect('messaging:detail', pk=thread.id)
+
+        if request.headers.get('HX-Request'):
+            return HttpResponse('<div class="text-red-500 p-2">Erreur lors de l\'envoi du message</div>', status=400)
+    else:
+        form = MessageForm()
+
+    return render(request, ChatView.template_name, {
+        'thread': None,
+        'messages': [],
+        'form': form,
+        'other_user': other_user,
+        'last_message_id': 0,
+    })
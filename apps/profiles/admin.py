@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Profile, ProfileImage
+from .models import ActivityEvent, Profile, ProfileImage
 
 class ProfileImageInline(admin.TabularInline):
     model = ProfileImage
@@ -10,4 +10,13 @@ class ProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'gender', 'city', 'is_diaspora', 'is_active')
     list_filter = ('gender', 'is_diaspora', 'is_active')
     search_fields = ('user__email', 'city', 'bio')
-    inlines = [ProfileImageInline]
\ No newline at end of file
+    inlines = [ProfileImageInline]
+
+
+@admin.register(ActivityEvent)
+class ActivityEventAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'kind', 'actor', 'created_at')
+    list_filter = ('kind',)
+    list_select_related = ('recipient', 'actor')
+    raw_id_fields = ('recipient', 'actor')
+    search_fields = ('recipient__email',)
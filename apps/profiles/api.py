@@ -0,0 +1,53 @@
+# apps/profiles/api.py
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.core.ratelimit import check_rate_limit
+from .models import apply_swipes
+from .serializers import MatchSerializer, SwipeBatchSerializer
+
+
+class SwipeBatchView(APIView):
+    """
+    POST /api/v1/profiles/swipes/
+    {"swipes": [{"user_id": 12, "action": "like"}, {"user_id": 15, "action": "pass"}, ...]}
+
+    Tout le lot est traité en quelques requêtes groupées, quelle que soit sa taille.
+    Pour un même utilisateur, la dernière décision du lot l'emporte.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        limited = check_rate_limit(request, 'swipe_batch')
+        if limited:
+            return limited
+
+        serializer = SwipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        decisions = {}
+        for swipe in serializer.validated_data['swipes']:
+            decisions[swipe['user_id']] = swipe['action']
+
+        # Utilisateurs inexistants (supprimés depuis le swipe) et soi-même ignorés
+        User = get_user_model()
+        existing = set(
+            User.objects.filter(id__in=decisions, is_active=True)
+            .exclude(id=request.user.id)
+            .values_list('id', flat=True)
+        )
+        liked_ids = [user_id for user_id, action in decisions.items() if action == 'like' and user_id in existing]
+        passed_ids = [user_id for user_id, action in decisions.items() if action == 'pass' and user_id in existing]
+
+        match_ids = apply_swipes(request.user, liked_ids, passed_ids)
+        matched_users = User.objects.filter(id__in=match_ids).select_related('profile').order_by('id')
+
+        return Response({
+            'liked': len(liked_ids),
+            'passed': len(passed_ids),
+            'ignored': len(decisions) - len(liked_ids) - len(passed_ids),
+            'matches': MatchSerializer(matched_users, many=True, context={'request': request}).data,
+        }, status=status.HTTP_200_OK)
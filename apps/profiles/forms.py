@@ -1,6 +1,11 @@
 from django import forms
+from apps.core.images import process_upload, validate_upload
 from .models import Profile, ProfileImage
 
+# Taille maximale conservée (les miniatures affichées sont dérivées de ce fichier)
+AVATAR_SIZE = (1200, 1200)
+PROFILE_IMAGE_SIZE = (2048, 2048)
+
 class ProfileForm(forms.ModelForm):
     """
     Formulaire principal.
@@ -27,7 +32,7 @@ class ProfileForm(forms.ModelForm):
             'class': 'file-input file-input-bordered w-full',
             'accept': 'image/png, image/jpeg, image/webp'
         }),
-        help_text="JPG ou PNG. Max 2MB. C'est la photo qui apparaîtra dans la grille."
+        help_text="JPG, PNG ou WebP. 10 Mo max. C'est la photo qui apparaîtra dans la grille."
     )
 
     class Meta:
@@ -51,6 +56,12 @@ class ProfileForm(forms.ModelForm):
             self.fields['first_name'].initial = self.instance.user.first_name
             self.fields['last_name'].initial = self.instance.user.last_name
 
+    def clean_avatar(self):
+        avatar = self.cleaned_data.get('avatar')
+        if not avatar:
+            return avatar
+        return validate_upload(avatar)
+
     def save(self, commit=True):
         """
         Sauvegarde le Profil ET met à jour l'Avatar de l'User.
@@ -61,9 +72,9 @@ class ProfileForm(forms.ModelForm):
         profile.user.first_name = self.cleaned_data['first_name']
         profile.user.last_name = self.cleaned_data['last_name']
 
-        # 2. Mise à jour de l'AVATAR (si un fichier est uploadé)
+        # 2. Mise à jour de l'AVATAR (si un fichier est uploadé), réduit avant stockage
         if 'avatar' in self.cleaned_data and self.cleaned_data['avatar']:
-            profile.user.avatar = self.cleaned_data['avatar']
+            profile.user.avatar = process_upload(self.cleaned_data['avatar'], AVATAR_SIZE)
 
         # 3. Sauvegarder l'User d'abord (pour que l'image soit enregistrée)
         profile.user.save()
@@ -85,6 +96,12 @@ class ProfileImageForm(forms.Form):
         })
     )
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if not image:
+            return image
+        return validate_upload(image)
+
     def save(self, profile):
         """
         Sauvegarde SEULEMENT si un fichier est fourni.
@@ -95,9 +112,12 @@ class ProfileImageForm(forms.Form):
             # Supprimer l'ancienne couverture
             profile.images.filter(is_cover=True).delete()
             
-            # Créer la nouvelle
-            ProfileImage.objects.create(
+            # Créer la nouvelle (le signal post_save met à jour profile.cover_image en base)
+            cover = ProfileImage.objects.create(
                 profile=profile,
-                image=image_file,
+                image=process_upload(image_file, PROFILE_IMAGE_SIZE),
                 is_cover=True
-            )
\ No newline at end of file
+            )
+            profile.cover_image = cover
+            return cover
+        return None
@@ -0,0 +1,44 @@
+# apps/profiles/management/commands/prune_activity.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.profiles.models import ActivityEvent
+
+
+class Command(BaseCommand):
+    help = "Supprime par lots les événements d'activité plus anciens que N jours"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=90,
+            help="Conserve les événements des N derniers jours (défaut : 90)"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help="Nombre d'événements supprimés par requête (défaut : 5000)"
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Affiche le nombre d'événements concernés sans rien supprimer"
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        old_events = ActivityEvent.objects.filter(created_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"{old_events.count()} événement(s) antérieur(s) au {cutoff:%d/%m/%Y} seraient supprimé(s).")
+            return
+
+        # Petits DELETE successifs : pas de long verrou sur la table
+        total = 0
+        while True:
+            ids = list(old_events.order_by('id').values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            ActivityEvent.objects.filter(id__in=ids).delete()
+            total += len(ids)
+
+        self.stdout.write(self.style.SUCCESS(f"Terminé : {total} événement(s) supprimé(s)."))
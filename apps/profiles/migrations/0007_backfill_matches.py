@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-19 18:42
+
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+
+BATCH_SIZE = 1000
+
+
+def backfill_matches(apps, schema_editor):
+    """
+    Crée les matchs des likes réciproques existants. Chaque like réciproque
+    donne la ligne de son auteur ; le like inverse donne l'autre ligne.
+    """
+    Like = apps.get_model('profiles', 'Like')
+    Match = apps.get_model('profiles', 'Match')
+
+    reverse_like = Like.objects.filter(user=OuterRef('liked_user'), liked_user=OuterRef('user'))
+    pairs = Like.objects.filter(Exists(reverse_like)).values_list('user_id', 'liked_user_id')
+
+    batch = []
+    for user_id, liked_user_id in pairs.iterator(chunk_size=BATCH_SIZE):
+        batch.append(Match(user_id=user_id, matched_user_id=liked_user_id))
+        if len(batch) >= BATCH_SIZE:
+            Match.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    Match.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0006_like_indexes_match'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_matches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-19 19:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0008_pass'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('like', 'Like'), ('match', 'Match'), ('message', 'Message'), ('visit', 'Visite')], max_length=10)),
+                ('thread_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('preview', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': "Événement d'activité",
+                'verbose_name_plural': "Journal d'activité",
+                'indexes': [models.Index(fields=['recipient', '-created_at', '-id'], name='activity_recipient_created_idx')],
+            },
+        ),
+    ]
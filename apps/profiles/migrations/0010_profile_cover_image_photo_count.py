@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-19 20:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0009_activityevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='cover_image',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='profiles.profileimage', verbose_name='Photo de couverture'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='photo_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
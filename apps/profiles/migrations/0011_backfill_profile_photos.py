@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-19 20:22
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_profile_photos(apps, schema_editor):
+    """Remplit cover_image et photo_count de tous les profils en un seul UPDATE"""
+    Profile = apps.get_model('profiles', 'Profile')
+    ProfileImage = apps.get_model('profiles', 'ProfileImage')
+
+    images = ProfileImage.objects.filter(profile=OuterRef('pk'))
+    Profile.objects.update(
+        photo_count=Coalesce(
+            Subquery(images.order_by().values('profile').annotate(total=Count('pk')).values('total')),
+            0,
+        ),
+        cover_image=Subquery(images.filter(is_cover=True).order_by('-created_at').values('pk')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0010_profile_cover_image_photo_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_profile_photos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 6.0 on 2026-10-19 23:10
+
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+# Même fenêtre que prune_activity (défaut) : inutile de recréer ce qui serait purgé
+RETENTION_DAYS = 90
+
+
+def _bulk_insert(ActivityEvent, events):
+    batch = []
+    for event in events:
+        batch.append(event)
+        if len(batch) >= BATCH_SIZE:
+            ActivityEvent.objects.bulk_create(batch)
+            batch = []
+    ActivityEvent.objects.bulk_create(batch)
+
+
+def backfill_activity_events(apps, schema_editor):
+    """
+    Recrée le journal d'activité à partir des likes, matchs et messages
+    existants, pour que "Activité récente" ne soit pas vide au déploiement.
+    Seules les lignes antérieures au premier événement déjà journalisé sont
+    reprises : rien n'est dupliqué si le journal a commencé à se remplir.
+    """
+    ActivityEvent = apps.get_model('profiles', 'ActivityEvent')
+    Like = apps.get_model('profiles', 'Like')
+    Match = apps.get_model('profiles', 'Match')
+    Message = apps.get_model('messaging', 'Message')
+
+    window = {'created_at__gte': timezone.now() - timedelta(days=RETENTION_DAYS)}
+    first_logged = ActivityEvent.objects.order_by('created_at').values_list('created_at', flat=True).first()
+    if first_logged:
+        window['created_at__lt'] = first_logged
+
+    likes = Like.objects.filter(**window).values_list('user_id', 'liked_user_id', 'created_at')
+    _bulk_insert(ActivityEvent, (
+        ActivityEvent(recipient_id=liked_user_id, actor_id=user_id, kind='like', created_at=created_at)
+        for user_id, liked_user_id, created_at in likes.iterator(chunk_size=BATCH_SIZE)
+    ))
+
+    # Match.created_at vaut la date du déploiement pour les lignes reprises par
+    # 0007 : le match date du second like (le plus récent des deux)
+    def like_at(user_field, liked_field):
+        return Subquery(
+            Like.objects.filter(user_id=OuterRef(user_field), liked_user_id=OuterRef(liked_field))
+            .values('created_at')[:1]
+        )
+
+    given, received = like_at('user_id', 'matched_user_id'), like_at('matched_user_id', 'user_id')
+    matches = Match.objects.annotate(
+        # Like supprimé depuis : on se rabat sur l'autre, puis sur Match.created_at
+        matched_at=Greatest(Coalesce(given, received, 'created_at'), Coalesce(received, given, 'created_at'))
+    ).filter(matched_at__gte=window['created_at__gte'])
+    if first_logged:
+        matches = matches.filter(matched_at__lt=first_logged)
+
+    # Une ligne Match par sens : chaque ligne donne l'événement de son propriétaire
+    matches = matches.values_list('user_id', 'matched_user_id', 'matched_at')
+    _bulk_insert(ActivityEvent, (
+        ActivityEvent(recipient_id=user_id, actor_id=matched_user_id, kind='match', created_at=matched_at)
+        for user_id, matched_user_id, matched_at in matches.iterator(chunk_size=BATCH_SIZE)
+    ))
+
+    # Destinataire = l'autre membre de la paire canonique du thread
+    messages = Message.objects.filter(**window).values_list(
+        'sender_id', 'thread_id', 'thread__user_low_id', 'thread__user_high_id', 'content', 'created_at'
+    )
+    _bulk_insert(ActivityEvent, (
+        ActivityEvent(
+            recipient_id=user_high_id if sender_id == user_low_id else user_low_id,
+            actor_id=sender_id,
+            kind='message',
+            thread_id=thread_id,
+            preview=(content or "📷 Photo")[:100],
+            created_at=created_at,
+        )
+        for sender_id, thread_id, user_low_id, user_high_id, content, created_at
+        in messages.iterator(chunk_size=BATCH_SIZE)
+        if user_low_id and user_high_id
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0012_profile_last_seen_buffered'),
+        ('messaging', '0011_messagenotification'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_activity_events, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
-from datetime import date
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from apps.core.models import DirtyFieldsMixin
 
 # --- 1. FONCTIONS DE VALIDATION ---
 
@@ -18,7 +22,7 @@ def validate_is_adult(value):
 
 # --- 2. MODÈLE PROFIL ---
 
-class Profile(models.Model):
+class Profile(DirtyFieldsMixin, models.Model):
     GENDER_CHOICES = [
         ("M", _("Homme")),
         ("F", _("Femme")),
@@ -63,7 +67,20 @@ class Profile(models.Model):
 
     # Modération et présence
     is_active = models.BooleanField(default=True)
-    last_seen = models.DateTimeField(auto_now=True)
+    # Écrit par lots depuis le cache (apps.messaging.presence.flush_last_seen), pas à chaque save()
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    # Dénormalisé, tenu à jour par les signaux de ProfileImage (signals.py) :
+    # couverture et complétude affichées sans requête sur la galerie
+    cover_image = models.ForeignKey(
+        'ProfileImage',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        verbose_name=_("Photo de couverture")
+    )
+    photo_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name = _("Profil")
@@ -74,6 +91,8 @@ class Profile(models.Model):
             models.Index(fields=['city']),
             models.Index(fields=['is_diaspora']),
             models.Index(fields=['relationship_goal']),
+            # Filtre "en ligne" : présélection des profils vus récemment
+            models.Index(fields=['last_seen'], name='profile_last_seen_idx'),
         ]
 
     @property
@@ -140,4 +159,251 @@ class Like(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('user', 'liked_user')
\ No newline at end of file
+        unique_together = ('user', 'liked_user')
+        indexes = [
+            # Réciprocité : "est-ce que X m'a liké ?" / "lesquels de ceux qui m'ont liké ai-je likés ?"
+            models.Index(fields=['liked_user', 'user'], name='like_liked_user_user_idx'),
+            # Flux "Qui m'a liké" paginé par clé (id décroissant)
+            models.Index(fields=['liked_user', 'id'], name='like_liked_user_id_idx'),
+        ]
+
+
+class Match(models.Model):
+    """
+    Like réciproque. Deux lignes par match (une par utilisateur) : le flux
+    "Mes matchs" est un simple parcours de l'index (user, id), sans OR.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="matches"
+    )
+    matched_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'matched_user')
+        indexes = [
+            models.Index(fields=['user', 'id'], name='match_user_id_idx'),
+        ]
+
+
+class Pass(models.Model):
+    """Profil écarté ("pass") lors du swipe : il n'est plus proposé"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="passes_given"
+    )
+    passed_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'passed_user')
+
+
+class ActivityEvent(models.Model):
+    """
+    Journal d'activité (en ajout seul) affiché sur le dashboard.
+    Écrit par les services qui créent likes, matchs, messages et visites ;
+    le flux d'un utilisateur est une seule lecture de l'index (recipient, -created_at).
+    """
+    KIND_CHOICES = [
+        ("like", _("Like")),
+        ("match", _("Match")),
+        ("message", _("Message")),
+        ("visit", _("Visite")),
+    ]
+
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="activity_events"
+    )
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Conversation concernée (événements "message")
+    thread_id = models.PositiveBigIntegerField(null=True, blank=True)
+    # Extrait dénormalisé : le flux n'a pas à relire le message
+    preview = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = _("Événement d'activité")
+        verbose_name_plural = _("Journal d'activité")
+        indexes = [
+            # id en départage : plusieurs événements peuvent partager le même horodatage
+            models.Index(fields=['recipient', '-created_at', '-id'], name='activity_recipient_created_idx'),
+        ]
+
+
+# --- 4. LIKES ET MATCHS ---
+
+def create_match(user, other):
+    """
+    Crée les deux lignes du match et les événements d'activité.
+    Idempotent : retourne False si le match existait déjà (ou a été créé en parallèle).
+    """
+    # La ligne du plus petit id sert de verrou : un seul appel la crée
+    low, high = sorted((user, other), key=lambda u: u.pk)
+    with transaction.atomic():
+        _, created = Match.objects.get_or_create(user=low, matched_user=high)
+        if not created:
+            return False
+        Match.objects.get_or_create(user=high, matched_user=low)
+        ActivityEvent.objects.bulk_create([
+            ActivityEvent(recipient=user, actor=other, kind='match'),
+            ActivityEvent(recipient=other, actor=user, kind='match'),
+        ])
+    return True
+
+
+def like_user(user, liked_user):
+    """
+    Enregistre le like de `user` pour `liked_user` et crée le match si le like
+    inverse existe. Retourne (like créé ?, match ?).
+
+    Le like est validé AVANT la vérification de réciprocité : si deux
+    utilisateurs se likent au même moment, le second à vérifier voit
+    forcément le like du premier. Ne pas appeler dans un transaction.atomic().
+    """
+    _, created = Like.objects.get_or_create(user=user, liked_user=liked_user)
+    if created:
+        ActivityEvent.objects.create(recipient=liked_user, actor=user, kind='like')
+
+    # Index (liked_user, user) côté inverse : une seule lecture d'index
+    is_match = Like.objects.filter(user=liked_user, liked_user=user).exists()
+    if is_match:
+        # Idempotent : un nouveau like répare aussi un match manquant
+        create_match(user, liked_user)
+
+    return created, is_match
+
+
+def apply_swipes(user, liked_ids, passed_ids):
+    """
+    Enregistre un lot de swipes (likes et passes) en requêtes groupées et
+    retourne les ids des utilisateurs avec qui un NOUVEAU match vient d'être créé.
+
+    Même ordre que like_user() : les likes sont validés avant la détection
+    de réciprocité. Ne pas appeler dans un transaction.atomic().
+    """
+    already_liked = set(
+        Like.objects.filter(user=user, liked_user_id__in=liked_ids).values_list('liked_user_id', flat=True)
+    )
+    Like.objects.bulk_create(
+        [Like(user=user, liked_user_id=liked_id) for liked_id in liked_ids],
+        ignore_conflicts=True,
+    )
+    now = timezone.now()
+    ActivityEvent.objects.bulk_create([
+        ActivityEvent(recipient_id=liked_id, actor=user, kind='like', created_at=now)
+        for liked_id in liked_ids if liked_id not in already_liked
+    ])
+    Pass.objects.bulk_create(
+        [Pass(user=user, passed_user_id=passed_id) for passed_id in passed_ids],
+        ignore_conflicts=True,
+    )
+
+    # Likes inverses parmi les profils likés : une requête sur l'index (liked_user, user)
+    mutual_ids = set(
+        Like.objects.filter(liked_user=user, user_id__in=liked_ids).values_list('user_id', flat=True)
+    )
+    if not mutual_ids:
+        return []
+
+    already_matched = set(
+        Match.objects.filter(user=user, matched_user_id__in=mutual_ids).values_list('matched_user_id', flat=True)
+    )
+    new_ids = sorted(mutual_ids - already_matched)
+
+    with transaction.atomic():
+        Match.objects.bulk_create(
+            [Match(user=user, matched_user_id=other_id) for other_id in new_ids]
+            + [Match(user_id=other_id, matched_user=user) for other_id in new_ids],
+            ignore_conflicts=True,
+        )
+        ActivityEvent.objects.bulk_create(
+            [ActivityEvent(recipient=user, actor_id=other_id, kind='match', created_at=now) for other_id in new_ids]
+            + [ActivityEvent(recipient_id=other_id, actor=user, kind='match', created_at=now) for other_id in new_ids]
+        )
+    return new_ids
+
+
+def keyset_page(queryset, before=None, limit=24):
+    """
+    Page d'un flux trié par id décroissant, sans OFFSET ni COUNT.
+    Retourne (éléments, curseur de la page suivante ou None).
+    """
+    if before:
+        queryset = queryset.filter(id__lt=before)
+    items = list(queryset.order_by('-id')[:limit + 1])
+    next_cursor = items[limit - 1].id if len(items) > limit else None
+    return items[:limit], next_cursor
+
+
+# --- 5. JOURNAL D'ACTIVITÉ ---
+
+# Une visite du même profil n'est comptée qu'une fois par fenêtre
+VISIT_DEDUP_SECONDS = 6 * 3600
+
+
+def record_profile_view(viewer, profile):
+    """Enregistre la visite (ProfileView + événement), au plus une fois par fenêtre"""
+    if not cache.add(f"profile-view:{viewer.pk}:{profile.pk}", 1, VISIT_DEDUP_SECONDS):
+        return
+    ProfileView.objects.create(viewer=viewer, viewed_profile=profile)
+    ActivityEvent.objects.create(recipient_id=profile.user_id, actor=viewer, kind='visit')
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def format_activity_cursor(event):
+    """Curseur opaque "<created_at en µs>:<id>" (entiers exacts, pas de flottant)"""
+    delta = event.created_at - EPOCH
+    created_us = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{created_us}:{event.id}"
+
+
+def parse_activity_cursor(value):
+    """Inverse de format_activity_cursor ; None si le curseur est invalide"""
+    try:
+        created_us, event_id = (int(part) for part in value.split(':'))
+    except (AttributeError, ValueError):
+        return None
+    return EPOCH + timedelta(microseconds=created_us), event_id
+
+
+def activity_feed(user, cursor=None, limit=10):
+    """
+    Page du flux d'activité de `user`, du plus récent au plus ancien.
+    Pagination par clé sur (created_at, id) : une lecture d'index, sans OFFSET.
+    Retourne (événements, curseur de la page suivante ou None).
+    """
+    events = ActivityEvent.objects.filter(recipient=user)
+    position = parse_activity_cursor(cursor) if cursor else None
+    if position:
+        created_at, event_id = position
+        events = events.filter(
+            models.Q(created_at__lt=created_at) | models.Q(created_at=created_at, id__lt=event_id)
+        )
+
+    events = list(
+        events.select_related('actor__profile__cover_image')
+        .order_by('-created_at', '-id')[:limit + 1]
+    )
+    next_cursor = format_activity_cursor(events[limit - 1]) if len(events) > limit else None
+    return events[:limit], next_cursor
\ No newline at end of file
@@ -0,0 +1,29 @@
+# apps/profiles/serializers.py
+
+from rest_framework import serializers
+
+# Un client hors ligne peut accumuler beaucoup de swipes, mais pas sans limite
+MAX_SWIPES_PER_BATCH = 500
+
+
+# =========================================================================
+# 1. SWIPES GROUPÉS (POST /api/v1/profiles/swipes/)
+# =========================================================================
+
+class SwipeSerializer(serializers.Serializer):
+    """Une décision de swipe : like ou pass sur un utilisateur."""
+    user_id = serializers.IntegerField(min_value=1)
+    action = serializers.ChoiceField(choices=('like', 'pass'))
+
+
+class SwipeBatchSerializer(serializers.Serializer):
+    """Lot de swipes mis en file par le client (ordre chronologique)."""
+    swipes = SwipeSerializer(many=True, allow_empty=False, max_length=MAX_SWIPES_PER_BATCH)
+
+
+class MatchSerializer(serializers.Serializer):
+    """Nouveau match renvoyé au client."""
+    user_id = serializers.IntegerField(source='id')
+    first_name = serializers.CharField()
+    profile_id = serializers.IntegerField(source='profile.id', default=None)
+    avatar_url = serializers.ImageField(source='avatar', read_only=True)
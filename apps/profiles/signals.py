@@ -1,9 +1,12 @@
 #apps/profiles/signals.py
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from datetime import date, timedelta
-from .models import Profile
+from apps.messaging.models import Message
+from .models import ActivityEvent, Profile, ProfileImage
 
 User = get_user_model()
 
@@ -14,23 +17,71 @@ def manage_user_profile(sender, instance, created, **kwargs):
     On utilise get_or_create pour être certain de ne jamais tenter 
     une double insertion.
     """
-    if created:
-        # Calculer une date par défaut (18 ans en arrière)
-        default_dob = date.today() - timedelta(days=18*365)
-        
-        # On utilise get_or_create au lieu de .create()
-        # Cela vérifie si le profil existe AVANT d'essayer de l'insérer
-        Profile.objects.get_or_create(
-            user=instance,
-            defaults={
-                'date_of_birth': default_dob,
-                'gender': 'M',
-                'city': 'Cotonou',
-                'country': 'Bénin',
-                'relationship_goal': 'serious'
-            }
-        )
+    if not created:
+        # Mise à jour de l'User (connexion, mot de passe, avatar...) : rien à
+        # écrire dans le profil, qui est sauvegardé par ses propres formulaires
+        return
+
+    # Calculer une date par défaut (18 ans en arrière)
+    default_dob = date.today() - timedelta(days=18*365)
+    
+    # On utilise get_or_create au lieu de .create()
+    # Cela vérifie si le profil existe AVANT d'essayer de l'insérer
+    Profile.objects.get_or_create(
+        user=instance,
+        defaults={
+            'date_of_birth': default_dob,
+            'gender': 'M',
+            'city': 'Cotonou',
+            'country': 'Bénin',
+            'relationship_goal': 'serious'
+        }
+    )
+
+
+@receiver(post_save, sender=Message)
+def record_message_activity(sender, instance, created, **kwargs):
+    """Événement "message" pour le destinataire (clé canonique du thread : aucune requête de lecture)"""
+    if not created:
+        return
+    thread = instance.thread
+    if thread.user_low_id and thread.user_high_id:
+        recipient_ids = [thread.user_high_id if instance.sender_id == thread.user_low_id else thread.user_low_id]
     else:
-        # Si c'est une mise à jour de l'User, on sauvegarde le profil s'il existe
-        if hasattr(instance, 'profile'):
-            instance.profile.save()
\ No newline at end of file
+        recipient_ids = thread.participants.exclude(pk=instance.sender_id).values_list('pk', flat=True)
+
+    ActivityEvent.objects.bulk_create([
+        ActivityEvent(
+            recipient_id=recipient_id,
+            actor_id=instance.sender_id,
+            kind='message',
+            thread_id=thread.id,
+            preview=(instance.content or "📷 Photo")[:100],
+            created_at=instance.created_at,
+        )
+        for recipient_id in recipient_ids
+    ])
+
+
+@receiver(post_save, sender=ProfileImage)
+def sync_profile_photos_on_save(sender, instance, created, **kwargs):
+    """Tient à jour Profile.photo_count et Profile.cover_image (UPDATE ciblés, sans lecture)"""
+    profile = Profile.objects.filter(pk=instance.profile_id)
+    changes = {'photo_count': F('photo_count') + 1} if created else {}
+
+    if instance.is_cover:
+        changes['cover_image'] = instance
+    elif not created:
+        # Ne plus pointer vers une photo qui n'est plus la couverture
+        profile.filter(cover_image=instance).update(cover_image=None)
+
+    if changes:
+        profile.update(**changes)
+
+
+@receiver(post_delete, sender=ProfileImage)
+def sync_profile_photos_on_delete(sender, instance, **kwargs):
+    # cover_image est remis à NULL par on_delete=SET_NULL
+    Profile.objects.filter(pk=instance.profile_id).update(
+        photo_count=Greatest(F('photo_count') - 1, 0)
+    )
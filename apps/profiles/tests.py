@@ -1,3 +1,755 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from PIL import Image, ImageOps
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.core.avatars import initials_for
+from apps.core.images import open_for_resize
+from apps.core.models import StoredFile
+from apps.core.pagination import estimated_count
+from apps.core.thumbnails import thumbnail_url
+from apps.core.views import serve_media
+from apps.messaging.models import get_or_create_thread, send_message
+from apps.users.models import DEFAULT_AVATAR
+from .forms import PROFILE_IMAGE_SIZE, ProfileImageForm
+from .models import ActivityEvent, Like, Match, Pass, Profile, ProfileImage, activity_feed, like_user
+from .views import ProfileListView
+
+
+class ProfilesTestMixin:
+
+    def setUp(self):
+        cache.clear()
+        self.alice = self.make_user('alice', 'Alice')
+        self.bob = self.make_user('bob', 'Bob')
+
+    def make_user(self, username, first_name):
+        return get_user_model().objects.create_user(
+            email=f'{username}@didacticiel.bj',
+            username=username,
+            password='password123',
+            first_name=first_name,
+            last_name='Test'
+        )
+
+
+class MatchTests(ProfilesTestMixin, TestCase):
+
+    def test_one_way_like_is_not_a_match(self):
+        created, is_match = like_user(self.alice, self.bob)
+
+        self.assertTrue(created)
+        self.assertFalse(is_match)
+        self.assertFalse(Match.objects.exists())
+
+    def test_reciprocal_like_creates_both_match_rows(self):
+        like_user(self.alice, self.bob)
+        _, is_match = like_user(self.bob, self.alice)
+
+        self.assertTrue(is_match)
+        self.assertEqual(
+            set(Match.objects.values_list('user_id', 'matched_user_id')),
+            {(self.alice.id, self.bob.id), (self.bob.id, self.alice.id)},
+        )
+
+    def test_liking_twice_is_idempotent(self):
+        like_user(self.alice, self.bob)
+        like_user(self.bob, self.alice)
+        created, is_match = like_user(self.bob, self.alice)
+
+        self.assertFalse(created)
+        self.assertTrue(is_match)
+        self.assertEqual(Like.objects.count(), 2)
+        self.assertEqual(Match.objects.count(), 2)
+
+    def test_liking_again_repairs_a_missing_match(self):
+        like_user(self.alice, self.bob)
+        like_user(self.bob, self.alice)
+        Match.objects.all().delete()
+
+        like_user(self.bob, self.alice)
+
+        self.assertEqual(Match.objects.count(), 2)
+
+    def test_like_view_returns_match_button(self):
+        like_user(self.bob, self.alice)
+        self.client.force_login(self.alice)
+
+        response = self.client.post(reverse('profiles:like', args=[self.bob.id]), HTTP_HX_REQUEST='true')
+
+        self.assertContains(response, "C'est un match")
+
+
+class FeedTests(ProfilesTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admirers = [self.make_user(f'fan{i}', f'Fan{i}') for i in range(5)]
+        for admirer in self.admirers:
+            like_user(admirer, self.alice)
+
+    def test_likes_received_feed_is_paginated_by_key(self):
+        self.client.force_login(self.alice)
+        url = reverse('profiles:likes_received')
+
+        with mock.patch('apps.profiles.views.FEED_PAGE_SIZE', 3):
+            first = self.client.get(url)
+            second = self.client.get(url, {'before': first.context['next_cursor']}, HTTP_HX_REQUEST='true')
+
+        first_names = [person.first_name for person in first.context['people']]
+        second_names = [person.first_name for person in second.context['people']]
+        self.assertEqual(first_names, ['Fan4', 'Fan3', 'Fan2'])
+        self.assertEqual(second_names, ['Fan1', 'Fan0'])
+        self.assertIsNone(second.context['next_cursor'])
+
+    def test_matched_admirers_move_from_likes_to_matches(self):
+        like_user(self.alice, self.admirers[0])
+        self.client.force_login(self.alice)
+
+        likes = self.client.get(reverse('profiles:likes_received'))
+        matches = self.client.get(reverse('profiles:matches'))
+
+        self.assertNotIn(self.admirers[0], likes.context['people'])
+        self.assertEqual(matches.context['people'], [self.admirers[0]])
+
+
+class SwipeBatchApiTests(ProfilesTestMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('profiles_api:swipes')
+        self.client.force_authenticate(self.alice)
+
+    def test_batch_records_swipes_and_returns_new_matches(self):
+        carol = self.make_user('carol', 'Carol')
+        like_user(self.bob, self.alice)
+
+        response = self.client.post(self.url, {'swipes': [
+            {'user_id': self.bob.id, 'action': 'like'},
+            {'user_id': carol.id, 'action': 'pass'},
+            {'user_id': 999999, 'action': 'like'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([match['user_id'] for match in response.data['matches']], [self.bob.id])
+        self.assertEqual(response.data['ignored'], 1)
+        self.assertTrue(Pass.objects.filter(user=self.alice, passed_user=carol).exists())
+        self.assertEqual(Match.objects.count(), 2)
+
+        # Rejouer le même lot (réseau instable) ne crée rien de nouveau
+        response = self.client.post(self.url, {'swipes': [{'user_id': self.bob.id, 'action': 'like'}]}, format='json')
+        self.assertEqual(response.data['matches'], [])
+        self.assertEqual(Like.objects.filter(user=self.alice).count(), 1)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        others = [self.make_user(f'user{i}', f'User{i}') for i in range(60)]
+        for other in others[:30]:
+            like_user(other, self.alice)
+        swipes = [{'user_id': other.id, 'action': 'like'} for other in others]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'swipes': swipes}, format='json')
+
+        self.assertEqual(len(response.data['matches']), 30)
+        self.assertLess(len(queries), 15)
+
+    def test_invalid_action_is_rejected(self):
+        response = self.client.post(self.url, {'swipes': [{'user_id': self.bob.id, 'action': 'love'}]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Like.objects.exists())
+
+
+class ActivityEventTests(ProfilesTestMixin, TestCase):
+
+    def kinds(self, user):
+        return list(ActivityEvent.objects.filter(recipient=user).order_by('id').values_list('kind', flat=True))
+
+    def test_like_and_match_are_recorded_once(self):
+        like_user(self.alice, self.bob)
+        like_user(self.bob, self.alice)
+        like_user(self.bob, self.alice)
+
+        self.assertEqual(self.kinds(self.bob), ['like', 'match'])
+        self.assertEqual(self.kinds(self.alice), ['like', 'match'])
+
+    def test_message_event_for_recipient_only(self):
+        thread = get_or_create_thread(self.alice, self.bob)
+        send_message(thread, self.bob, "Bonsoir")
+
+        event = ActivityEvent.objects.get()
+        self.assertEqual((event.recipient, event.actor, event.kind), (self.alice, self.bob, 'message'))
+        self.assertEqual((event.thread_id, event.preview), (thread.id, "Bonsoir"))
+
+    def test_profile_visits_are_deduplicated(self):
+        self.client.force_login(self.bob)
+        url = reverse('profiles:detail', args=[self.alice.profile.id])
+
+        self.client.get(url)
+        self.client.get(url)
+
+        self.assertEqual(self.kinds(self.alice), ['visit'])
+
+    def test_feed_keyset_pagination_handles_identical_timestamps(self):
+        now = timezone.now()
+        ActivityEvent.objects.bulk_create([
+            ActivityEvent(recipient=self.alice, actor=self.bob, kind='visit', created_at=now) for _ in range(15)
+        ])
+
+        first, cursor = activity_feed(self.alice, limit=10)
+        second, last_cursor = activity_feed(self.alice, cursor=cursor, limit=10)
+
+        self.assertEqual(len(first), 10)
+        self.assertEqual(len(second), 5)
+        self.assertFalse({event.id for event in first} & {event.id for event in second})
+        self.assertIsNone(last_cursor)
+
+    def test_prune_activity_deletes_old_events(self):
+        ActivityEvent.objects.create(
+            recipient=self.alice, actor=self.bob, kind='visit', created_at=timezone.now() - timedelta(days=200)
+        )
+        ActivityEvent.objects.create(recipient=self.alice, actor=self.bob, kind='like')
+
+        call_command('prune_activity', days=90, batch_size=1, stdout=StringIO())
+
+        self.assertEqual(self.kinds(self.alice), ['like'])
+
+    def test_migration_backfills_existing_history(self):
+        backfill = import_module('apps.profiles.migrations.0013_backfill_activity_events')
+        like_user(self.alice, self.bob)
+        like_user(self.bob, self.alice)
+        send_message(get_or_create_thread(self.alice, self.bob), self.bob, "Bonsoir")
+        ActivityEvent.objects.all().delete()
+
+        backfill.backfill_activity_events(django_apps, None)
+
+        self.assertEqual(sorted(self.kinds(self.alice)), ['like', 'match', 'message'])
+        self.assertEqual(sorted(self.kinds(self.bob)), ['like', 'match'])
+
+    def test_backfilled_match_is_dated_from_the_second_like(self):
+        backfill = import_module('apps.profiles.migrations.0013_backfill_activity_events')
+        like_user(self.alice, self.bob)
+        like_user(self.bob, self.alice)
+        ActivityEvent.objects.all().delete()
+        # Lignes Match reprises par 0007 : datées du déploiement, pas du match
+        first_like = timezone.now() - timedelta(days=20)
+        second_like = timezone.now() - timedelta(days=10)
+        Like.objects.filter(user=self.alice).update(created_at=first_like)
+        Like.objects.filter(user=self.bob).update(created_at=second_like)
+
+        backfill.backfill_activity_events(django_apps, None)
+
+        dates = set(ActivityEvent.objects.filter(kind='match').values_list('created_at', flat=True))
+        self.assertEqual(dates, {second_like})
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), BACKGROUND_TASKS_EAGER=True)
+class ThumbnailTests(ProfilesTestMixin, TestCase):
+
+    def make_upload(self, size=(2400, 1800)):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'teal').save(buffer, 'JPEG')
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_aliases_are_generated_on_upload(self):
+        photo = ProfileImage.objects.create(profile=self.alice.profile, image=self.make_upload())
+
+        url = thumbnail_url(photo.image, 'card')
+
+        self.assertNotEqual(url, photo.image.url)
+        self.assertTrue(url.endswith('.webp'))
+
+    def test_unknown_alias_falls_back_to_original(self):
+        photo = ProfileImage.objects.create(profile=self.alice.profile, image=self.make_upload(size=(50, 50)))
+
+        self.assertEqual(thumbnail_url(photo.image, 'poster'), photo.image.url)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class UploadProcessingTests(ProfilesTestMixin, TestCase):
+
+    def make_upload(self, size, fmt='JPEG', name='photo.jpg'):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation : rotation de 90°
+        exif[0x010F] = "PhoneMaker"
+        Image.new('RGB', size, 'orange').save(buffer, fmt, exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{fmt.lower()}')
+
+    def test_cover_is_reduced_oriented_and_stripped_before_storage(self):
+        form = ProfileImageForm(data={}, files={'image': self.make_upload((4000, 3000))})
+        self.assertTrue(form.is_valid(), form.errors)
+
+        form.save(self.alice.profile)
+
+        cover = self.alice.profile.images.get(is_cover=True)
+        with Image.open(cover.image.path) as stored:
+            self.assertLessEqual(max(stored.size), max(PROFILE_IMAGE_SIZE))
+            self.assertGreater(stored.height, stored.width)  # orientation EXIF appliquée
+            self.assertNotIn('exif', stored.info)
+
+    def test_png_without_draft_is_reduced_too(self):
+        form = ProfileImageForm(data={}, files={'image': self.make_upload((5000, 4200), 'PNG', 'capture.png')})
+        self.assertTrue(form.is_valid(), form.errors)
+
+        form.save(self.alice.profile)
+
+        with Image.open(self.alice.profile.images.get().image.path) as stored:
+            self.assertLessEqual(max(stored.size), max(PROFILE_IMAGE_SIZE))
+
+    def test_png_is_reduced_before_rotation_and_conversion(self):
+        upload = self.make_upload((5000, 4200), 'PNG', 'capture.png')
+
+        with mock.patch('apps.core.images.ImageOps.exif_transpose', wraps=ImageOps.exif_transpose) as transpose:
+            img = open_for_resize(upload, PROFILE_IMAGE_SIZE)
+
+        self.assertLess(transpose.call_args.args[0].width, 5000)
+        self.assertGreater(img.height, img.width)
+
+    def test_palette_image_is_converted_before_reduction(self):
+        buffer = BytesIO()
+        palette_image = Image.new('P', (6000, 4200), 1)
+        palette_image.putpalette([0, 0, 0, 255, 165, 0])
+        palette_image.save(buffer, 'PNG')
+
+        img = open_for_resize(BytesIO(buffer.getvalue()), PROFILE_IMAGE_SIZE)
+
+        self.assertEqual(img.mode, 'RGB')
+        self.assertLess(img.width, 6000)
+        self.assertEqual(img.getpixel((0, 0)), (255, 165, 0))  # couleur de la palette, pas l'index
+
+    def test_pixel_cap_is_checked_from_the_header(self):
+        with mock.patch('apps.core.images.MAX_IMAGE_PIXELS', 100):
+            form = ProfileImageForm(data={}, files={'image': self.make_upload((20, 20))})
+
+            self.assertFalse(form.is_valid())
+        self.assertIn("trop grande", form.errors['image'][0])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ProfilePhotoCountersTests(ProfilesTestMixin, TestCase):
+
+    def make_upload(self):
+        buffer = BytesIO()
+        Image.new('RGB', (60, 60), 'navy').save(buffer, 'JPEG')
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def refreshed_profile(self):
+        return Profile.objects.get(pk=self.alice.profile.pk)
+
+    def test_photo_count_follows_uploads_and_deletions(self):
+        first = ProfileImage.objects.create(profile=self.alice.profile, image=self.make_upload())
+        ProfileImage.objects.create(profile=self.alice.profile, image=self.make_upload())
+        self.assertEqual(self.refreshed_profile().photo_count, 2)
+
+        first.delete()
+
+        self.assertEqual(self.refreshed_profile().photo_count, 1)
+
+    def test_dashboard_suggestion_falls_back_to_the_latest_photo(self):
+        Profile.objects.filter(user=self.alice).update(gender='F')
+        ProfileImage.objects.create(profile=self.bob.profile, image=self.make_upload())
+        latest = ProfileImage.objects.create(profile=self.bob.profile, image=self.make_upload())
+        self.client.force_login(self.alice)
+
+        response = self.client.get(reverse('profiles:dashboard'))
+
+        suggested = response.context['suggested_profiles']
+        self.assertEqual([profile.user for profile in suggested], [self.bob])
+        self.assertIsNone(suggested[0].cover_image)
+        self.assertEqual(suggested[0].card_photo, latest)
+
+    def test_replacing_the_cover_moves_the_pointer(self):
+        for _ in range(2):
+            form = ProfileImageForm(data={}, files={'image': self.make_upload()})
+            self.assertTrue(form.is_valid(), form.errors)
+            cover = form.save(self.alice.profile)
+
+        profile = self.refreshed_profile()
+        self.assertEqual(profile.cover_image, cover)
+        self.assertEqual(profile.photo_count, 1)
+
+        cover.delete()
+
+        self.assertIsNone(self.refreshed_profile().cover_image)
+
+    def test_profile_page_does_not_query_the_gallery_for_the_cover(self):
+        ProfileImage.objects.create(profile=self.alice.profile, image=self.make_upload(), is_cover=True)
+        self.client.force_login(self.bob)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profiles:detail', args=[self.alice.profile.id]))
+
+        self.assertEqual(response.context['cover_image'], self.refreshed_profile().cover_image)
+        # La galerie est triée par is_cover, mais aucune requête ne filtre dessus
+        self.assertFalse([query for query in queries if '"is_cover" =' in query['sql']])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), BACKGROUND_TASKS_EAGER=True)
+class ContentAddressedStorageTests(ProfilesTestMixin, TestCase):
+
+    def make_upload(self, color='purple'):
+        buffer = BytesIO()
+        Image.new('RGB', (40, 40), color).save(buffer, 'JPEG')
+        return SimpleUploadedFile('IMG_0001.JPG', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_identical_uploads_share_one_file(self):
+        first = ProfileImage.objects.create(profile=self.alice.profile, image=self.make_upload())
+        second = ProfileImage.objects.create(profile=self.bob.profile, image=self.make_upload())
+        other = ProfileImage.objects.create(profile=self.bob.profile, image=self.make_upload('gold'))
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertRegex(first.image.name, r'^profile_images/[0-9a-f]{2}/[0-9a-f]{40}\.jpg$')
+        self.assertEqual(StoredFile.objects.get(name=first.image.name).refcount, 2)
+
+    def test_concurrent_identical_uploads_reuse_the_written_file(self):
+        first = ProfileImage.objects.create(profile=self.alice.profile, image=self.make_upload())
+
+        # L'autre écriture passe le test exists() avant que le fichier n'apparaisse
+        with mock.patch.object(type(default_storage._wrapped), 'exists', return_value=False):
+            second = ProfileImage.objects.create(profile=self.bob.profile, image=self.make_upload())
+
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(StoredFile.objects.get(name=first.image.name).refcount, 2)
+
+    def test_file_is_deleted_with_its_last_reference(self):
+        first = ProfileImage.objects.create(profile=self.alice.profile, image=self.make_upload())
+        second = ProfileImage.objects.create(profile=self.bob.profile, image=self.make_upload())
+        name = first.image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.image.delete(save=False)
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.image.delete(save=False)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_replaced_avatar_is_released(self):
+        self.alice.avatar = self.make_upload()
+        self.alice.save()
+        old_name = self.alice.avatar.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.avatar = self.make_upload('gold')
+            self.alice.save()
+
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertFalse(StoredFile.objects.filter(name=old_name).exists())
+        self.assertEqual(StoredFile.objects.get(name=self.alice.avatar.name).refcount, 1)
+
+    def test_same_avatar_uploaded_again_keeps_one_reference(self):
+        self.alice.avatar = self.make_upload()
+        self.alice.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.avatar = self.make_upload()
+            self.alice.save()
+
+        self.assertTrue(default_storage.exists(self.alice.avatar.name))
+        self.assertEqual(StoredFile.objects.get(name=self.alice.avatar.name).refcount, 1)
+
+    def test_replaced_cover_is_released(self):
+        form = ProfileImageForm(data={}, files={'image': self.make_upload()})
+        self.assertTrue(form.is_valid(), form.errors)
+        old_name = form.save(self.alice.profile).image.name
+
+        form = ProfileImageForm(data={}, files={'image': self.make_upload('gold')})
+        self.assertTrue(form.is_valid(), form.errors)
+        with self.captureOnCommitCallbacks(execute=True):
+            form.save(self.alice.profile)
+
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertFalse(StoredFile.objects.filter(name=old_name).exists())
+
+    def test_content_addressed_media_is_served_as_immutable(self):
+        photo = ProfileImage.objects.create(profile=self.alice.profile, image=self.make_upload())
+        request = RequestFactory().get(photo.image.url)
+
+        response = serve_media(request, photo.image.name, document_root=settings.MEDIA_ROOT)
+
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class OrphanMediaTests(ProfilesTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        buffer = BytesIO()
+        Image.new('RGB', (500, 500), 'olive').save(buffer, 'JPEG')
+        self.photo = ProfileImage.objects.create(
+            profile=self.alice.profile,
+            image=SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg'),
+        )
+        self.orphan = os.path.join(settings.MEDIA_ROOT, 'profile_images', 'ancienne-couverture.jpg')
+        with open(self.orphan, 'wb') as fileobj:
+            fileobj.write(b'orphelin')
+        two_days_ago = time.time() - 48 * 3600
+        os.utime(self.orphan, (two_days_ago, two_days_ago))
+
+    def collect(self, *args):
+        call_command('collect_orphan_media', *args, stdout=StringIO())
+
+    def test_unreferenced_files_are_deleted(self):
+        thumbnail = thumbnail_url(self.photo.image, 'card')
+
+        self.collect()
+
+        self.assertFalse(os.path.exists(self.orphan))
+        self.assertTrue(default_storage.exists(self.photo.image.name))
+        self.assertTrue(os.path.exists(os.path.join(settings.MEDIA_ROOT, thumbnail[len(settings.MEDIA_URL):])))
+
+    def test_dry_run_and_recent_files_keep_everything(self):
+        recent = os.path.join(settings.MEDIA_ROOT, 'profile_images', 'upload-en-cours.jpg')
+        with open(recent, 'wb') as fileobj:
+            fileobj.write(b'recent')
+
+        self.collect('--dry-run')
+        self.assertTrue(os.path.exists(self.orphan))
+
+        self.collect()
+        self.assertTrue(os.path.exists(recent))
+
+    def test_quarantine_moves_orphans(self):
+        quarantine = tempfile.mkdtemp()
+
+        self.collect('--quarantine', quarantine)
+
+        self.assertFalse(os.path.exists(self.orphan))
+        self.assertTrue(os.path.exists(os.path.join(quarantine, 'profile_images', 'ancienne-couverture.jpg')))
+
+    def test_field_default_is_kept_when_nobody_uses_it(self):
+        get_user_model().objects.update(avatar='avatars/ab/photo.jpg')
+        default = os.path.join(settings.MEDIA_ROOT, *DEFAULT_AVATAR.split('/'))
+        os.makedirs(os.path.dirname(default), exist_ok=True)
+        with open(default, 'wb') as fileobj:
+            fileobj.write(b'defaut')
+        two_days_ago = time.time() - 48 * 3600
+        os.utime(default, (two_days_ago, two_days_ago))
+
+        self.collect()
+
+        self.assertTrue(os.path.exists(default))
+        self.assertFalse(os.path.exists(self.orphan))
+
+    def test_reused_file_counts_as_recent(self):
+        content = SimpleUploadedFile('photo.jpg', b'meme-contenu', content_type='image/jpeg')
+        name = default_storage.save('profile_images/photo.jpg', content)
+        two_days_ago = time.time() - 48 * 3600
+        os.utime(default_storage.path(name), (two_days_ago, two_days_ago))
+
+        # Nouvel upload identique, pas encore référencé par une ligne en base
+        content.seek(0)
+        self.assertEqual(default_storage.save('profile_images/photo.jpg', content), name)
+        self.collect()
+
+        self.assertTrue(default_storage.exists(name))
+        self.assertFalse(os.path.exists(self.orphan))
+
+
+class AvatarFixtureMixin:
+    """Bob a envoyé sa photo, Alice garde l'avatar par défaut"""
+
+    def setUp(self):
+        super().setUp()
+        buffer = BytesIO()
+        Image.new('RGB', (200, 200), 'navy').save(buffer, 'JPEG')
+        self.bob.avatar = SimpleUploadedFile('moi.jpg', buffer.getvalue(), content_type='image/jpeg')
+        self.bob.save()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class LiteModeTests(AvatarFixtureMixin, ProfilesTestMixin, TestCase):
+
+    def test_save_data_serves_the_lite_grid(self):
+        response = self.client.get(reverse('profiles:list'), HTTP_SAVE_DATA='on')
+
+        self.assertTrue(response.context['lite_mode'])
+        # Photo envoyée : miniature lite ; avatar par défaut : initiale en texte, sans image
+        self.assertContains(response, self.bob.avatar.url)
+        self.assertNotContains(response, DEFAULT_AVATAR)
+        self.assertNotContains(response, reverse('core:initials_avatar', args=['AT']))
+        self.assertNotContains(response, 'fonts.googleapis.com')
+        self.assertIn('Save-Data', response['Vary'])
+
+    def test_lite_tile_falls_back_when_first_name_is_blank(self):
+        anonymous = self.make_user('zoe', '')
+
+        response = self.client.get(reverse('profiles:list'), HTTP_SAVE_DATA='on')
+
+        self.assertContains(response, f'font-black">{initials_for(anonymous)}</div>')
+        self.assertContains(response, 'font-black">AT</div>')
+
+    def test_slow_connection_hint_enables_lite_mode(self):
+        response = self.client.get(reverse('profiles:list'), HTTP_ECT='2g')
+
+        self.assertTrue(response.context['lite_mode'])
+
+    def test_user_choice_overrides_client_hints(self):
+        self.client.cookies['lite_mode'] = '0'
+
+        response = self.client.get(reverse('profiles:list'), HTTP_SAVE_DATA='on')
+
+        self.assertFalse(response.context['lite_mode'])
+        self.assertContains(response, reverse('core:initials_avatar', args=['AT']))
+
+    def test_toggle_sets_cookie_and_only_redirects_locally(self):
+        response = self.client.post(reverse('core:lite_mode'), {'lite': '1', 'next': '/profiles/'})
+        self.assertRedirects(response, '/profiles/', fetch_redirect_response=False)
+        self.assertEqual(response.cookies['lite_mode'].value, '1')
+
+        response = self.client.post(reverse('core:lite_mode'), {'lite': '0', 'next': 'https://evil.example/'})
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertEqual(response.cookies['lite_mode'].value, '0')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class InitialsAvatarTests(AvatarFixtureMixin, ProfilesTestMixin, TestCase):
+
+    def test_initials_are_derived_without_exposing_the_email(self):
+        anonymous = self.make_user('zoe', '')
+
+        self.assertEqual(initials_for(self.alice), 'AT')
+        self.assertEqual(initials_for(self.alice.profile), 'AT')
+        self.assertEqual(initials_for(anonymous), 'T')
+        self.assertEqual(initials_for('élodie'), 'É')
+        self.assertEqual(initials_for(''), 'BM')
+
+    def test_grid_uses_local_avatars(self):
+        response = self.client.get(reverse('profiles:list'))
+
+        self.assertContains(response, reverse('core:initials_avatar', args=['AT']))
+        self.assertNotContains(response, reverse('core:initials_avatar', args=['BT']))
+        self.assertContains(response, self.bob.avatar.url)
+        self.assertNotContains(response, DEFAULT_AVATAR)
+        self.assertNotContains(response, 'ui-avatars.com')
+        self.assertNotContains(response, 'alice@didacticiel.bj')
+
+    def test_svg_is_cached_with_a_strong_etag(self):
+        url = reverse('core:initials_avatar', args=['AT'])
+
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertFalse(response['ETag'].startswith('W/'))
+        self.assertIn(b'>AT</text>', response.content)
+
+        revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_unexpected_initials_are_rejected(self):
+        for initials in ('at', 'ABC', 'A1'):
+            response = self.client.get(reverse('core:initials_avatar', args=[initials]))
+            self.assertEqual(response.status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class DirtyProfileSaveTests(ProfilesTestMixin, TestCase):
+
+    def test_login_does_not_rewrite_the_profile(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.login(email='alice@didacticiel.bj', password='password123')
+
+        self.assertFalse([query for query in queries if 'UPDATE "profiles_profile"' in query['sql']])
+
+    def test_stale_profile_does_not_overwrite_denormalized_counters(self):
+        profile = Profile.objects.get(user=self.alice)
+        buffer = BytesIO()
+        Image.new('RGB', (40, 40), 'maroon').save(buffer, 'JPEG')
+        ProfileImage.objects.create(
+            profile=profile, image=SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+        )
+
+        profile.city = 'Parakou'
+        profile.save()
+
+        profile = Profile.objects.get(pk=profile.pk)
+        self.assertEqual((profile.city, profile.photo_count), ('Parakou', 1))
+
+    @override_settings(DEBUG=True)
+    def test_write_counts_are_logged_in_debug(self):
+        self.client.force_login(self.alice)
+
+        with self.assertLogs('apps.core.middleware', 'DEBUG') as logs:
+            self.client.post(reverse('profiles:like', args=[self.bob.id]))
+
+        self.assertIn('écriture(s) SQL', logs.output[0])
+
+
+class ProfileListPaginationTests(ProfilesTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            self.make_user(f'extra{i}', f'Extra{i}')
+        self.url = reverse('profiles:list')
+
+    def count_queries(self, queries):
+        return [query for query in queries if 'COUNT(' in query['sql'].upper()]
+
+    def test_total_is_counted_once_then_cached(self):
+        with mock.patch.object(ProfileListView, 'paginate_by', 2):
+            with CaptureQueriesContext(connection) as first:
+                response = self.client.get(self.url)
+            with CaptureQueriesContext(connection) as second:
+                self.client.get(self.url, {'page': 2})
+
+        self.assertEqual(response.context['paginator'].num_pages, 3)
+        self.assertEqual(len(self.count_queries(first)), 1)
+        self.assertEqual(self.count_queries(second), [])
+
+    def test_next_page_comes_from_the_extra_row(self):
+        with mock.patch.object(ProfileListView, 'paginate_by', 2):
+            middle = self.client.get(self.url, {'page': 2})
+            last = self.client.get(self.url, {'page': 3})
+            beyond = self.client.get(self.url, {'page': 4})
+
+        self.assertTrue(middle.context['page_obj'].has_next())
+        self.assertFalse(last.context['page_obj'].has_next())
+        self.assertEqual(len(last.context['profiles']), 1)
+        self.assertEqual(beyond.status_code, 404)
+
+    def test_large_tables_use_the_planner_estimate(self):
+        with mock.patch('apps.core.pagination.estimated_count', return_value=120_000), \
+                mock.patch.object(ProfileListView, 'paginate_by', 2):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url)
+
+        self.assertEqual(self.count_queries(queries), [])
+        self.assertTrue(response.context['paginator'].is_estimate)
+        self.assertContains(response, '/ ~60000')
+
+    def test_mysql_estimate_reads_filtered_rows_from_the_plan(self):
+        plan = {'query_block': {'select_id': 1, 'table': {
+            'table_name': 'profiles_profile', 'rows_examined_per_scan': 80000, 'rows_produced_per_join': 40000,
+        }}}
+        queryset = Profile.objects.filter(is_active=True)
+
+        with mock.patch.object(connection, 'vendor', 'mysql'), \
+                mock.patch.object(QuerySet, 'explain', return_value=json.dumps(plan)):
+            self.assertEqual(estimated_count(queryset), 40000)
+
+        self.assertIsNone(estimated_count(queryset))  # SQLite : pas d'estimation
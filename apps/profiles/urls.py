@@ -10,7 +10,11 @@ urlpatterns = [
     path('edit/', views.ProfileUpdateView.as_view(), name='edit'),
     path('profile/<int:pk>/', views.ProfileDetailView.as_view(), name='detail'),
     path('me/', views.DashboardView.as_view(), name='my_profile'), # Redirection vers le dashboard
+    path('matches/', views.MatchListView.as_view(), name='matches'),
+    path('likes/', views.LikesReceivedView.as_view(), name='likes_received'),
+    path('activity/', views.ActivityFeedView.as_view(), name='activity'),
     
     #htmx---------zone-------------
     path('upload-cover/', views.upload_cover, name='upload_cover'),
+    path('like/<int:user_id>/', views.like_profile, name='like'),
 ]
\ No newline at end of file
@@ -0,0 +1,10 @@
+# apps/profiles/urls_api.py
+from django.urls import path
+from .api import SwipeBatchView
+
+app_name = 'profiles_api'
+
+urlpatterns = [
+    # POST /api/v1/profiles/swipes/ (Likes et passes groupés, file hors ligne du mobile)
+    path('swipes/', SwipeBatchView.as_view(), name='swipes'),
+]
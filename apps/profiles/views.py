@@ -1,10 +1,19 @@
 #apps/profiles/views.py
-from django.http import HttpResponseRedirect
-from django.shortcuts import render, get_object_or_404
+from django.http import HttpResponse, HttpResponseRedirect
+from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.views.generic import DetailView, UpdateView, ListView, TemplateView
+from django.views.decorators.http import require_POST
+from django.views.generic import DetailView, UpdateView, ListView, TemplateView, View
 from django.urls import reverse_lazy
-from .models import Profile, ProfileImage, ProfileView
+from django.db.models import Exists, OuterRef
+from apps.core.pagination import CachedCountPaginator
+from apps.core.ratelimit import check_rate_limit
+from .models import (
+    Like, Match, Profile, ProfileImage, ProfileView,
+    activity_feed, keyset_page, like_user, record_profile_view,
+)
 from .forms import ProfileForm, ProfileImageForm
 from django.db import IntegrityError
 from django.core.exceptions import ObjectDoesNotExist
@@ -21,6 +30,8 @@ class ProfileListView(ListView):
     template_name = "profiles/profile_list.html"
     context_object_name = "profiles"
     paginate_by = 12
+    # Total en cache (estimé sur une grosse table) : pas de COUNT(*) par page
+    paginator_class = CachedCountPaginator
 
     def get_queryset(self):
         # On affiche seulement les profils actifs, du plus récent au plus ancien
@@ -33,26 +44,33 @@ class ProfileDetailView(DetailView):
     template_name = "profiles/profile_detail.html"
     context_object_name = "profile"
 
+    def get_queryset(self):
+        # Couverture chargée avec le profil (pointeur dénormalisé, pas de requête is_cover)
+        return Profile.objects.select_related('user', 'cover_image')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+
+        # Visite (dédoublonnée en cache) -> ProfileView + journal d'activité du profil visité
+        if self.request.user.is_authenticated and self.request.user != self.object.user:
+            record_profile_view(self.request.user, self.object)
         
-        user = self.request.user
-        
-        # Calculer l'ID du thread entre l'utilisateur connecté et le propriétaire du profil
-        if user.is_authenticated and user != self.object.user:
-            from apps.messaging.models import get_or_create_thread
-            context['thread_id'] = get_or_create_thread(user, self.object.user).id
-        else:
-            context['thread_id'] = None # Pas de thread si on regarde son propre profil
+        # Le lien "Envoyer un message" pointe vers messaging:start :
+        # la conversation n'est créée qu'à l'envoi du premier message.
             
         # 1. Récupérer toutes les images du profil
         context['profile_images'] = self.object.images.all()
         
-        # 2. Récupérer spécifiquement l'image marquée comme couverture
-        try:
-            context['cover_image'] = self.object.images.get(is_cover=True)
-        except ProfileImage.DoesNotExist:
-            context['cover_image'] = None
+        # 2. Image de couverture (pointeur Profile.cover_image)
+        context['cover_image'] = self.object.cover_image
+
+        # 3. État du bouton "J'aime" (deux lectures d'index uniques)
+        user = self.request.user
+        if user.is_authenticated and user != self.object.user:
+            context['has_liked'] = Like.objects.filter(user=user, liked_user=self.object.user).exists()
+            context['is_match'] = context['has_liked'] and Match.objects.filter(
+                user=user, matched_user=self.object.user
+            ).exists()
             
         return context
 
@@ -85,11 +103,8 @@ class ProfileUpdateView(LoginRequiredMixin, UpdateView):
         # Formulaire d'image de couverture
         context['image_form'] = ProfileImageForm() 
         
-        # Récupérer l'image de couverture actuelle
-        try:
-            context['current_cover'] = self.object.images.get(is_cover=True)
-        except ProfileImage.DoesNotExist:
-            context['current_cover'] = None
+        # Image de couverture actuelle (pointeur Profile.cover_image)
+        context['current_cover'] = self.object.cover_image
             
         return context
 
@@ -129,6 +144,101 @@ class ProfileUpdateView(LoginRequiredMixin, UpdateView):
             return self.form_invalid(form)
 
 
+# --- 3 bis. LIKES ET MATCHS ---
+
+FEED_PAGE_SIZE = 24
+ACTIVITY_PAGE_SIZE = 10
+
+
+def parse_before(request):
+    """Curseur ?before=<id> du flux (None si absent ou invalide)"""
+    try:
+        return int(request.GET['before'])
+    except (KeyError, ValueError):
+        return None
+
+
+def render_people_feed(request, people, next_cursor, **context):
+    """Page complète, ou seulement les cartes suivantes pour le "Voir plus" HTMX"""
+    context.update({'people': people, 'next_cursor': next_cursor, 'feed_url': request.path})
+    if request.headers.get('HX-Request'):
+        return render(request, 'profiles/partials/people_feed_items.html', context)
+    return render(request, 'profiles/people_feed.html', context)
+
+
+@login_required
+@require_POST
+def like_profile(request, user_id):
+    """Like (HTMX) : renvoie le bouton mis à jour, avec le match éventuel"""
+    liked_user = get_object_or_404(get_user_model(), pk=user_id)
+    if liked_user == request.user:
+        return HttpResponse("Action impossible", status=400)
+
+    limited = check_rate_limit(request, 'like')
+    if limited:
+        return limited
+
+    _, is_match = like_user(request.user, liked_user)
+
+    if request.headers.get('HX-Request'):
+        return render(request, 'profiles/partials/like_button.html', {
+            'target_user': liked_user,
+            'has_liked': True,
+            'is_match': is_match,
+        })
+    if hasattr(liked_user, 'profile'):
+        return redirect('profiles:detail', pk=liked_user.profile.pk)
+    return redirect('profiles:dashboard')
+
+
+class MatchListView(LoginRequiredMixin, View):
+    """Mes matchs, du plus récent au plus ancien (pagination par clé sur (user, id))"""
+
+    def get(self, request):
+        matches, next_cursor = keyset_page(
+            Match.objects.filter(user=request.user).select_related('matched_user__profile'),
+            before=parse_before(request),
+            limit=FEED_PAGE_SIZE,
+        )
+        return render_people_feed(
+            request, [match.matched_user for match in matches], next_cursor,
+            title="Mes matchs",
+            empty_message="Pas encore de match. Likez des profils pour commencer !",
+        )
+
+
+class LikesReceivedView(LoginRequiredMixin, View):
+    """Qui m'a liké (hors matchs), pagination par clé sur (liked_user, id)"""
+
+    def get(self, request):
+        liked_back = Like.objects.filter(user=request.user, liked_user=OuterRef('user'))
+        likes, next_cursor = keyset_page(
+            Like.objects.filter(liked_user=request.user)
+            .exclude(Exists(liked_back))
+            .select_related('user__profile'),
+            before=parse_before(request),
+            limit=FEED_PAGE_SIZE,
+        )
+        return render_people_feed(
+            request, [like.user for like in likes], next_cursor,
+            title="Ils vous ont liké",
+            empty_message="Personne pour le moment.",
+        )
+
+
+class ActivityFeedView(LoginRequiredMixin, View):
+    """Suite du flux "Activité récente" (HTMX), ?cursor=<created_at µs>:<id>"""
+
+    def get(self, request):
+        events, next_cursor = activity_feed(
+            request.user, cursor=request.GET.get('cursor'), limit=ACTIVITY_PAGE_SIZE
+        )
+        return render(request, 'profiles/partials/activity_items.html', {
+            'recent_activities': events,
+            'activity_cursor': next_cursor,
+        })
+
+
 # --- 4. DASHBOARD ---
 
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -166,10 +276,10 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         # ===================================
         completion_steps = {
             'Informations de base': profile.gender and profile.date_of_birth and profile.city,
-            'Photo de profil': profile.images.exists(),
+            'Photo de profil': profile.photo_count > 0,
             'Biographie': bool(profile.bio and len(profile.bio) > 20),
             'Objectif relationnel': bool(profile.relationship_goal),
-            'Photo de couverture': profile.images.filter(is_cover=True).exists(),
+            'Photo de couverture': profile.cover_image_id is not None,
         }
         
         completed_steps = sum(1 for completed in completion_steps.values() if completed)
@@ -192,12 +302,9 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         
         # B. Messages non lus (depuis le modèle Message)
         try:
-            from apps.messaging.models import Message, Thread
+            from apps.messaging.models import Thread, unread_messages as unread_messages_qs
             
-            unread_messages = Message.objects.filter(
-                thread__participants=user,
-                is_read=False
-            ).exclude(sender=user).count()
+            unread_messages = unread_messages_qs(user).count()
             
             # Total de conversations actives
             active_conversations = Thread.objects.filter(
@@ -228,51 +335,8 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         # ===================================
         # 4. ACTIVITÉ RÉCENTE
         # ===================================
-        recent_activities = []
-        
-        # A. Derniers likes reçus
-        try:
-            from apps.profiles.models import Like
-            recent_likes = Like.objects.filter(
-                liked_user=user
-            ).select_related('user', 'user__profile').order_by('-created_at')[:5]
-            
-            for like in recent_likes:
-                recent_activities.append({
-                    'type': 'like',
-                    'user': like.user,
-                    'profile': like.user.profile if hasattr(like.user, 'profile') else None,
-                    'timestamp': like.created_at,
-                    'icon': 'heart',
-                })
-        except:
-            pass
-        
-        # B. Derniers messages reçus
-        try:
-            from apps.messaging.models import Message
-            recent_messages = Message.objects.filter(
-                thread__participants=user
-            ).exclude(
-                sender=user
-            ).select_related('sender', 'sender__profile', 'thread').order_by('-created_at')[:5]
-            
-            for message in recent_messages:
-                recent_activities.append({
-                    'type': 'message',
-                    'user': message.sender,
-                    'profile': message.sender.profile if hasattr(message.sender, 'profile') else None,
-                    'timestamp': message.created_at,
-                    'content': message.content[:50] if message.content else "Photo",
-                    'thread_id': message.thread.id,
-                    'icon': 'chat',
-                })
-        except:
-            pass
-        
-        # Trier par date (plus récent en premier)
-        recent_activities.sort(key=lambda x: x['timestamp'], reverse=True)
-        recent_activities = recent_activities[:10]  # Garder les 10 plus récents
+        # Journal d'activité : une seule lecture de l'index (recipient, -created_at)
+        recent_activities, activity_cursor = activity_feed(user, limit=ACTIVITY_PAGE_SIZE)
         
         # ===================================
         # 5. SUGGESTIONS DE PROFILS COMPATIBLES
@@ -286,7 +350,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
                 is_active=True,
             ).exclude(
                 user=user  # Pas moi-même
-            ).select_related('user').prefetch_related('images')
+            ).select_related('user', 'cover_image')
             
             # Filtrer par genre opposé (si hétéro)
             if profile.gender == 'M':
@@ -311,6 +375,19 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             
             # Limiter à 6 suggestions
             suggested_profiles = suggested_profiles[:6]
+
+            # Photo affichée : la couverture, sinon la plus récente de la galerie
+            # (une seule requête pour les profils sans couverture)
+            without_cover = [
+                candidate.pk for candidate in suggested_profiles
+                if not candidate.cover_image_id and candidate.photo_count
+            ]
+            latest_photos = {}
+            if without_cover:
+                for photo in ProfileImage.objects.filter(profile_id__in=without_cover).order_by('-created_at'):
+                    latest_photos.setdefault(photo.profile_id, photo)
+            for suggested in suggested_profiles:
+                suggested.card_photo = suggested.cover_image or latest_photos.get(suggested.pk)
         
         # ===================================
         # 6. POPULARITÉ DU PROFIL
@@ -328,8 +405,8 @@ class DashboardView(LoginRequiredMixin, TemplateView):
 
         # Score basé sur : photos, bio, likes reçus
         popularity_score = 0
-        if profile.images.count() > 0: popularity_score += 25
-        if profile.images.count() >= 3: popularity_score += 15
+        if profile.photo_count > 0: popularity_score += 25
+        if profile.photo_count >= 3: popularity_score += 15
         if profile.bio and len(profile.bio) > 50: popularity_score += 20
         
         # Maintenant total_likes est défini et peut être utilisé
@@ -353,6 +430,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             'completion_steps': completion_steps,
             'stats': stats,
             'recent_activities': recent_activities,
+            'activity_cursor': activity_cursor,
             'suggested_profiles': suggested_profiles,
             'popularity_score': popularity_score,
             'popularity_level': popularity_level,
@@ -361,8 +439,6 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         return context
 
 #htmx----------------------------------------zone--------------------
-from django.http import HttpResponse
-from django.shortcuts import render
 
 def upload_cover(request):
     """
@@ -380,18 +456,14 @@ def upload_cover(request):
         form = ProfileImageForm(request.POST, request.FILES)
         
         if form.is_valid():
-            form.save(profile)
-            # Récupérer la nouvelle couverture
-            cover = profile.images.get(is_cover=True)
+            # La nouvelle couverture est renvoyée par le formulaire
+            cover = form.save(profile)
             
             # CORRECTION DU PATH : On pointe vers le template dans 'profiles/partials'
             return render(request, 'profiles/partials/cover_display.html', {'cover': cover})
             
     # Si pas POST, retourner le bloc actuel (GET)
-    try:
-        cover = profile.images.get(is_cover=True)
-    except Profile.DoesNotExist:
-        cover = None
+    cover = profile.cover_image
         
     # CORRECTION DU PATH
     return render(request, 'profiles/partials/cover_display.html', {'cover': cover})
\ No newline at end of file
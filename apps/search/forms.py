@@ -45,5 +45,8 @@ class SearchForm(forms.Form):
         widget=forms.NumberInput(attrs={'class': 'input input-bordered w-full', 'placeholder': '100', 'min': '18', 'max': '100'})
     )
 
+    # Checkbox En ligne (présence lue dans le cache)
+    online = forms.BooleanField(label="En ligne maintenant", required=False, widget=forms.CheckboxInput(attrs={'class': 'checkbox checkbox-primary mt-2'}))
+
     # Checkbox Diaspora
     is_diaspora = forms.BooleanField(label="Vit à l'étranger (Diaspora)", required=False, widget=forms.CheckboxInput(attrs={'class': 'checkbox checkbox-primary mt-2'}))
\ No newline at end of file
@@ -5,9 +5,13 @@ from django.db.models import Q, Max
 from django.urls import reverse_lazy
 from datetime import date
 
+from apps.messaging.presence import online_user_ids, recently_seen_cutoff
 from apps.profiles.models import Profile
 from .forms import SearchForm
 
+# Profils récemment vus dont la présence est vérifiée dans le cache
+ONLINE_CANDIDATES = 500
+
 # --- VUE PRINCIPALE DE RECHERCHE ---
 class SearchView(View):
     """
@@ -69,6 +73,8 @@ class SearchView(View):
                 data['city'] = form.data['city']
             if form.data.get('is_diaspora'):
                 data['is_diaspora'] = form.data['is_diaspora']
+            if form.data.get('online'):
+                data['online'] = form.data['online']
             if form.data.get('min_age'):
                 data['min_age'] = form.data['min_age']
             if form.data.get('max_age'):
@@ -87,6 +93,13 @@ class SearchView(View):
         if data.get('is_diaspora'):
             queryset = queryset.filter(is_diaspora=True)
 
+        if data.get('online'):
+            # last_seen (index) présélectionne, le cache de présence tranche
+            candidates = queryset.filter(
+                last_seen__gte=recently_seen_cutoff()
+            ).values_list('user_id', flat=True)[:ONLINE_CANDIDATES]
+            queryset = queryset.filter(user_id__in=online_user_ids(candidates))
+
         # 3. Filtres d'âge (Calcul dynamique)
         today = date.today()
         limit_18_years = today.replace(year=today.year - 18)
@@ -4,12 +4,17 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from apps.core.models import DirtyFieldsMixin
+
+# Image partagée par tous les comptes sans photo (jamais supprimée : voir apps.core.media_gc)
+DEFAULT_AVATAR = 'avatars/default.png'
+
 REGISTRATION_CHOICES = [
     ('email', _('Email & Password')), 
     ('google', _('Google OAuth')),    
 ]
 
-class User(AbstractUser):
+class User(DirtyFieldsMixin, AbstractUser):
     # --- Champs d'Authentification ---
     email = models.EmailField(_("adresse e-mail"), unique=True, null=False, blank=False)
     
@@ -34,9 +39,14 @@ class User(AbstractUser):
         upload_to='avatars/', 
         null=True, 
         blank=True,
-        default='avatars/default.png'
+        default=DEFAULT_AVATAR
     )
 
+    @property
+    def has_custom_avatar(self):
+        """Vrai si l'utilisateur a envoyé sa propre photo (l'image par défaut ne compte pas)"""
+        return bool(self.avatar) and self.avatar.name != DEFAULT_AVATAR
+
     def get_full_name(self):
         """Retourne le prénom et nom avec une majuscule"""
         full_name = '%s %s' % (self.first_name, self.last_name)
@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 
 class UsersManagersTests(TestCase):
@@ -38,4 +40,37 @@ class UsersManagersTests(TestCase):
             password='secret_password_123'
         )
         self.assertNotEqual(user.password, 'secret_password_123')
-        self.assertTrue(user.check_password('secret_password_123'))
\ No newline at end of file
+        self.assertTrue(user.check_password('secret_password_123'))
+
+    def test_default_avatar_is_not_a_custom_avatar(self):
+        User = get_user_model()
+        user = User.objects.create_user(email='photo@test.com', username='photo', password='foo')
+        self.assertTrue(user.avatar)
+        self.assertFalse(user.has_custom_avatar)
+
+        user.avatar.name = 'avatars/ab/ab12.jpg'
+        self.assertTrue(user.has_custom_avatar)
+
+class DirtySaveTests(TestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        User.objects.create_user(
+            email='dirty@didacticiel.bj', username='dirty', password='foo', first_name='Avant', last_name='Test'
+        )
+        self.user = User.objects.get(email='dirty@didacticiel.bj')
+
+    def test_unchanged_user_is_not_written(self):
+        with self.assertNumQueries(0):
+            self.user.save()
+
+    def test_only_changed_columns_are_written(self):
+        self.user.first_name = 'Après'
+
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save()
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"first_name"', queries[0]['sql'])
+        self.assertNotIn('"email"', queries[0]['sql'])
+        self.assertEqual(self.user.get_dirty_fields(), [])
@@ -82,6 +82,7 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 # 3. MIDDLEWARE
 # =========================================================================
 MIDDLEWARE = [
+    'apps.core.middleware.WriteCountMiddleware',  # DEBUG uniquement (écritures SQL par requête)
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # <--- IMPORTANT POUR PYTHONANYWHERE
     'django_htmx.middleware.HtmxMiddleware', 
@@ -94,6 +95,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.locale.LocaleMiddleware',
+    'apps.core.middleware.LiteModeMiddleware',
+    'apps.messaging.middleware.PresenceMiddleware',
 ]
 
 # =========================================================================
@@ -110,6 +113,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'apps.messaging.context_processors.unread_messages_count',
+                'apps.core.context_processors.lite_mode',
             ],
         },
     },
@@ -256,16 +260,61 @@ if not DEBUG:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Médias adressés par contenu (apps.core.storage) : dédoublonnés, URL immuables.
+# Les miniatures easy_thumbnails gardent leurs noms déterministes (stockage classique).
+# Statiques : stockage simple ici, WhiteNoise est activé dans production.py
+# (DEBUG n'a pas encore sa valeur finale à ce stade pour local.py).
+STORAGES = {
+    'default': {'BACKEND': 'apps.core.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'easy_thumbnails': {'BACKEND': 'easy_thumbnails.storage.ThumbnailFileSystemStorage'},
+}
+
+# Limitation de débit (apps.core.ratelimit) : surcharge des règles par défaut
+# ex. {'message_send': {'capacity': 20, 'per_seconds': 60}}
+RATE_LIMITS = {}
+
+# Miniatures (easy_thumbnails, générées à l'upload par apps.core.thumbnails)
+THUMBNAIL_ALIASES = {
+    'users.User.avatar': {
+        'chat_avatar': {'size': (96, 96), 'crop': 'smart'},
+        'card': {'size': (400, 400), 'crop': 'smart'},
+        'detail': {'size': (800, 800), 'crop': 'smart'},
+        # Grilles en mode lite (apps.core.middleware)
+        'lite': {'size': (160, 160), 'crop': 'smart', 'quality': 50},
+    },
+    'profiles.ProfileImage.image': {
+        'chat_avatar': {'size': (96, 96), 'crop': 'smart'},
+        'card': {'size': (400, 400), 'crop': 'smart'},
+        'detail': {'size': (1200, 1200)},
+        'cover': {'size': (1600, 600), 'crop': 'smart'},
+        'lite': {'size': (160, 160), 'crop': 'smart', 'quality': 50},
+    },
+}
+THUMBNAIL_EXTENSION = 'webp'
+THUMBNAIL_TRANSPARENCY_EXTENSION = 'webp'
+THUMBNAIL_IMAGE_SAVE_OPTIONS = {'JPEG': {'quality': 80}, 'WEBP': {'quality': 80, 'method': 4}}
+
+# Tâches d'arrière-plan (apps.core.tasks) : pool de threads du processus web
+BACKGROUND_WORKERS = env.int('BACKGROUND_WORKERS', default=2)
+BACKGROUND_TASKS_EAGER = False
+
 
 # Email (Nécessaire pour la vérification compte sur PythonAnywhere)
 EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
 DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='contact@beninmatch.bj')
 SERVER_EMAIL = DEFAULT_FROM_EMAIL
+# Pour inspecter les digests en local : EMAIL_BACKEND=django.core.mail.backends.filebased.EmailBackend
+EMAIL_FILE_PATH = env('EMAIL_FILE_PATH', default=str(BASE_DIR / 'tmp' / 'emails'))
+# SMTP synchrone : ne jamais bloquer indéfiniment le job de digest
+EMAIL_TIMEOUT = env.int('EMAIL_TIMEOUT', default=10)
 
 # =========================================================================
 # 9. CKEDITOR (Pour le Blog)
 # =========================================================================
 CKEDITOR_UPLOAD_PATH = "uploads/ckeditor/"
+# Pas de sous-dossier par date : le même fichier envoyé un autre jour est dédoublonné
+CKEDITOR_RESTRICT_BY_DATE = False
 CKEDITOR_CONFIGS = {
     'default': {
         'skin': 'moono-lisa',
@@ -35,4 +35,22 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 #         'ENGINE': 'django.db.backends.sqlite3',
 #         'NAME': BASE_DIR / 'db.sqlite3',
 #     }
-# }
\ No newline at end of file
+# }
+
+# =========================================================================
+# 4. LOGS (Développement)
+# =========================================================================
+# Nombre d'écritures SQL par requête (apps.core.middleware.WriteCountMiddleware)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'apps.core.middleware': {
+            'handlers': ['console'],
+            'level': 'DEBUG',
+        },
+    },
+}
@@ -49,6 +49,7 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 # Forcer l'utilisation de WhiteNoise pour servir les fichiers statiques compressés
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES['staticfiles'] = {'BACKEND': STATICFILES_STORAGE}
 
 # =========================================================================
 # 5. LOGGING (Indispensable sur PythonAnywhere)
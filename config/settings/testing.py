@@ -12,4 +12,7 @@ DATABASES = {
 # Désactiver certaines choses lourdes pour les tests
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.MD5PasswordHasher', # Plus rapide que bcrypt pour les tests
-]
\ No newline at end of file
+]
+
+# Tâches d'arrière-plan exécutées immédiatement (pas de pool de threads en test)
+BACKGROUND_TASKS_EAGER = True
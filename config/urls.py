@@ -1,7 +1,8 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static 
+from apps.core.views import serve_media
 
 urlpatterns = [
     # 1. ADMIN
@@ -30,6 +31,9 @@ urlpatterns = [
     
     # 9. CKEDITOR
     path('ckeditor/', include('ckeditor_uploader.urls')),
+
+    # 9 bis. API MOBILE
+    path('api/v1/profiles/', include('apps.profiles.urls_api', namespace='profiles_api')),
 ]
 
 # 10. STATIC & MEDIA
@@ -42,5 +46,8 @@ if settings.DEBUG:
     except ImportError:
         pass
     
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Médias : en-têtes de cache immuables pour les fichiers adressés par contenu
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media, {'document_root': settings.MEDIA_ROOT}),
+    ]
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file